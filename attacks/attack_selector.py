@@ -0,0 +1,36 @@
+import tensorflow as tf
+
+from attacks.base_attack import BaseAttack
+
+
+class AttackSelector(BaseAttack):
+    """
+    Applies a different attack to every sample of a batch in one pass
+
+    Every attack runs on the whole batch and the per-sample result is picked with a one-hot mixture over the
+    stacked outputs, so gradients only flow through the attack chosen for each sample. Ids outside
+    [0, len(attacks)) fall back to ``default_id``.
+    """
+
+    def __init__(self, attacks, default_id=0, **kwargs):
+        super(AttackSelector, self).__init__()
+        self.attacks = list(attacks)
+        self.default_id = default_id
+
+    def select(self, inputs, attack_ids):
+        attack_ids = tf.reshape(tf.cast(attack_ids, tf.int32), [-1])
+        valid_ids = tf.logical_and(attack_ids >= 0, attack_ids < len(self.attacks))
+        attack_ids = tf.where(valid_ids, attack_ids, self.default_id)
+
+        attacked = tf.stack([tf.cast(attack(inputs), inputs.dtype) for attack in self.attacks], axis=0)
+        selection = tf.one_hot(attack_ids, len(self.attacks), dtype=inputs.dtype)
+        for index, attack in enumerate(self.attacks):
+            # Attacks that keep statistics (CombinedAttack) only count the samples they were chosen for
+            if hasattr(attack, 'record_selection'):
+                attack.record_selection(tf.equal(attack_ids, index))
+        return tf.einsum('kbhwc,bk->bhwc', attacked, selection)
+
+    def call(self, inputs):
+        images, attack_ids = inputs
+        outputs = self.select(images, attack_ids)
+        return outputs
@@ -1,30 +1,28 @@
 import tensorflow as tf
+from attacks.attack_selector import AttackSelector
 from attacks.base_attack import BaseAttack
-from attacks.gaussian_noise_attack import gaussian_noise_function
-from attacks.jpeg_attack import jpeg_function
-from attacks.salt_pepper_attack import salt_pepper_function
-from attacks.drop_out_attack import drop_out_function
-from attacks.cropping_attack import cropping_function
-from attacks.scaling_attack import scaling_function
+from attacks.gaussian_noise_attack import GaussianNoiseAttack
+from attacks.jpeg_attack import JPEGAttack
+from attacks.salt_pepper_attack import SaltPepperAttack
+from attacks.drop_out_attack import DropOutAttack
+from attacks.cropping_attack import CroppingAttack
+from attacks.scaling_attack import ScalingAttack
+from attacks.stupid_attack import StupidAttack
 
 
 class CombinedAttack(BaseAttack):
     """
     Applies 2-3 random attacks in sequence to simulate realistic scenarios
+
+    Every sample draws its own chain of attack ids. The chain is applied as ``max_attacks`` unrolled
+    per-sample selections over one set of attack layers, so the whole operator is a single graph
+    without data-dependent Python control flow.
     """
-    def __init__(self, **kwargs):
+    def __init__(self, min_attacks=2, max_attacks=3, **kwargs):
         super(CombinedAttack, self).__init__()
-        
-        # Available attack functions
-        self.attack_functions = [
-            gaussian_noise_function,
-            jpeg_function,
-            salt_pepper_function,
-            drop_out_function,
-            cropping_function,
-            scaling_function
-        ]
-        
+        self.min_attacks = min_attacks
+        self.max_attacks = max_attacks
+
         self.attack_names = [
             'gaussian_noise',
             'jpeg_compression',
@@ -34,73 +32,88 @@ class CombinedAttack(BaseAttack):
             'scaling'
         ]
 
-    def apply_random_attacks(self, inputs):
+        # Index 0 is the identity used for unused chain steps, attack i of the chain is index i + 1
+        self.attack_selector = AttackSelector([
+            StupidAttack(),
+            GaussianNoiseAttack(),
+            JPEGAttack(),
+            SaltPepperAttack(),
+            DropOutAttack(),
+            CroppingAttack(),
+            ScalingAttack()
+        ])
+
+        # Statistics over the chains that were actually applied (see record_selection)
+        self.attack_counts = tf.Variable(tf.zeros([len(self.attack_names)], tf.int64), trainable=False)
+        self.chain_length_counts = tf.Variable(tf.zeros([max_attacks + 1], tf.int64), trainable=False)
+        self.last_chain = None
+
+    def sample_chain(self, batch_size):
         """
-        Apply 2-3 random attacks in sequence
+        Draw one chain per sample
+
+        Returns:
+            Int tensor of shape (batch, max_attacks) with attack indices into attack_names, -1 for unused steps
         """
-        # Randomly decide how many attacks to apply (2 or 3)
-        num_attacks = tf.random.uniform([], minval=2, maxval=4, dtype=tf.int32)
-        
-        # We'll use Python control flow here since we need to select random attacks
-        # TensorFlow's control flow is complex for this use case
-        
-        # Generate random indices for attack selection
-        # We'll apply attacks sequentially
+        chain = tf.random.uniform([batch_size, self.max_attacks], minval=0, maxval=len(self.attack_names),
+                                  dtype=tf.int32)
+        chain_length = tf.random.uniform([batch_size], minval=self.min_attacks, maxval=self.max_attacks + 1,
+                                         dtype=tf.int32)
+        used_steps = tf.range(self.max_attacks)[None, :] < chain_length[:, None]
+        return tf.where(used_steps, chain, -1)
+
+    @tf.function(reduce_retracing=True)
+    def apply_chain(self, inputs, chain):
         output = inputs
-        
-        # For simplicity and TensorFlow compatibility, we'll use a fixed approach:
-        # Randomly select 2-3 attacks and apply them
-        
-        # Random selection approach using tf.random
-        # Attack 1: Random choice
-        attack_id_1 = tf.random.uniform([], minval=0, maxval=6, dtype=tf.int32)
-        output = tf.switch_case(
-            attack_id_1,
-            branch_fns={
-                0: lambda: gaussian_noise_function(output),
-                1: lambda: jpeg_function(output),
-                2: lambda: salt_pepper_function(output),
-                3: lambda: drop_out_function(output),
-                4: lambda: cropping_function(output),
-                5: lambda: scaling_function(output)
-            }
-        )
-        
-        # Attack 2: Random choice (different from attack 1)
-        attack_id_2 = tf.random.uniform([], minval=0, maxval=6, dtype=tf.int32)
-        output = tf.switch_case(
-            attack_id_2,
-            branch_fns={
-                0: lambda: gaussian_noise_function(output),
-                1: lambda: jpeg_function(output),
-                2: lambda: salt_pepper_function(output),
-                3: lambda: drop_out_function(output),
-                4: lambda: cropping_function(output),
-                5: lambda: scaling_function(output)
-            }
-        )
-        
-        # Attack 3: Apply with 50% probability
-        apply_third = tf.random.uniform([]) > 0.5
-        
-        if apply_third:
-            attack_id_3 = tf.random.uniform([], minval=0, maxval=6, dtype=tf.int32)
-            output = tf.switch_case(
-                attack_id_3,
-                branch_fns={
-                    0: lambda: gaussian_noise_function(output),
-                    1: lambda: jpeg_function(output),
-                    2: lambda: salt_pepper_function(output),
-                    3: lambda: drop_out_function(output),
-                    4: lambda: cropping_function(output),
-                    5: lambda: scaling_function(output)
-                }
-            )
-        
+        for step in range(self.max_attacks):
+            output = self.attack_selector.select(output, chain[:, step] + 1)
         return output
 
-    def call(self, inputs):
-        return self.apply_random_attacks(inputs)
+    def apply_random_attacks(self, inputs):
+        """
+        Apply 2-3 random attacks in sequence
+
+        Returns:
+            Attacked images and the chain that produced them (see sample_chain)
+        """
+        chain = self.sample_chain(tf.shape(inputs)[0])
+        return self.apply_chain(inputs, chain), chain
+
+    def record_selection(self, selected):
+        """
+        Count the attacks of the last chains, only for samples where this attack was selected
+
+        Args:
+            selected: Bool tensor of shape (batch,)
+        """
+        if self.last_chain is None:
+            return
+        # One-hot sums instead of boolean_mask/bincount keep every shape static (XLA friendly)
+        selected = tf.cast(selected, tf.int64)[:, None]
+        step_counts = tf.reduce_sum(tf.one_hot(self.last_chain, len(self.attack_names), dtype=tf.int64), axis=1)
+        self.attack_counts.assign_add(tf.reduce_sum(step_counts * selected, axis=0))
+        chain_length = tf.reduce_sum(tf.cast(self.last_chain >= 0, tf.int32), axis=1)
+        length_counts = tf.one_hot(chain_length, self.max_attacks + 1, dtype=tf.int64)
+        self.chain_length_counts.assign_add(tf.reduce_sum(length_counts * selected, axis=0))
+
+    def statistics(self):
+        """Attack counts by name and chain-length counts accumulated since the last reset"""
+        return {
+            'attacks': dict(zip(self.attack_names, self.attack_counts.numpy().tolist())),
+            'chain_lengths': {length: int(count) for length, count in enumerate(self.chain_length_counts.numpy())
+                              if length >= self.min_attacks},
+        }
+
+    def reset_statistics(self):
+        self.attack_counts.assign(tf.zeros_like(self.attack_counts))
+        self.chain_length_counts.assign(tf.zeros_like(self.chain_length_counts))
+
+    def call(self, inputs, return_chain=False):
+        outputs, chain = self.apply_random_attacks(inputs)
+        self.last_chain = chain
+        if return_chain:
+            return outputs, chain
+        return outputs
 
 
 def combined_attack_function(x):
@@ -3,48 +3,40 @@ from attacks.base_attack import BaseAttack
 
 
 class CroppingAttack(BaseAttack):
-    def __init__(self, crop_percentage=0.1, **kwargs):
+    def __init__(self, crop_range=(0.05, 0.15), **kwargs):
         """
         Crop attack that removes edges and pads back to original size
         
         Args:
-            crop_percentage: Percentage to crop from each edge (0.05 to 0.15)
+            crop_range: (min, max) fraction cropped from each edge, drawn independently per sample
         """
         super(CroppingAttack, self).__init__()
-        self.crop_percentage = crop_percentage
+        self.crop_range = crop_range
 
     def crop(self, inputs):
         """
-        Crop the image by removing edges, then pad back to original size
+        Crop the image by removing edges, then pad back to original size.
+        Zeroing the borders with a per-sample mask keeps the batch shape fixed.
         """
         batch_size = tf.shape(inputs)[0]
         height = tf.shape(inputs)[1]
         width = tf.shape(inputs)[2]
-        channels = tf.shape(inputs)[3]
         
-        # Calculate crop amount (random between 5% and 15%)
-        crop_ratio = tf.random.uniform([], minval=0.05, maxval=0.15)
+        # Calculate crop amount per sample (random between crop_range[0] and crop_range[1])
+        crop_ratio = tf.random.uniform([batch_size], minval=self.crop_range[0], maxval=self.crop_range[1])
         
         # Calculate crop dimensions
-        crop_h = tf.cast(tf.cast(height, tf.float32) * crop_ratio, tf.int32)
-        crop_w = tf.cast(tf.cast(width, tf.float32) * crop_ratio, tf.int32)
+        crop_h = tf.cast(tf.cast(height, tf.float32) * crop_ratio, tf.int32)[:, None]
+        crop_w = tf.cast(tf.cast(width, tf.float32) * crop_ratio, tf.int32)[:, None]
         
-        # Crop from all sides
-        cropped = inputs[:, crop_h:height-crop_h, crop_w:width-crop_w, :]
+        # Keep the centre, black out the cropped edges
+        rows = tf.range(height)[None, :]
+        cols = tf.range(width)[None, :]
+        keep_rows = tf.logical_and(rows >= crop_h, rows < height - crop_h)
+        keep_cols = tf.logical_and(cols >= crop_w, cols < width - crop_w)
+        mask = tf.logical_and(keep_rows[:, :, None], keep_cols[:, None, :])
         
-        # Pad back to original size with zeros (black padding)
-        pad_h = crop_h
-        pad_w = crop_w
-        
-        padded = tf.pad(cropped, 
-                       [[0, 0], [pad_h, pad_h], [pad_w, pad_w], [0, 0]], 
-                       mode='CONSTANT', 
-                       constant_values=0)
-        
-        # Ensure output shape matches input shape
-        padded = tf.image.resize_with_crop_or_pad(padded, height, width)
-        
-        return padded
+        return inputs * tf.cast(mask, inputs.dtype)[:, :, :, None]
 
     def call(self, inputs):
         outputs = self.crop(inputs)
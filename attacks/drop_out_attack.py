@@ -5,13 +5,20 @@ from attacks.base_attack import BaseAttack
 
 
 class DropOutAttack(BaseAttack):
-    def __init__(self, **kwargs):
+    def __init__(self, rate=0.3, **kwargs):
+        """
+        Sets pixels to black independently
+
+        Args:
+            rate: Fraction of pixels dropped
+        """
         super(DropOutAttack, self).__init__()
+        self.rate = rate
 
     def drop_out(self, inputs):
-        shp = keras.backend.shape(inputs)[1:]
+        shp = keras.backend.shape(inputs)  # independent noise for every sample
         mask_select = tf.random.uniform(shape=shp, maxval=1, dtype=tf.float32, seed=None)
-        mask_select = mask_select > 0.3
+        mask_select = mask_select > self.rate
         mask_noise = tf.cast(mask_select, tf.float32)
         out = inputs * mask_noise
         return out
@@ -5,12 +5,19 @@ from attacks.base_attack import BaseAttack
 
 
 class GaussianNoiseAttack(BaseAttack):
-    def __init__(self, **kwargs):
+    def __init__(self, stddev=0.1, **kwargs):
+        """
+        Additive Gaussian noise
+
+        Args:
+            stddev: Standard deviation of the noise, images are in [0, 1]
+        """
         super(GaussianNoiseAttack, self).__init__()
+        self.stddev = stddev
 
     def gaussian_noise(self, inputs):
-        shp = keras.backend.shape(inputs)[1:]
-        noise = keras.backend.random_normal(shape=shp, mean=0.0, stddev=.1, dtype=tf.float32)
+        shp = keras.backend.shape(inputs)  # independent noise for every sample
+        noise = keras.backend.random_normal(shape=shp, mean=0.0, stddev=self.stddev, dtype=tf.float32)
         out = inputs + noise
         return out
 
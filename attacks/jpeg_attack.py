@@ -1,25 +1,124 @@
+import numpy as np
 import tensorflow as tf
-from tensorflow.keras.layers import Lambda
 
 from attacks.base_attack import BaseAttack
 
+JPEG_BLOCK_SIZE = 8
+
+# IJG standard luminance quantization table (JPEG spec, Annex K)
+JPEG_LUMINANCE_TABLE = np.array([
+    [16, 11, 10, 16, 24, 40, 51, 61],
+    [12, 12, 14, 19, 26, 58, 60, 55],
+    [14, 13, 16, 24, 40, 57, 69, 56],
+    [14, 17, 22, 29, 51, 87, 80, 62],
+    [18, 22, 37, 56, 68, 109, 103, 77],
+    [24, 35, 55, 64, 81, 104, 113, 92],
+    [49, 64, 78, 87, 103, 121, 120, 101],
+    [72, 92, 95, 98, 112, 100, 103, 99],
+], dtype=np.float32)
+
+
+def dct_matrix(size=JPEG_BLOCK_SIZE):
+    """Orthonormal DCT-II matrix, so that coefficients = D @ block @ D^T"""
+    frequencies = np.arange(size)[:, None]
+    positions = np.arange(size)[None, :]
+    matrix = np.cos((2 * positions + 1) * frequencies * np.pi / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0, :] = np.sqrt(1.0 / size)
+    return matrix.astype(np.float32)
+
+
+def quantization_tables(quality):
+    """
+    Scale the luminance table with the IJG quality formula
+
+    Args:
+        quality: Float tensor of shape (batch,) with qualities in [1, 100]
+
+    Returns:
+        Quantization tables of shape (batch, 8, 8)
+    """
+    quality = tf.clip_by_value(tf.cast(quality, tf.float32), 1.0, 100.0)
+    scale = tf.where(quality < 50.0, 5000.0 / quality, 200.0 - 2.0 * quality)
+    tables = tf.floor((JPEG_LUMINANCE_TABLE[None] * scale[:, None, None] + 50.0) / 100.0)
+    return tf.clip_by_value(tables, 1.0, 255.0)
+
+
+def differentiable_round(x):
+    """Rounding with a cubic residual so gradients are not zero almost everywhere"""
+    rounded = tf.round(x)
+    return rounded + (x - rounded) ** 3
+
 
 class JPEGAttack(BaseAttack):
-    def __init__(self, **kwargs):
+    def __init__(self, quality=50, quality_range=None, differentiable=True, **kwargs):
+        """
+        JPEG compression on whole batches
+
+        Args:
+            quality: JPEG quality used for every sample when ``quality_range`` is None
+            quality_range: (min, max) to draw an independent integer quality per sample
+            differentiable: Simulate JPEG with a batched 8x8 DCT + quantization approximation (True) or run
+                the real codec per image with a straight-through gradient (False)
+        """
         super(JPEGAttack, self).__init__()
+        self.quality = quality
+        self.quality_range = quality_range
+        self.differentiable = differentiable
+        self.dct = tf.constant(dct_matrix())
+
+    def sample_quality(self, batch_size):
+        if self.quality_range is None:
+            return tf.fill([batch_size], tf.cast(self.quality, tf.float32))
+        min_quality, max_quality = self.quality_range
+        quality = tf.random.uniform([batch_size], minval=min_quality, maxval=max_quality + 1, dtype=tf.int32)
+        return tf.cast(quality, tf.float32)
+
+    def jpeg_approximation(self, inputs, quality):
+        """
+        Batched JPEG simulation on images in [0, 1]: level shift, 8x8 block DCT, quantization with
+        differentiable rounding, inverse DCT. Every channel is treated as luminance.
+        """
+        images = tf.convert_to_tensor(inputs, dtype=tf.float32)
+        shape = tf.shape(images)
+        batch, height, width, channels = shape[0], shape[1], shape[2], shape[3]
+        pad_height = (-height) % JPEG_BLOCK_SIZE
+        pad_width = (-width) % JPEG_BLOCK_SIZE
+        padded = tf.pad(images * 255.0 - 128.0, [[0, 0], [0, pad_height], [0, pad_width], [0, 0]], mode='SYMMETRIC')
+
+        block_rows = (height + pad_height) // JPEG_BLOCK_SIZE
+        block_cols = (width + pad_width) // JPEG_BLOCK_SIZE
+        blocks = tf.reshape(padded, [batch, block_rows, JPEG_BLOCK_SIZE, block_cols, JPEG_BLOCK_SIZE, channels])
+        blocks = tf.transpose(blocks, [0, 1, 3, 5, 2, 4])
+
+        coefficients = tf.einsum('ij,brcxjk,lk->brcxil', self.dct, blocks, self.dct)
+        tables = quantization_tables(quality)[:, None, None, None, :, :]
+        quantized = differentiable_round(coefficients / tables) * tables
+        reconstructed = tf.einsum('ji,brcxjk,kl->brcxil', self.dct, quantized, self.dct)
+
+        reconstructed = tf.transpose(reconstructed, [0, 1, 4, 2, 5, 3])
+        reconstructed = tf.reshape(reconstructed, [batch, height + pad_height, width + pad_width, channels])
+        reconstructed = reconstructed[:, :height, :width, :]
+        return tf.clip_by_value((reconstructed + 128.0) / 255.0, 0.0, 1.0)
+
+    @staticmethod
+    def jpeg_codec(inputs, quality):
+        """Real JPEG encode/decode per image; gradients pass straight through the codec"""
+        images = tf.convert_to_tensor(inputs, dtype=tf.float32)
+        compressed = tf.map_fn(
+            lambda args: tf.image.adjust_jpeg_quality(args[0], tf.cast(args[1], tf.int32)),
+            (images, quality),
+            fn_output_signature=tf.float32
+        )
+        return images + tf.stop_gradient(compressed - images)
 
     def jpeg(self, inputs):
-        images = tf.convert_to_tensor(inputs)
-        batch = tf.shape(images)[0]
-        
-        def process_single_image(i):
-            return tf.image.adjust_jpeg_quality(images[i], 50)
-        
-        outputs = tf.map_fn(process_single_image, tf.range(batch), dtype=tf.float32)
-        return outputs
+        quality = self.sample_quality(tf.shape(inputs)[0])
+        if self.differentiable:
+            return self.jpeg_approximation(inputs, quality)
+        return self.jpeg_codec(inputs, quality)
 
     def call(self, inputs):
-        outputs = Lambda(lambda x: self.jpeg(x), output_shape=(10, 256, 256, 1))(inputs)
+        outputs = self.jpeg(inputs)
         return outputs
 
 
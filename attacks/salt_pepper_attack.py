@@ -4,12 +4,19 @@ from attacks.base_attack import BaseAttack
 
 
 class SaltPepperAttack(BaseAttack):
-    def __init__(self, **kwargs):
+    def __init__(self, probability=0.1, **kwargs):
+        """
+        Sets pixels to black or white independently
+
+        Args:
+            probability: Fraction of pixels replaced, half of them by salt and half by pepper
+        """
         super(SaltPepperAttack, self).__init__()
+        self.probability = probability
 
     def salt_pepper(self, inputs):
-        shp = keras.backend.shape(inputs)[1:]
-        mask_select = keras.backend.random_binomial(shape=shp, p=.1)
+        shp = keras.backend.shape(inputs)  # independent noise for every sample
+        mask_select = keras.backend.random_binomial(shape=shp, p=self.probability)
         mask_noise = keras.backend.random_binomial(shape=shp, p=0.5)  # salt and pepper have the same chance
         out = inputs * (1 - mask_select) + mask_noise * mask_select
         return out
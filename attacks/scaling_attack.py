@@ -2,43 +2,71 @@ import tensorflow as tf
 from attacks.base_attack import BaseAttack
 
 
+def bilinear_resize_matrices(size, new_size):
+    """
+    Per-sample linear operators for a bilinear (half-pixel centers) resize to ``new_size`` and back
+
+    Args:
+        size: Original length of the axis (python int or scalar tensor)
+        new_size: Int tensor of shape (batch,) with the intermediate lengths (<= size)
+
+    Returns:
+        Float tensor of shape (batch, size, size); applying it along an axis equals resizing down and up
+    """
+    size_float = tf.cast(size, tf.float32)
+    new_size_float = tf.cast(new_size, tf.float32)[:, None]
+    positions = tf.cast(tf.range(size), tf.float32)[None, :]
+
+    def interpolation(source, source_size):
+        source = tf.clip_by_value(source, 0.0, source_size - 1.0)
+        lower = tf.floor(source)
+        weight = source - lower
+        lower = tf.cast(lower, tf.int32)
+        upper = tf.minimum(lower + 1, tf.cast(source_size, tf.int32) - 1)
+        return (tf.one_hot(lower, size) * (1.0 - weight)[..., None] +
+                tf.one_hot(upper, size) * weight[..., None])
+
+    # Downsample: output row i < new_size reads the original at (i + 0.5) * size / new_size - 0.5
+    down = interpolation((positions + 0.5) * size_float / new_size_float - 0.5, size_float)
+    down = down * tf.cast(positions < new_size_float, tf.float32)[..., None]
+    # Upsample: output row j reads the downsampled axis at (j + 0.5) * new_size / size - 0.5
+    up = interpolation((positions + 0.5) * new_size_float / size_float - 0.5, new_size_float)
+    return tf.matmul(up, down)
+
+
 class ScalingAttack(BaseAttack):
-    def __init__(self, scale_factor=0.5, **kwargs):
+    def __init__(self, scale_range=(0.5, 0.75), **kwargs):
         """
         Scaling attack that downsamples and upsamples back
         
         Args:
-            scale_factor: Factor to scale down (0.5 = 50%, 0.75 = 75%)
+            scale_range: (min, max) scale factor, drawn independently per sample (0.5 = 50%, 0.75 = 75%)
         """
         super(ScalingAttack, self).__init__()
-        self.scale_factor = scale_factor
+        self.scale_range = scale_range
 
     def scale(self, inputs):
         """
-        Downsample the image then upsample back to original size
+        Downsample the image then upsample back to original size (bilinear both ways).
+        Every sample has its own scale factor, so the two resizes are applied as per-sample
+        matrices along each axis instead of tf.image.resize.
         """
         original_shape = tf.shape(inputs)
+        batch_size = original_shape[0]
         height = original_shape[1]
         width = original_shape[2]
         
-        # Random scale factor between 50% and 75%
-        scale_factor = tf.random.uniform([], minval=0.5, maxval=0.75)
+        # Random scale factor per sample between scale_range[0] and scale_range[1]
+        scale_factor = tf.random.uniform([batch_size], minval=self.scale_range[0], maxval=self.scale_range[1])
         
         # Calculate new dimensions
         new_height = tf.cast(tf.cast(height, tf.float32) * scale_factor, tf.int32)
         new_width = tf.cast(tf.cast(width, tf.float32) * scale_factor, tf.int32)
         
-        # Downsample using bilinear interpolation
-        downsampled = tf.image.resize(inputs, 
-                                      [new_height, new_width], 
-                                      method='bilinear')
-        
-        # Upsample back to original size
-        upsampled = tf.image.resize(downsampled, 
-                                    [height, width], 
-                                    method='bilinear')
+        height_matrices = bilinear_resize_matrices(height, new_height)
+        width_matrices = bilinear_resize_matrices(width, new_width)
         
-        return upsampled
+        return tf.einsum('bij,bjkc,blk->bilc', height_matrices, tf.cast(inputs, tf.float32), width_matrices)
 
     def call(self, inputs):
         outputs = self.scale(inputs)
@@ -0,0 +1,93 @@
+"""
+Embed watermarks into a whole directory (or file list) of images
+Streams images through the embedder in batches and resumes from the output manifest after an interruption
+
+Usage: python batch_embed.py SOURCE OUTPUT_DIR [--weights PATH] [--batch-size N] [--workers N] [--watermark BITS]
+                              [--tiled [--tile-overlap N]] [--color]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import argparse
+import numpy as np
+from configs import *
+from inference.batch_embedder import BatchEmbedder, list_image_files
+from inference.model_loader import load_embedder
+from inference.tiling import TiledWatermarker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Batch watermark embedding')
+    parser.add_argument('source', help='Folder of images or text file with one image path per line')
+    parser.add_argument('output_dir', help='Folder for the watermarked images and the resume manifest')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images (tiles when --tiled) per embedder call')
+    parser.add_argument('--workers', type=int, default=4, help='Decode threads (and write threads)')
+    parser.add_argument('--queue-size', type=int, default=4, help='Decoded batches buffered ahead of the model')
+    parser.add_argument('--format', default='png', help='Output image format (use a lossless one)')
+    parser.add_argument('--watermark', default=None,
+                        help=f'{WATERMARK_SIZE[0]} bits as a 0/1 string embedded in every image '
+                             '(default: random watermark per image, stored in the manifest)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the random per-image watermarks')
+    parser.add_argument('--tiled', action='store_true',
+                        help='Keep full resolution: embed every model-sized tile instead of resizing the image')
+    parser.add_argument('--tile-overlap', type=int, default=0, help='Pixels shared by neighbouring tiles (blended)')
+    parser.add_argument('--color', action='store_true',
+                        help='Keep colors: embed into the luminance (Y of YCbCr) and keep the chroma untouched')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("BATCH WATERMARK EMBEDDING")
+    print("="*80)
+
+    if not os.path.exists(args.weights):
+        print(f"\nError: Model weights not found at {args.weights}")
+        print("Please train the model first!")
+        return 1
+
+    watermark = None
+    if args.watermark is not None:
+        if len(args.watermark) != WATERMARK_SIZE[0] or set(args.watermark) - {'0', '1'}:
+            print(f"\nError: --watermark must be {WATERMARK_SIZE[0]} characters of 0/1")
+            return 1
+        watermark = np.array([int(bit) for bit in args.watermark], dtype=np.float32)
+
+    image_paths = list_image_files(args.source)
+    print(f"\nSource: {args.source} ({len(image_paths)} images)")
+    print(f"Output: {args.output_dir}")
+    print(f"Batch size: {args.batch_size} | Workers: {args.workers} | Tiled: {args.tiled} | Color: {args.color}\n")
+
+    embedder = load_embedder(args.weights, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+    if args.tiled:
+        # Full resolution images are large, so only decode one image per worker ahead and batch the tiles
+        tiler = TiledWatermarker(embedder=embedder, tile_size=IMAGE_SIZE[0], overlap=args.tile_overlap,
+                                 batch_size=args.batch_size)
+        batch_embedder = BatchEmbedder(embedder, IMAGE_SIZE, WATERMARK_SIZE, batch_size=args.workers,
+                                       num_workers=args.workers, queue_size=args.queue_size,
+                                       output_format=args.format, seed=args.seed, tiler=tiler, color=args.color)
+    else:
+        batch_embedder = BatchEmbedder(embedder, IMAGE_SIZE, WATERMARK_SIZE, batch_size=args.batch_size,
+                                       num_workers=args.workers, queue_size=args.queue_size,
+                                       output_format=args.format, seed=args.seed, color=args.color)
+    stats = batch_embedder.run(image_paths, args.output_dir, watermark=watermark)
+
+    print("\n" + "="*80)
+    print(f"Embedded: {stats['embedded']} | Skipped (already done): {stats['skipped']} | Failed: {stats['failed']}")
+    print(f"Time: {stats['elapsed']:.1f}s | {stats['images_per_second']:.1f} images/sec")
+    print("="*80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
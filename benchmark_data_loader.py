@@ -0,0 +1,88 @@
+"""
+Benchmark the training input pipeline
+Reports images/sec of MergedDataLoader for every tf.data tuning profile
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import time
+import tensorflow as tf
+from configs import *
+from data_loaders.image_data_loaders.image_data_loader import ImageDataLoader
+from data_loaders.merged_data_loader import MergedDataLoader
+from data_loaders.pipeline_profiles import PIPELINE_PROFILES
+
+
+def benchmark_profile(profile_name, num_batches, warmup_batches=5):
+    """Return images/sec of the input pipeline alone (no model) for one profile"""
+    data_loader = MergedDataLoader(image_base_path=TRAIN_IMAGES_PATH, image_channels=[0],
+                                   image_convert_type=tf.float32, watermark_size=WATERMARK_SIZE,
+                                   attack_min_id=0, attack_max_id=ATTACK_MAX_ID, batch_size=BATCH_SIZE,
+                                   image_cache_dir=TRAIN_IMAGES_CACHE_PATH,
+                                   image_memmap_path=TRAIN_IMAGES_MEMMAP_PATH,
+                                   profile=profile_name, image_max_count=TRAIN_IMAGES_COUNT,
+                                   shuffle_buffer_size=SHUFFLE_BUFFER_SIZE,
+                                   image_fast_decode=FAST_JPEG_DECODE).get_data_loader()
+    # Repeat so small image folders still yield num_batches steady-state batches
+    iterator = iter(data_loader.repeat())
+    for _ in range(warmup_batches):
+        next(iterator)
+
+    num_images = 0
+    start_time = time.perf_counter()
+    for _ in range(num_batches):
+        batch = next(iterator)
+        num_images += int(tf.shape(batch[0][0])[0])
+    elapsed = time.perf_counter() - start_time
+    return num_images / elapsed if elapsed > 0 else 0.0, num_images
+
+
+def benchmark_decode(fast_decode, num_images):
+    """Return images/sec of read + decode + resize alone, bypassing any cache"""
+    image_loader = ImageDataLoader(base_path=TRAIN_IMAGES_PATH, channels=[0], image_size=IMAGE_SIZE[:2],
+                                   max_images=TRAIN_IMAGES_COUNT, fast_decode=fast_decode)
+    decoded_loader = image_loader.get_file_paths().map(lambda file_path, label: image_loader.decode_image(file_path))
+    start_time = time.perf_counter()
+    decoded_images = 0
+    for _ in decoded_loader.repeat().take(num_images):
+        decoded_images += 1
+    elapsed = time.perf_counter() - start_time
+    return decoded_images / elapsed if elapsed > 0 else 0.0
+
+
+def main(num_batches):
+    print("="*80)
+    print("INPUT PIPELINE BENCHMARK")
+    print("="*80)
+    print(f"\nImages: {TRAIN_IMAGES_PATH} | Batch size: {BATCH_SIZE} | Batches per profile: {num_batches}")
+    print(f"CPU cores: {os.cpu_count()}\n")
+
+    results = {}
+    for profile_name in PIPELINE_PROFILES:
+        images_per_second, num_images = benchmark_profile(profile_name, num_batches)
+        results[profile_name] = images_per_second
+        print(f"  {profile_name:<12} {images_per_second:10.1f} images/sec ({num_images} images)")
+
+    baseline = results.get('default')
+    if baseline:
+        print("\nSpeedup vs 'default':")
+        for profile_name, images_per_second in results.items():
+            print(f"  {profile_name:<12} {images_per_second / baseline:6.2f}x")
+
+    print("\nJPEG decode (single thread, no cache):")
+    exact_rate = benchmark_decode(fast_decode=False, num_images=num_batches * BATCH_SIZE)
+    fast_rate = benchmark_decode(fast_decode=True, num_images=num_batches * BATCH_SIZE)
+    print(f"  exact RGB      {exact_rate:10.1f} images/sec")
+    print(f"  DCT-scaled Y   {fast_rate:10.1f} images/sec ({fast_rate / exact_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    num_batches = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    main(num_batches)
@@ -0,0 +1,139 @@
+"""
+Compare exported formats (see export_model.py) against the Keras model rebuilt from weights
+Reports cold start (imports, load and first call), per-image embed/extract latency at batch 1 and --batch-size,
+peak memory and parity with the first format. Every format runs in a fresh process.
+
+Usage: python benchmark_export.py [EXPORT_DIR] [--weights PATH] [--batch-size N] [--steps N]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+# TensorFlow is only imported inside the benchmark processes, so that cold start includes it
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+import numpy as np
+from configs import *
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Exported model benchmark')
+    parser.add_argument('export_dir', nargs='?', default=os.path.join(MODEL_OUTPUT_PATH, 'export'),
+                        help='Directory written by export_model.py')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights for the Keras baseline (skipped if missing)')
+    parser.add_argument('--batch-size', type=int, default=8, help='Batch size of the batched latency')
+    parser.add_argument('--steps', type=int, default=10, help='Timed calls per batch size')
+    return parser.parse_args()
+
+
+def synthetic_batch(batch_size, seed=0):
+    random_state = np.random.RandomState(seed)
+    images = random_state.rand(batch_size, *IMAGE_SIZE).astype(np.float32)
+    watermarks = random_state.randint(0, 2, size=(batch_size,) + WATERMARK_SIZE).astype(np.float32)
+    return images, watermarks
+
+
+def load_pair(model_format, quantization, export_dir, weights_path):
+    """(embedder, extractor) callables taking numpy batches"""
+    if model_format == 'keras':
+        from inference.model_loader import load_wavetf_model
+        wavetf_model = load_wavetf_model(weights_path, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+        embedder, extractor = wavetf_model.get_embedder(), wavetf_model.get_extractor()
+        return (lambda images, watermarks: np.asarray(embedder.predict_on_batch([images, watermarks])),
+                lambda images: np.asarray(extractor.predict_on_batch(images)))
+    from inference.exported_model import load_exported_pair
+    embedder, extractor, _ = load_exported_pair(export_dir, model_format, quantization)
+    return embedder, extractor
+
+
+def time_per_image(function, inputs, num_steps):
+    function(*inputs)
+    start_time = time.perf_counter()
+    for _ in range(num_steps):
+        function(*inputs)
+    return (time.perf_counter() - start_time) / (num_steps * len(inputs[0])) * 1000
+
+
+def benchmark_format(model_format, quantization, export_dir, weights_path, batch_size, num_steps):
+    """
+    Cold start and latency for one format, run in a fresh process
+
+    Returns:
+        Dict of cold start seconds, ms per image by batch size, peak memory in MB, and the embedded images and
+        extracted probabilities of a fixed batch for parity
+    """
+    start_time = time.perf_counter()
+    embedder, extractor = load_pair(model_format, quantization, export_dir, weights_path)
+    images, watermarks = synthetic_batch(batch_size)
+    extractor(embedder(images[:1], watermarks[:1]))
+    cold_start = time.perf_counter() - start_time
+
+    latency = {}
+    for size in (1, batch_size):
+        embed_ms = time_per_image(embedder, (images[:size], watermarks[:size]), num_steps)
+        extract_ms = time_per_image(extractor, (images[:size],), num_steps)
+        latency[size] = (embed_ms, extract_ms)
+
+    embedded_images = embedder(images, watermarks)
+    # ru_maxrss is in KB on Linux
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'cold_start': cold_start,
+        'latency': latency,
+        'peak_memory': peak_memory,
+        'embedded': embedded_images,
+        'probabilities': extractor(embedded_images),
+    }
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("EXPORTED MODEL BENCHMARK")
+    print("="*80)
+
+    with open(os.path.join(args.export_dir, 'export.json')) as metadata_file:
+        metadata = json.load(metadata_file)
+    formats = [('keras', 'none')] if os.path.exists(args.weights) else []
+    formats.append(('saved_model', 'none'))
+    formats += [('tflite', quantization) for quantization in metadata['tflite']['embedder']]
+    print(f"\nExport: {args.export_dir} | Batch size: {args.batch_size} | Timed calls: {args.steps} "
+          f"| TFLite batch: {metadata['tflite_batch_size']} (other sizes run padded chunks)\n")
+    if not os.path.exists(args.weights):
+        print(f"  (no weights at {args.weights}: Keras baseline skipped)\n")
+
+    print(f"  {'format':<20} {'cold start':>10} | {'embed ms/image':>19} | {'extract ms/image':>19} | "
+          f"{'peak MB':>8} | {'max diff':>8} | {'bits':>7}")
+    print(f"  {'':<20} {'':>10} | {'b=1':>9} {f'b={args.batch_size}':>9} | {'b=1':>9} {f'b={args.batch_size}':>9} |")
+    context = multiprocessing.get_context('spawn')
+    reference = None
+    for model_format, quantization in formats:
+        with context.Pool(1) as pool:
+            result = pool.apply(benchmark_format, (model_format, quantization, args.export_dir, args.weights,
+                                                   args.batch_size, args.steps))
+        if reference is None:
+            reference = result
+        embedded_difference = np.abs(result['embedded'] - reference['embedded']).max()
+        bit_agreement = np.mean((result['probabilities'] > 0.5) == (reference['probabilities'] > 0.5))
+        label = model_format if quantization == 'none' else f'{model_format} {quantization}'
+        (embed_single, extract_single), (embed_batched, extract_batched) = (result['latency'][1],
+                                                                            result['latency'][args.batch_size])
+        print(f"  {label:<20} {result['cold_start']:9.2f}s | {embed_single:9.2f} {embed_batched:9.2f} | "
+              f"{extract_single:9.2f} {extract_batched:9.2f} | {result['peak_memory']:8.0f} | "
+              f"{embedded_difference:8.5f} | {bit_agreement * 100:6.2f}%")
+    print("\nmax diff / bits: embedded image difference and extracted bit agreement against the first row")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
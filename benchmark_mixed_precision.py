@@ -0,0 +1,133 @@
+"""
+Compare float32 and mixed bfloat16 WaveTFModel
+Reports train step / inference throughput, peak memory and PSNR/BER parity on synthetic 256x256 batches
+
+Usage: python benchmark_mixed_precision.py [num_steps] [model_weights_path]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import multiprocessing
+import resource
+import time
+import numpy as np
+import tensorflow as tf
+from configs import *
+from models.wavetf_model import WaveTFModel
+from utils.metrics import calculate_psnr, calculate_ber
+
+
+def synthetic_batch(batch_size, seed=0):
+    random_state = np.random.RandomState(seed)
+    images = random_state.rand(batch_size, *IMAGE_SIZE).astype(np.float32)
+    watermarks = random_state.randint(0, 2, size=(batch_size,) + WATERMARK_SIZE).astype(np.float32)
+    attack_ids = np.zeros((batch_size, 1), dtype=np.int32)
+    return images, watermarks, attack_ids
+
+
+def build_model(mixed_precision, model_weights_path=None):
+    model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE,
+                        mixed_precision=mixed_precision).get_model()
+    if model_weights_path:
+        model.load_weights(model_weights_path)
+    return model
+
+
+def benchmark_mode(mixed_precision, num_steps, warmup_steps=3):
+    """
+    Train step and inference timing for one precision, run in a fresh process so peak memory is not shared
+
+    Returns:
+        (ms per train step, inference images/sec, peak resident memory in MB)
+    """
+    model = build_model(mixed_precision)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE),
+        loss={'embedded_image': 'mse', 'output_watermark': 'mae'},
+        loss_weights={'embedded_image': IMAGE_LOSS_WEIGHT, 'output_watermark': WATERMARK_LOSS_WEIGHT},
+        jit_compile=JIT_COMPILE
+    )
+    images, watermarks, attack_ids = synthetic_batch(BATCH_SIZE)
+    inputs, targets = [images, watermarks, attack_ids], [images, watermarks]
+
+    for _ in range(warmup_steps):
+        model.train_on_batch(inputs, targets)
+    start_time = time.perf_counter()
+    for _ in range(num_steps):
+        model.train_on_batch(inputs, targets)
+    step_time = (time.perf_counter() - start_time) / num_steps
+
+    model.predict_on_batch(inputs)
+    start_time = time.perf_counter()
+    for _ in range(num_steps):
+        model.predict_on_batch(inputs)
+    images_per_second = BATCH_SIZE * num_steps / (time.perf_counter() - start_time)
+
+    # ru_maxrss is in KB on Linux
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return step_time * 1000, images_per_second, peak_memory
+
+
+def parity_check(model_weights_path=None, num_images=16):
+    """PSNR/BER of the float32 and bfloat16 models with the same weights (no attack)"""
+    float_model = build_model(False, model_weights_path)
+    mixed_model = build_model(True)
+    mixed_model.set_weights(float_model.get_weights())
+
+    images, watermarks, attack_ids = synthetic_batch(num_images, seed=1)
+    results = {}
+    for label, model in (('float32', float_model), ('bfloat16', mixed_model)):
+        embedded_images, extracted_watermarks = model.predict([images, watermarks, attack_ids], verbose=0)
+        results[label] = {
+            'embedded': embedded_images,
+            'extracted': extracted_watermarks,
+            'psnr': calculate_psnr(images, embedded_images),
+            'ber': calculate_ber(watermarks, extracted_watermarks),
+        }
+    return results
+
+
+def main(num_steps, model_weights_path=None):
+    print("="*80)
+    print("MIXED PRECISION BENCHMARK (float32 vs mixed bfloat16)")
+    print("="*80)
+    print(f"\nBatch size: {BATCH_SIZE} | Image size: {IMAGE_SIZE} | Timed steps: {num_steps} | XLA: {JIT_COMPILE}\n")
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for mixed_precision in (False, True):
+        label = 'bfloat16' if mixed_precision else 'float32'
+        with context.Pool(1) as pool:
+            step_ms, images_per_second, peak_memory = pool.apply(benchmark_mode, (mixed_precision, num_steps))
+        results[label] = (step_ms, images_per_second, peak_memory)
+        print(f"  {label:<9} train {step_ms:9.1f} ms/step | inference {images_per_second:7.1f} images/sec "
+              f"| peak memory {peak_memory:8.1f} MB")
+
+    float_step, float_rate, float_memory = results['float32']
+    mixed_step, mixed_rate, mixed_memory = results['bfloat16']
+    print(f"\nTrain step speedup: {float_step / mixed_step:.2f}x | Inference speedup: {mixed_rate / float_rate:.2f}x "
+          f"| Peak memory delta: {mixed_memory - float_memory:+.1f} MB")
+
+    print("\nParity (same weights, no attack):")
+    if not model_weights_path:
+        print("  (untrained weights: BER is only meaningful as a float32 vs bfloat16 comparison)")
+    parity = parity_check(model_weights_path)
+    for label, result in parity.items():
+        print(f"  {label:<9} PSNR: {result['psnr']:.2f} dB | BER: {result['ber']:.2f}%")
+    embedded_difference = np.abs(parity['float32']['embedded'] - parity['bfloat16']['embedded']).max()
+    bit_agreement = np.mean((parity['float32']['extracted'] > 0.5) == (parity['bfloat16']['extracted'] > 0.5))
+    print(f"  Max embedded image difference: {embedded_difference:.5f}")
+    print(f"  Extracted bit agreement: {bit_agreement * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    num_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    model_weights_path = sys.argv[2] if len(sys.argv) > 2 else None
+    main(num_steps, model_weights_path)
@@ -0,0 +1,72 @@
+"""
+Compare training step time with and without XLA (jit_compile)
+Runs WaveTFModel on synthetic 256x256 batches so no training images are needed
+XLA relies on the native Haar DWT/IDWT layers of wavetf.py (wavelet 'haar'); other wavelets fall back to the
+tensorflow_wavelets layers, which are not XLA friendly
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import time
+import numpy as np
+import tensorflow as tf
+from configs import *
+from models.wavetf_model import WaveTFModel
+
+
+def synthetic_batch(batch_size):
+    images = np.random.rand(batch_size, *IMAGE_SIZE).astype(np.float32)
+    watermarks = np.random.randint(0, 2, size=(batch_size,) + WATERMARK_SIZE).astype(np.float32)
+    attack_ids = np.random.randint(0, ATTACK_MAX_ID, size=(batch_size, 1)).astype(np.int32)
+    return [images, watermarks, attack_ids], [images, watermarks]
+
+
+def time_train_step(jit_compile, batch_size, num_steps, warmup_steps=3):
+    """Return (compile + first steps seconds, mean seconds per step) for one jit_compile setting"""
+    model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE).get_model()
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE),
+        loss={'embedded_image': 'mse', 'output_watermark': 'mae'},
+        loss_weights={'embedded_image': IMAGE_LOSS_WEIGHT, 'output_watermark': WATERMARK_LOSS_WEIGHT},
+        jit_compile=jit_compile
+    )
+    inputs, targets = synthetic_batch(batch_size)
+
+    start_time = time.perf_counter()
+    for _ in range(warmup_steps):
+        model.train_on_batch(inputs, targets)
+    warmup_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(num_steps):
+        model.train_on_batch(inputs, targets)
+    return warmup_time, (time.perf_counter() - start_time) / num_steps
+
+
+def main(num_steps):
+    print("="*80)
+    print("TRAINING STEP BENCHMARK (XLA vs no XLA)")
+    print("="*80)
+    print(f"\nBatch size: {BATCH_SIZE} | Image size: {IMAGE_SIZE} | Timed steps: {num_steps}\n")
+
+    results = {}
+    for jit_compile in (False, True):
+        label = 'XLA' if jit_compile else 'no XLA'
+        warmup_time, step_time = time_train_step(jit_compile, BATCH_SIZE, num_steps)
+        results[jit_compile] = step_time
+        print(f"  {label:<8} {step_time * 1000:9.1f} ms/step | {BATCH_SIZE / step_time:7.1f} images/sec "
+              f"| warm-up (incl. compile) {warmup_time:.1f}s")
+
+    print(f"\nXLA speedup: {results[False] / results[True]:.2f}x")
+
+
+if __name__ == "__main__":
+    num_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    main(num_steps)
@@ -4,6 +4,11 @@ Modify these settings to customize training and evaluation
 """
 import os
 
+# Input pipeline settings are defined once in data_loaders/configs.py, so the trainers and every other user of the
+# data loaders (benchmark_data_loader.py, pack_training_images.py) get the same pipeline; change them there
+from data_loaders.configs import FAST_JPEG_DECODE, PIPELINE_PROFILE as DATA_PIPELINE_PROFILE, \
+    IMAGE_CACHE_DIR as TRAIN_IMAGES_CACHE_PATH
+
 # ============================================================================
 # IMAGE AND WATERMARK SETTINGS
 # ============================================================================
@@ -17,6 +22,12 @@ EPOCHS = 60                      # Number of training epochs (increase for bette
 BATCH_SIZE = 10                 # Batch size (increase if you have more GPU memory)
 LEARNING_RATE = 0.001            # Learning rate for Adam optimizer
 TRAIN_IMAGES_COUNT = 10000       # Number of training images to use (118,287 available)
+SHUFFLE_BUFFER_SIZE = 1024       # Training images reshuffled every epoch through this buffer (0 = no shuffle)
+NUM_TRAIN_SHARDS = 1             # Number of trainers splitting the training images between them
+TRAIN_SHARD_INDEX = 0            # This trainer's shard, from 0 to NUM_TRAIN_SHARDS - 1
+JIT_COMPILE = False  # Compile the training step with XLA (see benchmark_train_step.py), needs the native Haar wavelet layers
+MIXED_PRECISION = False  # bfloat16 embedding/extraction networks (see benchmark_mixed_precision.py)
+EVALUATION_CACHE_MB = 512  # Embedded images kept in memory during evaluation, the rest spills to disk
 
 # ============================================================================
 # LOSS WEIGHTS
@@ -43,6 +54,7 @@ ATTACK_MAX_ID = 6  # Maximum attack ID (0 to 6 = 7 attack types)
 MODEL_OUTPUT_PATH = 'config_1_baseline/'
 TRAIN_IMAGES_PATH = '../train_images/'  # Parent folder with 118,287 images
 TEST_IMAGES_PATH = 'test_images/'
+TRAIN_IMAGES_MEMMAP_PATH = None  # e.g. 'train_images.npy', built once with pack_training_images.py
 
 # Create directories if they don't exist
 os.makedirs(MODEL_OUTPUT_PATH, exist_ok=True)
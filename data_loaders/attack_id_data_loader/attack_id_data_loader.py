@@ -1,22 +1,26 @@
 import tensorflow as tf
 
 from data_loaders.base_data_loader import BaseDataLoader
+from data_loaders.configs import ATTACK_ID_SEED, RANDOM_CHUNK_SIZE
 
 
 class AttackIdDataLoader(BaseDataLoader):
-    def __init__(self, max_value, min_value):
+    def __init__(self, max_value, min_value, seed=ATTACK_ID_SEED, chunk_size=RANDOM_CHUNK_SIZE, num_parallel_calls=4):
         super(AttackIdDataLoader, self).__init__()
         self.min_value = min_value
         self.max_value = max_value
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.num_parallel_calls = num_parallel_calls
 
-    def random_generator(self):
-        while True:
-            yield tf.random.uniform((1,), minval=self.min_value, maxval=self.max_value, dtype=tf.dtypes.int32)
+    def get_attack_ids(self, chunk_key):
+        """Draw one chunk of attack ids in [min_value, max_value), keyed only by (seed, chunk_key)"""
+        seed = tf.stack([tf.constant(self.seed, tf.int64), chunk_key])
+        return tf.random.stateless_uniform((self.chunk_size, 1), seed=seed, minval=self.min_value,
+                                           maxval=self.max_value, dtype=tf.dtypes.int32)
 
     def get_data_loader(self):
-        attack_id_loader = tf.data.Dataset.from_generator(
-            self.random_generator,
-            output_types=tf.int32,
-            output_shapes=(1,)
-        )
+        # Chunk keys are redrawn every epoch (iteration) from the seed: epochs differ but runs are reproducible
+        chunk_keys = tf.data.Dataset.random(seed=self.seed, rerandomize_each_iteration=True)
+        attack_id_loader = chunk_keys.map(self.get_attack_ids, num_parallel_calls=self.num_parallel_calls).unbatch()
         return attack_id_loader
@@ -1,4 +1,15 @@
 SEED = 1234
+ATTACK_ID_SEED = SEED + 1  # Separate stream so attack ids are independent of the watermark bits
 
 IMAGE_FORMATS = 'jpg'
+IMAGE_INDEX_SUFFIX = '.index.json'  # File index saved as <image folder>.index.json
+FAST_JPEG_DECODE = False  # Decode one luminance channel at a reduced DCT scale (False = exact RGB path)
+JPEG_DCT_RATIOS = (1, 2, 4)  # Downscale ratios libjpeg may apply while decoding (fast decode only)
 PREFETCH = 1
+PIPELINE_PROFILE = 'autotune'  # One of data_loaders.pipeline_profiles.PIPELINE_PROFILES (see benchmark_data_loader.py)
+
+IMAGE_CACHE_DIR = None  # e.g. 'image_cache/' to decode/resize every image once and reuse it across epochs
+IMAGE_CACHE_SHARD_SIZE = 2048  # Images per uint8 TFRecord shard
+
+MEMMAP_CHUNK_SIZE = 256  # Images sliced out of the memory-mapped training array per read
+RANDOM_CHUNK_SIZE = 256  # Watermarks / attack ids drawn per stateless random op
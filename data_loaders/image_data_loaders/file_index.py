@@ -0,0 +1,118 @@
+import json
+import os
+import struct
+from pathlib import Path
+
+from data_loaders.configs import IMAGE_FORMATS, IMAGE_INDEX_SUFFIX
+
+INDEX_FORMAT_VERSION = 1
+# JPEG start-of-frame markers carry the image dimensions (DHT/JPG/DAC share the 0xC? range but do not)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_jpeg_size(file_path: str):
+    """
+    Read (height, width) from a JPEG header without decoding the image
+
+    Returns:
+        (height, width), or (0, 0) if the file is not a readable JPEG
+    """
+    with open(file_path, 'rb') as image_file:
+        if image_file.read(2) != b'\xff\xd8':
+            return 0, 0
+        while True:
+            if image_file.read(1) != b'\xff':
+                return 0, 0
+            marker = image_file.read(1)
+            while marker == b'\xff':  # Optional fill bytes before the marker code
+                marker = image_file.read(1)
+            if not marker:
+                return 0, 0
+            segment_header = image_file.read(2)
+            if len(segment_header) < 2:
+                return 0, 0
+            segment_length = struct.unpack('>H', segment_header)[0]
+            if marker[0] in JPEG_SOF_MARKERS:
+                frame_header = image_file.read(5)
+                if len(frame_header) < 5:
+                    return 0, 0
+                _, height, width = struct.unpack('>BHH', frame_header)
+                return height, width
+            image_file.seek(segment_length - 2, os.SEEK_CUR)
+
+
+class ImageFileIndex:
+    """
+    Persisted list of the images in a folder with their byte sizes and pixel dimensions.
+
+    Globbing a large folder on network storage is slow, so the listing is built once and saved as JSON next to
+    the folder (``<folder>.index.json``). It is rebuilt automatically when the folder's modification time changes,
+    i.e. when files are added or removed.
+    """
+
+    def __init__(self, base_path: str, images_format=IMAGE_FORMATS, index_path=None):
+        self.base_path = base_path
+        self.images_format = images_format
+        self.index_path = index_path or os.path.normpath(base_path) + IMAGE_INDEX_SUFFIX
+
+    def folder_mtime(self):
+        return os.stat(self.base_path).st_mtime
+
+    def build(self):
+        entries = []
+        for file_path in sorted(map(str, Path(self.base_path).glob(f'*.{self.images_format}'))):
+            height, width = read_jpeg_size(file_path)
+            entries.append({
+                'path': file_path,
+                'size': os.path.getsize(file_path),
+                'height': height,
+                'width': width,
+            })
+        return {
+            'version': INDEX_FORMAT_VERSION,
+            'images_format': self.images_format,
+            'folder_mtime': self.folder_mtime(),
+            'entries': entries,
+        }
+
+    def save(self, index):
+        temporary_index_path = self.index_path + '.tmp'
+        with open(temporary_index_path, 'w') as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary_index_path, self.index_path)
+
+    def load(self):
+        """Return the saved index, or None if it is missing or stale"""
+        if not os.path.exists(self.index_path):
+            return None
+        with open(self.index_path) as index_file:
+            index = json.load(index_file)
+        if index.get('version') != INDEX_FORMAT_VERSION or index.get('images_format') != self.images_format:
+            return None
+        if index.get('folder_mtime') != self.folder_mtime():
+            return None
+        return index
+
+    def get_entries(self):
+        index = self.load()
+        if index is None:
+            index = self.build()
+            try:
+                self.save(index)
+            except OSError:
+                # Read-only storage still works, the listing is just rebuilt every run
+                pass
+        return index['entries']
+
+    def get_file_paths(self, max_images=None, num_shards=1, shard_index=0):
+        """
+        Sorted file paths, truncated to the first ``max_images`` and then split round-robin across shards
+
+        Args:
+            max_images: Number of images to use from the folder (None = all)
+            num_shards: Number of trainers splitting the corpus
+            shard_index: Index of this trainer, in [0, num_shards)
+        """
+        assert 0 <= shard_index < num_shards, 'shard_index must be in [0, num_shards)'
+        file_paths = [entry['path'] for entry in self.get_entries()][:max_images]
+        return file_paths[shard_index::num_shards]
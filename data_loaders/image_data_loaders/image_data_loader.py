@@ -1,38 +1,117 @@
-from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import tensorflow as tf
 
 from data_loaders.base_data_loader import BaseDataLoader
-from data_loaders.configs import IMAGE_FORMATS
+from data_loaders.configs import IMAGE_FORMATS, IMAGE_CACHE_DIR, SEED, FAST_JPEG_DECODE, JPEG_DCT_RATIOS
+from data_loaders.image_data_loaders.file_index import ImageFileIndex
+from data_loaders.image_data_loaders.image_shard_cache import ImageShardCache
 
 
 class ImageDataLoader(BaseDataLoader):
-    def __init__(self, base_path: str, channels: List[int], convert_type=None, images_format=IMAGE_FORMATS):
+    def __init__(self, base_path: str, channels: List[int], convert_type=None, images_format=IMAGE_FORMATS,
+                 image_size: Tuple[int, int] = (256, 256), cache_dir=IMAGE_CACHE_DIR,
+                 num_parallel_calls=4, max_images=None, shuffle_buffer_size=None, num_shards=1, shard_index=0,
+                 seed=SEED, index_path=None, fast_decode=FAST_JPEG_DECODE):
         super(ImageDataLoader, self).__init__()
         self.base_path = base_path
         self.channels = channels
         self.convert_type = convert_type
         self.images_format = images_format
+        self.image_size = tuple(image_size)
+        self.cache_dir = cache_dir
+        self.num_parallel_calls = num_parallel_calls
+        self.max_images = max_images
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.seed = seed
+        self.fast_decode = fast_decode
+        assert not fast_decode or len(channels) == 1, 'fast_decode produces a single luminance channel'
+        self.file_index = ImageFileIndex(base_path, images_format=images_format, index_path=index_path)
 
-    def get_file_paths(self):
-        file_paths = list(map(str, Path(self.base_path).glob(f'*.{self.images_format}')))[:39210] # TODO: Change this number as config
+    @property
+    def image_shape(self):
+        return self.image_size + (len(self.channels),)
+
+    def list_file_paths(self):
+        return self.file_index.get_file_paths(max_images=self.max_images, num_shards=self.num_shards,
+                                              shard_index=self.shard_index)
+
+    def shuffle(self, data_loader: tf.data.Dataset):
+        """Reshuffle every epoch with a bounded buffer (reproducible for a given seed)"""
+        if not self.shuffle_buffer_size:
+            return data_loader
+        return data_loader.shuffle(self.shuffle_buffer_size, seed=self.seed, reshuffle_each_iteration=True)
+
+    def get_file_paths(self, file_paths=None):
+        if file_paths is None:
+            file_paths = self.list_file_paths()
         labels = [0] * len(file_paths)
         tensor_file_paths = tf.data.Dataset.from_tensor_slices((file_paths, labels))
         return tensor_file_paths
 
-    def get_images(self, file_path, label):
+    def decode_reduced_jpeg(self, images):
+        """
+        Decode straight to one luminance channel, letting libjpeg downscale in the DCT domain by the largest
+        ratio in JPEG_DCT_RATIOS that still leaves at least ``image_size`` pixels, so the final resize never
+        upsamples more than the exact path would.
+        """
+        jpeg_shape = tf.image.extract_jpeg_shape(images)
+        ratio_index = tf.constant(0)
+        for index, ratio in enumerate(JPEG_DCT_RATIOS):
+            large_enough = tf.logical_and(jpeg_shape[0] >= ratio * self.image_size[0],
+                                          jpeg_shape[1] >= ratio * self.image_size[1])
+            ratio_index = tf.where(large_enough, index, ratio_index)
+        return tf.switch_case(ratio_index, branch_fns=[
+            lambda ratio=ratio: tf.io.decode_jpeg(images, channels=1, ratio=ratio, dct_method='INTEGER_FAST')
+            for ratio in JPEG_DCT_RATIOS
+        ])
+
+    def decode_image(self, file_path):
+        """Read, decode and resize one image, returning float values in [0, 255]"""
         images = tf.io.read_file(file_path)
+        if self.fast_decode:
+            # Luminance instead of the selected RGB channels, only meaningful for single-channel images
+            resized_images = tf.image.resize(self.decode_reduced_jpeg(images), self.image_size)
+            return tf.reshape(resized_images, self.image_shape)
         decoded_images = tf.image.decode_jpeg(images, channels=3)
-        # Resize to 256x256 first
-        resized_images = tf.image.resize(decoded_images, [256, 256])
-        selected_channels_images = resized_images[:, :, 0]
-        result_images = tf.reshape(selected_channels_images, [256, 256, 1])
+        resized_images = tf.image.resize(decoded_images, self.image_size)
+        selected_channels_images = tf.gather(resized_images, self.channels, axis=-1)
+        return tf.reshape(selected_channels_images, self.image_shape)
+
+    def convert_image(self, image):
         if self.convert_type is not None:
-            result_images = tf.image.convert_image_dtype(result_images, self.convert_type)
-        return result_images
+            image = tf.image.convert_image_dtype(image, self.convert_type)
+        return image
+
+    def get_images(self, file_path, label):
+        return self.convert_image(self.decode_image(file_path))
+
+    def get_cache(self, file_paths):
+        settings = {'channels': list(self.channels), 'resize_method': 'bilinear',
+                    'decode': 'dct_scaled_luminance' if self.fast_decode else 'exact'}
+        return ImageShardCache(self.cache_dir, file_paths, self.image_shape, settings)
+
+    def get_cached_data_loader(self, file_paths):
+        """
+        Stream images from the uint8 shard cache, building it first if it is missing or stale.
+        Cached pixels are rounded to integers, otherwise they match the uncached pipeline.
+        """
+        cache = self.get_cache(file_paths)
+        if not cache.is_complete():
+            decoded_loader = self.get_file_paths(file_paths).map(
+                lambda file_path, label: self.decode_image(file_path), num_parallel_calls=self.num_parallel_calls)
+            cache.write(decoded_loader)
+        cached_loader = cache.read(num_parallel_calls=self.num_parallel_calls,
+                                   shuffle_shards=bool(self.shuffle_buffer_size), seed=self.seed)
+        image_loader = self.shuffle(cached_loader).map(
+            lambda image: self.convert_image(tf.cast(image, tf.float32)), num_parallel_calls=self.num_parallel_calls)
+        return image_loader
 
     def get_data_loader(self):
-        file_paths = self.get_file_paths()
-        image_loader = file_paths.map(self.get_images, num_parallel_calls=4)
+        if self.cache_dir is not None:
+            return self.get_cached_data_loader(self.list_file_paths())
+        file_paths = self.shuffle(self.get_file_paths())
+        image_loader = file_paths.map(self.get_images, num_parallel_calls=self.num_parallel_calls)
         return image_loader
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from typing import List, Tuple
+
+import tensorflow as tf
+
+from data_loaders.configs import IMAGE_CACHE_SHARD_SIZE
+
+CACHE_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+class ImageShardCache:
+    """
+    On-disk cache of preprocessed images stored as uint8 TFRecord shards.
+
+    Every cache lives in its own sub-directory named after a key derived from the source file list and the
+    preprocessing settings, so changing either of them simply points at a new (empty) cache directory.
+    The manifest is written last, which means an interrupted write is never mistaken for a complete cache.
+    """
+
+    def __init__(self, cache_dir: str, file_paths: List[str], image_shape: Tuple[int, int, int], settings: dict,
+                 shard_size: int = IMAGE_CACHE_SHARD_SIZE):
+        self.image_shape = tuple(image_shape)
+        self.shard_size = shard_size
+        self.key = self.cache_key(file_paths, self.image_shape, settings)
+        self.cache_path = os.path.join(cache_dir, self.key)
+        self.manifest_path = os.path.join(self.cache_path, MANIFEST_FILE_NAME)
+
+    @staticmethod
+    def cache_key(file_paths: List[str], image_shape: Tuple[int, int, int], settings: dict):
+        description = json.dumps({
+            'version': CACHE_FORMAT_VERSION,
+            'image_shape': list(image_shape),
+            'settings': settings,
+            'file_paths': list(file_paths),
+        }, sort_keys=True)
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()[:16]
+
+    def is_complete(self):
+        return os.path.exists(self.manifest_path)
+
+    def shard_paths(self):
+        with open(self.manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        return [os.path.join(self.cache_path, shard_name) for shard_name in manifest['shards']]
+
+    def write(self, image_loader: tf.data.Dataset):
+        """
+        Write every image of ``image_loader`` (float values in [0, 255]) to uint8 shards
+
+        Args:
+            image_loader: Dataset of single images with shape ``image_shape``
+        """
+        os.makedirs(self.cache_path, exist_ok=True)
+        shards = []
+        num_images = 0
+        writer = None
+        for image in image_loader:
+            if num_images % self.shard_size == 0:
+                if writer is not None:
+                    writer.close()
+                shards.append(f'shard-{len(shards):05d}.tfrecord')
+                writer = tf.io.TFRecordWriter(os.path.join(self.cache_path, shards[-1]))
+            encoded_image = tf.saturate_cast(tf.round(image), tf.uint8)
+            writer.write(encoded_image.numpy().tobytes())
+            num_images += 1
+        if writer is not None:
+            writer.close()
+
+        temporary_manifest_path = self.manifest_path + '.tmp'
+        with open(temporary_manifest_path, 'w') as manifest_file:
+            json.dump({
+                'key': self.key,
+                'image_shape': list(self.image_shape),
+                'num_images': num_images,
+                'shards': shards,
+            }, manifest_file, indent=2)
+        os.replace(temporary_manifest_path, self.manifest_path)
+
+    def decode_record(self, record):
+        image = tf.io.decode_raw(record, tf.uint8)
+        return tf.reshape(image, self.image_shape)
+
+    def read(self, num_parallel_calls=4, shuffle_shards=False, seed=None):
+        """Stream the cached uint8 images back, in file order unless ``shuffle_shards`` is set"""
+        shard_paths = self.shard_paths()
+        shard_loader = tf.data.Dataset.from_tensor_slices(tf.constant(shard_paths, dtype=tf.string))
+        if shuffle_shards:
+            shard_loader = shard_loader.shuffle(len(shard_paths), seed=seed, reshuffle_each_iteration=True)
+        record_loader = shard_loader.flat_map(tf.data.TFRecordDataset)
+        return record_loader.map(self.decode_record, num_parallel_calls=num_parallel_calls)
@@ -0,0 +1,91 @@
+import numpy as np
+import tensorflow as tf
+
+from data_loaders.base_data_loader import BaseDataLoader
+from data_loaders.configs import MEMMAP_CHUNK_SIZE, SEED
+
+
+class MemmapImageDataLoader(BaseDataLoader):
+    """
+    Streams images from one memory-mapped uint8 ``.npy`` array of shape (N, height, width, channels).
+
+    Chunks are plain slices of the mapped file, so there is no per-image file access or JPEG decoding and
+    every process reading the same file shares the page cache. The float conversion happens in the graph.
+
+    Subsetting and sharding follow ImageFileIndex.get_file_paths: the first ``max_images`` images, split
+    round-robin across ``num_shards`` trainers. With a shuffle buffer the chunk order and the images are
+    reshuffled every epoch, like the shard cache of ImageDataLoader.
+    """
+
+    def __init__(self, memmap_path: str, convert_type=None, chunk_size=MEMMAP_CHUNK_SIZE, num_parallel_calls=4,
+                 max_images=None, shuffle_buffer_size=None, num_shards=1, shard_index=0, seed=SEED):
+        super(MemmapImageDataLoader, self).__init__()
+        self.memmap_path = memmap_path
+        self.convert_type = convert_type
+        self.chunk_size = chunk_size
+        self.num_parallel_calls = num_parallel_calls
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.images = np.load(memmap_path, mmap_mode='r')
+        assert self.images.ndim == 4 and self.images.dtype == np.uint8, 'expected a uint8 (N, H, W, C) array'
+        assert 0 <= shard_index < num_shards, 'shard_index must be in [0, num_shards)'
+        # Rows of the array read by this trainer, in order
+        self.indices = np.arange(len(self.images))[:max_images][shard_index::num_shards]
+
+    @property
+    def image_shape(self):
+        return self.images.shape[1:]
+
+    def read_chunk(self, start):
+        rows = self.indices[start:start + self.chunk_size]
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+            # Contiguous rows (no sharding): one slice of the mapped file
+            return np.asarray(self.images[rows[0]:rows[-1] + 1])
+        return self.images[rows]
+
+    def get_chunk(self, start):
+        chunk = tf.numpy_function(self.read_chunk, [start], tf.uint8)
+        chunk.set_shape((None,) + self.image_shape)
+        return chunk
+
+    def convert_image(self, image):
+        image = tf.cast(image, tf.float32)
+        if self.convert_type is not None:
+            image = tf.image.convert_image_dtype(image, self.convert_type)
+        return image
+
+    def get_data_loader(self):
+        chunk_starts = tf.data.Dataset.range(0, len(self.indices), self.chunk_size)
+        if self.shuffle_buffer_size:
+            num_chunks = -(-len(self.indices) // self.chunk_size)
+            chunk_starts = chunk_starts.shuffle(max(num_chunks, 1), seed=self.seed, reshuffle_each_iteration=True)
+        image_loader = chunk_starts.map(self.get_chunk).unbatch()
+        if self.shuffle_buffer_size:
+            image_loader = image_loader.shuffle(self.shuffle_buffer_size, seed=self.seed,
+                                                reshuffle_each_iteration=True)
+        image_loader = image_loader.map(self.convert_image, num_parallel_calls=self.num_parallel_calls)
+        return image_loader
+
+
+def pack_images(image_loader: tf.data.Dataset, num_images: int, image_shape, output_path: str):
+    """
+    Write decoded images (float values in [0, 255]) into a uint8 ``.npy`` file that can be memory-mapped
+
+    Args:
+        image_loader: Dataset of single decoded images, e.g. ``ImageDataLoader.decode_image`` outputs
+        num_images: Number of images in ``image_loader``
+        image_shape: Shape of one image (height, width, channels)
+        output_path: Destination ``.npy`` path
+
+    Returns:
+        Number of images written
+    """
+    packed_images = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.uint8,
+                                              shape=(num_images,) + tuple(image_shape))
+    index = 0
+    for image in image_loader:
+        packed_images[index] = tf.saturate_cast(tf.round(image), tf.uint8).numpy()
+        index += 1
+    packed_images.flush()
+    del packed_images
+    return index
@@ -4,31 +4,61 @@ import tensorflow as tf
 
 from data_loaders.attack_id_data_loader.attack_id_data_loader import AttackIdDataLoader
 from data_loaders.base_data_loader import BaseDataLoader
-from data_loaders.configs import PREFETCH
+from data_loaders.configs import IMAGE_CACHE_DIR, PIPELINE_PROFILE, FAST_JPEG_DECODE
 from data_loaders.image_data_loaders.image_data_loader import ImageDataLoader
+from data_loaders.image_data_loaders.memmap_image_data_loader import MemmapImageDataLoader
+from data_loaders.pipeline_profiles import get_pipeline_profile
 from data_loaders.watermark_data_loaders.watermark_data_loader import WatermarkDataLoader
 
 
 class MergedDataLoader(BaseDataLoader):
     def __init__(self, image_base_path: str, image_channels: List[int], image_convert_type, watermark_size: Tuple[int],
-                 attack_min_id: int, attack_max_id: int, batch_size: int, prefetch=PREFETCH):
+                 attack_min_id: int, attack_max_id: int, batch_size: int, prefetch=None,
+                 image_cache_dir=IMAGE_CACHE_DIR, image_memmap_path=None, profile=PIPELINE_PROFILE,
+                 image_max_count=None, shuffle_buffer_size=None, num_shards=1, shard_index=0,
+                 image_fast_decode=FAST_JPEG_DECODE):
         super(MergedDataLoader, self).__init__()
-        self.image_data_loader = ImageDataLoader(base_path=image_base_path, channels=image_channels,
-                                                 convert_type=image_convert_type).get_data_loader()
-        self.watermark_data_loader = WatermarkDataLoader(watermark_size=watermark_size).get_data_loader()
-        self.attack_id_data_loader = AttackIdDataLoader(min_value=attack_min_id,
-                                                        max_value=attack_max_id).get_data_loader()
+        self.profile = get_pipeline_profile(profile)
+        num_parallel_calls = self.profile.num_parallel_calls
+        if image_memmap_path is not None:
+            self.image_data_loader = MemmapImageDataLoader(memmap_path=image_memmap_path,
+                                                           convert_type=image_convert_type,
+                                                           num_parallel_calls=num_parallel_calls,
+                                                           max_images=image_max_count,
+                                                           shuffle_buffer_size=shuffle_buffer_size,
+                                                           num_shards=num_shards,
+                                                           shard_index=shard_index).get_data_loader()
+        else:
+            self.image_data_loader = ImageDataLoader(base_path=image_base_path, channels=image_channels,
+                                                     convert_type=image_convert_type,
+                                                     cache_dir=image_cache_dir,
+                                                     num_parallel_calls=num_parallel_calls,
+                                                     max_images=image_max_count,
+                                                     shuffle_buffer_size=shuffle_buffer_size,
+                                                     num_shards=num_shards,
+                                                     shard_index=shard_index,
+                                                     fast_decode=image_fast_decode).get_data_loader()
+        self.watermark_data_loader = WatermarkDataLoader(watermark_size=watermark_size,
+                                                         num_parallel_calls=num_parallel_calls).get_data_loader()
+        self.attack_id_data_loader = AttackIdDataLoader(min_value=attack_min_id, max_value=attack_max_id,
+                                                        num_parallel_calls=num_parallel_calls).get_data_loader()
         self.batch_size = batch_size
-        self.prefetch = prefetch
+        self.prefetch = self.profile.prefetch if prefetch is None else prefetch
+
+    @staticmethod
+    def split_inputs_outputs(image, watermark, attack_id):
+        return (image, watermark, attack_id), (image, watermark)
 
     def get_data_loader(self):
-        input_data_loader = tf.data.Dataset.zip((
+        # Each source is iterated once and the same sample feeds both inputs and targets
+        merged_data_loader = tf.data.Dataset.zip((
             self.image_data_loader,
             self.watermark_data_loader,
             self.attack_id_data_loader,
         ))
-        output_data_loader = tf.data.Dataset.zip((self.image_data_loader, self.watermark_data_loader))
-        merged_data_loader = tf.data.Dataset.zip((input_data_loader, output_data_loader))
-        merged_data_loader = merged_data_loader.batch(self.batch_size)
+        merged_data_loader = merged_data_loader.map(self.split_inputs_outputs)
+        merged_data_loader = merged_data_loader.batch(self.batch_size, num_parallel_calls=self.profile.num_parallel_calls,
+                                                      deterministic=self.profile.deterministic)
         merged_data_loader = merged_data_loader.prefetch(self.prefetch)
+        merged_data_loader = merged_data_loader.with_options(self.profile.get_options())
         return merged_data_loader
@@ -0,0 +1,58 @@
+import os
+
+import tensorflow as tf
+
+from data_loaders.configs import PREFETCH, PIPELINE_PROFILE
+
+
+class PipelineProfile:
+    """
+    tf.data tuning settings applied to every stage of the training input pipeline
+
+    Args:
+        num_parallel_calls: Parallelism of every ``map`` (``tf.data.AUTOTUNE`` lets tf.data pick it)
+        prefetch: Number of batches prepared ahead of the training step
+        deterministic: Keep element order fixed; ``False`` lets faster elements overtake slower ones
+        private_threadpool_size: Size of a thread pool dedicated to this pipeline (``None`` = shared pool)
+        max_intra_op_parallelism: Threads a single op may use inside the pipeline (``None`` = TF default)
+        map_parallelization: Let tf.data parallelize stateless maps automatically
+    """
+
+    def __init__(self, num_parallel_calls=4, prefetch=PREFETCH, deterministic=True, private_threadpool_size=None,
+                 max_intra_op_parallelism=None, map_parallelization=False):
+        self.num_parallel_calls = num_parallel_calls
+        self.prefetch = prefetch
+        self.deterministic = deterministic
+        self.private_threadpool_size = private_threadpool_size
+        self.max_intra_op_parallelism = max_intra_op_parallelism
+        self.map_parallelization = map_parallelization
+
+    def get_options(self):
+        options = tf.data.Options()
+        options.deterministic = self.deterministic
+        options.experimental_optimization.map_parallelization = self.map_parallelization
+        if self.private_threadpool_size is not None:
+            options.threading.private_threadpool_size = self.private_threadpool_size
+        if self.max_intra_op_parallelism is not None:
+            options.threading.max_intra_op_parallelism = self.max_intra_op_parallelism
+        return options
+
+
+PIPELINE_PROFILES = {
+    # Settings used before profiles existed
+    'default': PipelineProfile(),
+    # Let tf.data size the parallelism and prefetch buffer for the current machine
+    'autotune': PipelineProfile(num_parallel_calls=tf.data.AUTOTUNE, prefetch=tf.data.AUTOTUNE),
+    # Trade element order for throughput on many-core training boxes
+    'throughput': PipelineProfile(num_parallel_calls=tf.data.AUTOTUNE, prefetch=tf.data.AUTOTUNE, deterministic=False,
+                                  private_threadpool_size=os.cpu_count(), max_intra_op_parallelism=1,
+                                  map_parallelization=True),
+}
+
+
+def get_pipeline_profile(profile=PIPELINE_PROFILE):
+    """Return a PipelineProfile from its name in PIPELINE_PROFILES, or the profile itself"""
+    if isinstance(profile, PipelineProfile):
+        return profile
+    assert profile in PIPELINE_PROFILES, f'unknown pipeline profile: {profile}'
+    return PIPELINE_PROFILES[profile]
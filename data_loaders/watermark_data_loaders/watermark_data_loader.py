@@ -1,26 +1,27 @@
 import tensorflow as tf
 
 from data_loaders.base_data_loader import BaseDataLoader
-from data_loaders.configs import SEED
+from data_loaders.configs import SEED, RANDOM_CHUNK_SIZE
 
 
 class WatermarkDataLoader(BaseDataLoader):
-    def __init__(self, watermark_size, seed=SEED):
+    def __init__(self, watermark_size, seed=SEED, chunk_size=RANDOM_CHUNK_SIZE, num_parallel_calls=4):
         super(WatermarkDataLoader, self).__init__()
         self.watermark_size = watermark_size
         self.seed = seed
+        self.chunk_size = chunk_size
+        self.num_parallel_calls = num_parallel_calls
 
-    def watermark_generator(self):
-        generator = tf.random.Generator.from_seed(self.seed)
-        while True:
-            yield tf.round(
-                generator.uniform(self.watermark_size, 0, 1, dtype=tf.dtypes.float32)
-            )
+    def get_watermarks(self, chunk_key):
+        """Draw one chunk of random bit watermarks, keyed only by (seed, chunk_key)"""
+        seed = tf.stack([tf.constant(self.seed, tf.int64), chunk_key])
+        return tf.round(
+            tf.random.stateless_uniform((self.chunk_size,) + tuple(self.watermark_size), seed=seed,
+                                        minval=0, maxval=1, dtype=tf.dtypes.float32)
+        )
 
     def get_data_loader(self):
-        watermark_loader = tf.data.Dataset.from_generator(
-            self.watermark_generator,
-            output_types=tf.float32,
-            output_shapes=self.watermark_size
-        )
+        # Chunk keys are redrawn every epoch (iteration) from the seed: epochs differ but runs are reproducible
+        chunk_keys = tf.data.Dataset.random(seed=self.seed, rerandomize_each_iteration=True)
+        watermark_loader = chunk_keys.map(self.get_watermarks, num_parallel_calls=self.num_parallel_calls).unbatch()
         return watermark_loader
@@ -21,7 +21,8 @@ from utils.metrics import calculate_psnr, calculate_ssim, calculate_ber
 def load_model(weights_path):
     """Load trained model"""
     print(f"Loading model from: {weights_path}")
-    model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE).get_model()
+    model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE,
+                        mixed_precision=MIXED_PRECISION).get_model()
     model.load_weights(weights_path)
     print("Model loaded successfully!")
     return model
@@ -51,17 +52,17 @@ def embed_watermark(model, image, watermark, attack_id=0):
         model: Trained model
         image: Input image (256x256x1)
         watermark: Watermark bits (256,)
-        attack_id: Attack to simulate (0=no attack)
+        attack_id: Attack to simulate between embedding and extraction (0=no attack)
     
     Returns:
         watermarked_image, extracted_watermark
     """
     image_batch = np.expand_dims(image, axis=0)
     watermark_batch = np.expand_dims(watermark, axis=0)
-    # Note: attack_id not used in model - attacks applied externally if needed
+    attack_id_batch = np.array([[attack_id]], dtype=np.int32)
     
     watermarked_image, extracted_watermark = model.predict(
-        [image_batch, watermark_batch],
+        [image_batch, watermark_batch, attack_id_batch],
         verbose=0
     )
     
@@ -73,7 +74,7 @@ def main():
     print("="*80)
     
     # Load model
-    model_path = os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.h5')
+    model_path = os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5')
     if not os.path.exists(model_path):
         print(f"\nError: Model not found at {model_path}")
         print("Please train the model first!")
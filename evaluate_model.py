@@ -12,17 +12,19 @@ if script_dir not in sys.path:
 if os.getcwd() not in sys.path:
     sys.path.insert(0, os.getcwd())
 
-import tensorflow as tf
+# TensorFlow is only imported when the evaluator is created: the codec attack workers re-import this script
+import argparse
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 import json
 from datetime import datetime
 from configs import *
-from models.wavetf_model import WaveTFModel
-from utils.metrics import calculate_psnr, calculate_ssim, calculate_ber, evaluate_quality
+from evaluation.attack_bench import AttackBench
+from evaluation.embedding_cache import EmbeddingCache
 import cv2
 
-# Attack names mapping
+# Attack names mapping (codec attacks from evaluation/attack_bench.py are keyed by their names)
 ATTACK_NAMES = {
     0: "No Attack (Baseline)",
     1: "Combined Attack (2-3 Random)",
@@ -33,14 +35,34 @@ ATTACK_NAMES = {
     6: "Salt & Pepper Noise"
 }
 
+# Per (image, attack) fields kept for the report, the image arrays are only used for visualizations
+RESULT_FIELDS = ('image_name', 'attack_id', 'attack_name', 'psnr', 'ssim', 'ber', 'quality')
+
 class WatermarkEvaluator:
-    def __init__(self, model_weights_path):
+    def __init__(self, model_weights_path, batch_size=32, cache_mb=EVALUATION_CACHE_MB, codec_attacks=True,
+                 num_workers=None):
         """Initialize evaluator with trained model"""
+        from models.wavetf_model import WaveTFModel
+        from evaluation.engine import EvaluationEngine, model_attacks
+        
         print("Loading model...")
-        self.model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE).get_model()
+        self.wavetf_model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE,
+                                        mixed_precision=MIXED_PRECISION)
+        self.model = self.wavetf_model.get_model()
         self.model.load_weights(model_weights_path)
         print(f"Model loaded from: {model_weights_path}")
         
+        # The attack layers run on the embedded batch in this process, codec round trips on a process pool
+        attacks = model_attacks(self.wavetf_model)
+        self.attack_bench = AttackBench(num_workers) if codec_attacks else None
+        if self.attack_bench is not None:
+            attacks.update(self.attack_bench.attacks())
+        
+        # Embeds every image once into the cache, then runs all attacks and extractions in batches
+        self.cache = EmbeddingCache(max_bytes=cache_mb * 1024 ** 2)
+        self.engine = EvaluationEngine(self.wavetf_model.get_embedder(), self.wavetf_model.get_extractor(),
+                                       attacks, IMAGE_SIZE, WATERMARK_SIZE, batch_size=batch_size, cache=self.cache)
+        
         # Create output directory for results
         self.output_dir = os.path.join(MODEL_OUTPUT_PATH, 'evaluation_results')
         os.makedirs(self.output_dir, exist_ok=True)
@@ -71,41 +93,6 @@ class WatermarkEvaluator:
         """Generate random watermark"""
         return np.random.randint(0, 2, size=WATERMARK_SIZE).astype(np.float32)
     
-    def evaluate_single_image(self, image, watermark, attack_id, image_name):
-        """Evaluate single image with specific attack"""
-        # Prepare inputs
-        image_batch = np.expand_dims(image, axis=0)
-        watermark_batch = np.expand_dims(watermark, axis=0)
-        # Note: attack_id not used in model - attacks applied externally if needed
-        
-        # Get predictions
-        watermarked_image, extracted_watermark = self.model.predict(
-            [image_batch, watermark_batch],
-            verbose=0
-        )
-        
-        # Calculate metrics
-        psnr = calculate_psnr(image_batch, watermarked_image)
-        ssim = calculate_ssim(image_batch, watermarked_image)
-        ber = calculate_ber(watermark_batch, extracted_watermark)
-        quality = evaluate_quality(psnr, ssim, ber)
-        
-        result = {
-            'image_name': image_name,
-            'attack_id': attack_id,
-            'attack_name': ATTACK_NAMES[attack_id],
-            'psnr': float(psnr),
-            'ssim': float(ssim),
-            'ber': float(ber),
-            'quality': quality,
-            'original_image': image,
-            'watermarked_image': watermarked_image[0],
-            'watermark': watermark,
-            'extracted_watermark': extracted_watermark[0]
-        }
-        
-        return result
-    
     def visualize_result(self, result, save_path):
         """Create before/after visualization with metrics"""
         fig, axes = plt.subplots(2, 3, figsize=(15, 10))
@@ -118,7 +105,7 @@ class WatermarkEvaluator:
         axes[0, 0].axis('off')
         
         # Watermarked Image
-        axes[0, 1].imshow(result['watermarked_image'].squeeze(), cmap='gray')
+        axes[0, 1].imshow(result['attacked_image'].squeeze(), cmap='gray')
         axes[0, 1].set_title('Watermarked Image (After Attack)', fontsize=12, fontweight='bold')
         axes[0, 1].axis('off')
         
@@ -166,62 +153,54 @@ Overall Quality:
         
         print(f"  Saved visualization: {save_path}")
     
-    def evaluate_all_attacks(self, num_images=3):
+    def record_result(self, result, visualize_images):
+        """Keep the metrics of one (image, attack) pair and visualize it for the first visualize_images images"""
+        result['attack_name'] = ATTACK_NAMES.get(result['attack_id'], result['attack_id'])
+        self.results.append({field: result[field] for field in RESULT_FIELDS})
+        if result['image_index'] >= visualize_images:
+            return
+        
+        print(f"  {result['image_name']} | {result['attack_name']}: PSNR: {result['psnr']:.2f} dB | "
+              f"SSIM: {result['ssim']:.4f} | BER: {result['ber']:.2f}% | Quality: {result['quality']}")
+        safe_attack_name = result['attack_name'].replace(' ', '_').replace('(', '').replace(')', '')
+        safe_image_name = os.path.splitext(result['image_name'])[0]
+        viz_path = os.path.join(self.output_dir, 'images', 
+                               f"{safe_image_name}_{safe_attack_name}.png")
+        self.visualize_result(result, viz_path)
+    
+    def evaluate_all_attacks(self, num_images=3, visualize_images=3):
         """Evaluate all attack types on test images"""
         print("\n" + "="*80)
         print("COMPREHENSIVE EVALUATION")
         print("="*80)
         
         images = self.load_test_images(num_images)
+        image_array = np.stack([image for image, _ in images])
+        image_names = [image_name for _, image_name in images]
+        watermarks = np.stack([self.generate_watermark() for _ in images])
         
-        total_tests = len(images) * len(ATTACK_NAMES)
-        current_test = 0
-        
-        for image, image_name in images:
-            print(f"\n{'='*80}")
-            print(f"Evaluating: {image_name}")
-            print(f"{'='*80}")
-            
-            watermark = self.generate_watermark()
-            
-            for attack_id in range(len(ATTACK_NAMES)):
-                current_test += 1
-                print(f"\n[{current_test}/{total_tests}] Testing {ATTACK_NAMES[attack_id]}...")
-                
-                result = self.evaluate_single_image(image, watermark, attack_id, image_name)
-                self.results.append(result)
-                
-                # Print metrics
-                print(f"  PSNR: {result['psnr']:.2f} dB | SSIM: {result['ssim']:.4f} | BER: {result['ber']:.2f}% | Quality: {result['quality']}")
-                
-                # Save visualization
-                safe_attack_name = result['attack_name'].replace(' ', '_').replace('(', '').replace(')', '')
-                safe_image_name = os.path.splitext(image_name)[0]
-                viz_path = os.path.join(self.output_dir, 'images', 
-                                       f"{safe_image_name}_{safe_attack_name}.png")
-                self.visualize_result(result, viz_path)
+        print(f"\nEvaluating {len(images)} images x {len(self.engine.attacks)} attacks "
+              f"in batches of {self.engine.batch_size} images...")
+        start_time = time.perf_counter()
+        self.engine.evaluate(image_array, watermarks, image_names,
+                             on_result=lambda result: self.record_result(result, visualize_images))
         
         print(f"\n{'='*80}")
-        print("Evaluation Complete!")
+        print(f"Evaluation Complete! ({len(self.results)} tests in {time.perf_counter() - start_time:.1f}s)")
         print(f"{'='*80}")
+        cache_stats = self.cache.statistics()
+        print(f"Embedding cache: {cache_stats['entries']} images ({cache_stats['memory_mb']:.0f} MB in memory, "
+              f"{cache_stats['spilled']} spilled to disk)")
     
     def generate_summary_report(self):
         """Generate summary statistics and report"""
         print("\n" + "="*80)
         print("GENERATING SUMMARY REPORT")
         print("="*80)
+        from evaluation.engine import finite_or_none
         
-        # Calculate average metrics per attack type
-        attack_stats = {}
-        for attack_id in range(len(ATTACK_NAMES)):
-            attack_results = [r for r in self.results if r['attack_id'] == attack_id]
-            if attack_results:
-                attack_stats[ATTACK_NAMES[attack_id]] = {
-                    'avg_psnr': np.mean([r['psnr'] for r in attack_results]),
-                    'avg_ssim': np.mean([r['ssim'] for r in attack_results]),
-                    'avg_ber': np.mean([r['ber'] for r in attack_results]),
-                    'count': len(attack_results)
-                }
+        # Average metrics per attack type, streamed by the evaluation engine
+        attack_stats = self.engine.attack_statistics(ATTACK_NAMES)
         
         # Create summary visualization
         fig, axes = plt.subplots(1, 3, figsize=(18, 5))
@@ -284,7 +263,7 @@ Overall Quality:
                 {
                     'image_name': r['image_name'],
                     'attack_name': r['attack_name'],
-                    'psnr': r['psnr'],
+                    'psnr': finite_or_none(r['psnr']),
                     'ssim': r['ssim'],
                     'ber': r['ber'],
                     'quality': r['quality']
@@ -295,7 +274,7 @@ Overall Quality:
         
         report_path = os.path.join(self.output_dir, 'evaluation_report.json')
         with open(report_path, 'w') as f:
-            json.dump(report, f, indent=2)
+            json.dump(report, f, indent=2, allow_nan=False)
         
         print(f"Detailed report saved: {report_path}")
         
@@ -315,26 +294,46 @@ Overall Quality:
         print("="*80)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Watermark evaluation')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--num-images', type=int, default=3, help='Test images to evaluate')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images embedded per batch')
+    parser.add_argument('--visualize-images', type=int, default=3, help='Images to save visualizations for')
+    parser.add_argument('--cache-mb', type=int, default=EVALUATION_CACHE_MB,
+                        help='Memory for embedded images, the rest spills to disk')
+    parser.add_argument('--no-codec-attacks', action='store_true',
+                        help='Only run the attack layers, skip the cv2 JPEG/WebP/resize/crop round trips')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for the codec attacks (default: all cores)')
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     print("="*80)
     print("WATERMARK EVALUATION SYSTEM")
     print("="*80)
     
     # Check if model exists
-    model_path = os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.h5')
+    model_path = args.weights
     if not os.path.exists(model_path):
         print(f"\nError: Model weights not found at {model_path}")
         print("Please train the model first using trainer.py or trainer_with_logging.py")
         exit(1)
     
     # Create evaluator
-    evaluator = WatermarkEvaluator(model_path)
+    evaluator = WatermarkEvaluator(model_path, batch_size=args.batch_size, cache_mb=args.cache_mb,
+                                   codec_attacks=not args.no_codec_attacks, num_workers=args.workers)
     
     # Run evaluation
-    evaluator.evaluate_all_attacks(num_images=3)
+    evaluator.evaluate_all_attacks(num_images=args.num_images, visualize_images=args.visualize_images)
     
     # Generate summary
     evaluator.generate_summary_report()
+    evaluator.cache.close()
+    if evaluator.attack_bench is not None:
+        evaluator.attack_bench.close()
     
     print("\n✓ Evaluation complete!")
     print(f"✓ Check {evaluator.output_dir} for all results")
@@ -0,0 +1 @@
+"""Evaluation module for watermarking system"""
@@ -0,0 +1,143 @@
+"""
+Attacks applied outside the model to batches of embedded images: real codec round trips and geometric attacks
+The attack functions only need numpy and cv2, so they run on a process pool next to the TensorFlow evaluation.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+
+def to_uint8(image):
+    return np.clip(np.rint(np.asarray(image, dtype=np.float32) * 255.0), 0, 255).astype(np.uint8)
+
+
+def from_uint8(image, shape):
+    return (image.astype(np.float32) / 255.0).reshape(shape)
+
+
+def codec_round_trip(images, extension, parameters):
+    """Encode every image of the batch (values in [0, 1]) with cv2 and decode it back"""
+    outputs = np.empty(images.shape, np.float32)
+    # WebP always decodes to color unless grayscale is requested
+    read_flag = cv2.IMREAD_GRAYSCALE if images.shape[-1] == 1 else cv2.IMREAD_COLOR
+    for index, image in enumerate(images):
+        encoded_ok, encoded = cv2.imencode(extension, to_uint8(image), parameters)
+        if not encoded_ok:
+            raise RuntimeError(f'cv2 could not encode {extension}')
+        outputs[index] = from_uint8(cv2.imdecode(encoded, read_flag), image.shape)
+    return outputs
+
+
+def jpeg_round_trip(images, quality):
+    return codec_round_trip(images, '.jpg', [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+
+
+def webp_round_trip(images, quality):
+    return codec_round_trip(images, '.webp', [cv2.IMWRITE_WEBP_QUALITY, int(quality)])
+
+
+def resize_round_trip(images, scale):
+    """Downscale by ``scale`` (area averaging) and upscale back to the original size (bilinear)"""
+    outputs = np.empty(images.shape, np.float32)
+    height, width = images.shape[1:3]
+    small_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    for index, image in enumerate(images):
+        small = cv2.resize(image, small_size, interpolation=cv2.INTER_AREA)
+        outputs[index] = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR).reshape(image.shape)
+    return outputs
+
+
+def crop_resize(images, fraction):
+    """Crop ``fraction`` of every edge and resize the centre back to the original size"""
+    outputs = np.empty(images.shape, np.float32)
+    height, width = images.shape[1:3]
+    crop_height, crop_width = int(height * fraction), int(width * fraction)
+    for index, image in enumerate(images):
+        centre = image[crop_height:height - crop_height, crop_width:width - crop_width]
+        outputs[index] = cv2.resize(centre, (width, height), interpolation=cv2.INTER_LINEAR).reshape(image.shape)
+    return outputs
+
+
+# Attack name -> picklable function on a numpy batch (batch, height, width, channels) in [0, 1]
+CODEC_ATTACKS = {
+    'JPEG Q90 (codec)': partial(jpeg_round_trip, quality=90),
+    'JPEG Q70 (codec)': partial(jpeg_round_trip, quality=70),
+    'JPEG Q50 (codec)': partial(jpeg_round_trip, quality=50),
+    'JPEG Q30 (codec)': partial(jpeg_round_trip, quality=30),
+    'WebP Q80 (codec)': partial(webp_round_trip, quality=80),
+    'WebP Q50 (codec)': partial(webp_round_trip, quality=50),
+    'WebP Q20 (codec)': partial(webp_round_trip, quality=20),
+    'Resize 75%': partial(resize_round_trip, scale=0.75),
+    'Resize 50%': partial(resize_round_trip, scale=0.5),
+    'Crop 10% + Resize': partial(crop_resize, fraction=0.1),
+}
+
+
+def initialize_worker():
+    # Parallelism comes from the pool, not from cv2's own thread pool
+    cv2.setNumThreads(1)
+
+
+class PendingAttack:
+    """Chunks of one attacked batch still running on the pool"""
+
+    def __init__(self, futures):
+        self.futures = futures
+
+    def result(self):
+        return np.concatenate([future.result() for future in self.futures])
+
+
+class PoolAttack:
+    """
+    Numpy attack function run on an AttackBench process pool
+
+    The batch is split into one chunk per worker. submit() returns immediately, so the evaluation engine submits
+    every pool attack before it runs the TensorFlow ones; calling the attack waits for the result.
+    """
+
+    def __init__(self, function, bench):
+        self.function = function
+        self.bench = bench
+
+    def submit(self, images):
+        images = np.asarray(images, dtype=np.float32)
+        chunk_size = -(-len(images) // self.bench.num_workers)
+        return PendingAttack([self.bench.executor.submit(self.function, images[start:start + chunk_size])
+                              for start in range(0, len(images), chunk_size)])
+
+    def __call__(self, images):
+        return self.submit(images).result()
+
+
+class AttackBench:
+    """
+    Process pool running attacks outside the model
+
+    Workers are spawned, since a process running TensorFlow is not safe to fork, and start on the first attack.
+    Spawned workers re-import the main script, so scripts using the bench import TensorFlow inside functions
+    (see evaluate_model.py, robustness_sweep.py) to keep every worker to numpy and cv2. Close the bench, or use
+    it as a context manager, to stop the workers.
+    """
+
+    def __init__(self, num_workers=None):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.executor = ProcessPoolExecutor(self.num_workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=initialize_worker)
+
+    def attacks(self, functions=None):
+        """Attack name -> PoolAttack for every function of ``functions`` (default: CODEC_ATTACKS)"""
+        functions = CODEC_ATTACKS if functions is None else functions
+        return {name: PoolAttack(function, self) for name, function in functions.items()}
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
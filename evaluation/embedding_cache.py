@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+def cache_key(image, watermark):
+    """Key of an embedded image: hash of the original image and of the watermark embedded into it"""
+    digest = hashlib.sha1(np.ascontiguousarray(image, dtype=np.float32).tobytes())
+    digest.update(np.ascontiguousarray(watermark, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of embedded images (embedded image, PSNR, SSIM) keyed by cache_key
+
+    Entries stay in memory up to ``max_bytes``; the least recently used ones are then written to ``spill_dir``
+    once and read from there on their next accesses. A spilled entry is promoted back to memory only when it fits
+    without evicting anything, and its file is kept, so repeated sweeps over more images than fit in memory read
+    the spill files instead of rewriting them. With ``spill=False`` evicted entries are dropped and embedded again
+    when needed.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, spill_dir=None, spill=True):
+        """
+        Args:
+            max_bytes: Memory budget of the cached arrays
+            spill_dir: Directory for spilled entries (default: a temporary directory removed by close())
+            spill: False to drop evicted entries instead of spilling them
+        """
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.owns_spill_dir = spill and spill_dir is None
+        self.spill_dir = tempfile.mkdtemp(prefix='embedding_cache_') if self.owns_spill_dir else spill_dir
+        if self.spill:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        # Key -> spill file, also for entries promoted back to memory
+        self.spilled = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spills = 0
+
+    @staticmethod
+    def entry_bytes(entry):
+        return sum(np.asarray(value).nbytes for value in entry)
+
+    def spill_path(self, key):
+        return os.path.join(self.spill_dir, key + '.npz')
+
+    def evict(self):
+        while self.memory_bytes > self.max_bytes and len(self.memory) > 1:
+            key, entry = self.memory.popitem(last=False)
+            self.memory_bytes -= self.entry_bytes(entry)
+            if self.spill and key not in self.spilled:
+                path = self.spill_path(key)
+                np.savez(path, *entry)
+                self.spilled[key] = path
+                self.spills += 1
+
+    def put(self, key, entry):
+        """Store ``entry``, a tuple of arrays (embedded image, psnr, ssim)"""
+        entry = tuple(np.array(value) for value in entry)
+        if key in self.memory:
+            self.memory_bytes -= self.entry_bytes(self.memory.pop(key))
+        self.remove_spill_file(key)
+        self.memory[key] = entry
+        self.memory_bytes += self.entry_bytes(entry)
+        self.evict()
+
+    def remove_spill_file(self, key):
+        path = self.spilled.pop(key, None)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def get(self, key):
+        """The cached entry or None; spilled entries are promoted to memory only if they fit in the budget"""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if key in self.spilled:
+            with np.load(self.spilled[key]) as arrays:
+                entry = tuple(arrays[f'arr_{index}'] for index in range(len(arrays.files)))
+            self.disk_hits += 1
+            entry_bytes = self.entry_bytes(entry)
+            if self.memory_bytes + entry_bytes <= self.max_bytes:
+                self.memory[key] = entry
+                self.memory_bytes += entry_bytes
+            return entry
+        self.misses += 1
+        return None
+
+    def __contains__(self, key):
+        return key in self.memory or key in self.spilled
+
+    def __len__(self):
+        return len(self.spilled) + sum(1 for key in self.memory if key not in self.spilled)
+
+    def statistics(self):
+        return {
+            'entries': len(self),
+            'in_memory': len(self.memory),
+            'memory_mb': self.memory_bytes / 1024 ** 2,
+            'spilled': len(self.spilled),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'spills': self.spills,
+        }
+
+    def clear(self):
+        for key in list(self.spilled):
+            self.remove_spill_file(key)
+        self.memory.clear()
+        self.memory_bytes = 0
+
+    def close(self):
+        self.clear()
+        if self.owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
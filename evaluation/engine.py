@@ -0,0 +1,217 @@
+import time
+from typing import Callable, Dict, Hashable, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from attacks.salt_pepper_attack import SaltPepperAttack
+from evaluation.embedding_cache import EmbeddingCache, cache_key
+from utils.metrics import METRIC_RANGES, MetricsAccumulator, bit_error_rates, evaluate_quality, image_quality, \
+    psnr_from_mse
+
+# PSNR/SSIM of the embedding, BER after the attack and PSNR of the attacked against the embedded image
+ENGINE_METRIC_RANGES = dict(METRIC_RANGES, attacked_psnr=METRIC_RANGES['psnr'])
+
+
+def finite_or_none(value):
+    """``value`` as a float, or None if it is infinite or NaN (e.g. the PSNR of an unchanged image)"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def model_attacks(wavetf_model):
+    """
+    Attacks of the evaluation grid keyed by attack id (see ATTACK_NAMES in evaluate_model.py)
+
+    Ids 0-5 are the layers of the model's own attack selector, so evaluation runs the attacks the model was trained
+    against. Salt & pepper (6) only exists inside the combined attack, so it is added as its own layer.
+    """
+    attacks = dict(enumerate(wavetf_model.attack_selector.attacks))
+    attacks[len(attacks)] = SaltPepperAttack()
+    return attacks
+
+
+class EvaluationEngine:
+    """
+    Evaluates the image x attack grid in large batches
+
+    Every chunk of ``batch_size`` images is embedded once, every attack runs on the whole embedded chunk, the
+    attacked images of all attacks are extracted in one call and the metrics are computed as vectors. PSNR/SSIM
+    compare the original and the embedded image (they do not depend on the attack), BER is measured after each
+    attack. Per-attack statistics stream into MetricsAccumulators, so the grid size is not bounded by memory.
+
+    With an EmbeddingCache the embedded images (and their PSNR/SSIM) are kept between calls, so evaluating the same
+    images and watermarks again, e.g. against other attacks or attack strengths, only runs attacks and extraction.
+    """
+
+    def __init__(self, embedder, extractor, attacks: Dict[Hashable, Callable], image_size: Tuple[int],
+                 watermark_size: Tuple[int], batch_size=32, cache: EmbeddingCache = None):
+        """
+        Args:
+            embedder: Model (image, watermark) -> watermarked image, e.g. WaveTFModel.get_embedder()
+            extractor: Model image -> watermark probabilities, e.g. WaveTFModel.get_extractor()
+            attacks: Attack key -> callable on a batch of images, e.g. model_attacks(wavetf_model)
+            batch_size: Images embedded per call; extraction runs on batch_size * len(attacks) images
+            cache: Embedded images by (image, watermark); only images missing from it are embedded
+        """
+        self.attacks = dict(attacks)
+        self.batch_size = batch_size
+        self.cache = cache
+        image_spec = tf.TensorSpec((None,) + tuple(image_size), tf.float32)
+        watermark_spec = tf.TensorSpec((None,) + tuple(watermark_size), tf.float32)
+
+        @tf.function(input_signature=[image_spec, watermark_spec])
+        def embed(images, watermarks):
+            embedded_images = tf.cast(embedder([images, watermarks], training=False), tf.float32)
+            psnr, ssim = image_quality(images, embedded_images)
+            return embedded_images, psnr, ssim
+
+        @tf.function(input_signature=[image_spec, watermark_spec, image_spec])
+        def extract(attacked_images, watermarks, embedded_images):
+            extracted_watermarks = tf.cast(extractor(attacked_images, training=False), tf.float32)
+            attack_mse = tf.reduce_mean(tf.square(attacked_images - embedded_images), axis=[1, 2, 3])
+            return extracted_watermarks, bit_error_rates(watermarks, extracted_watermarks), psnr_from_mse(attack_mse)
+
+        self.embed_function = embed
+        self.extract_function = extract
+        self.reset()
+
+    def use_attacks(self, attacks: Dict[Hashable, Callable]):
+        """Replace the attacks of the grid and reset the statistics; cached embedded images are kept"""
+        self.attacks = dict(attacks)
+        self.reset()
+
+    def attack_grid(self, embedded_images):
+        """Every attack applied to the whole batch, stacked to shape (attacks * batch, ...) in attack order"""
+        # Attacks with submit() (see evaluation/attack_bench.py) run on a process pool while the others run here
+        pending = {key: attack.submit(embedded_images) for key, attack in self.attacks.items()
+                   if hasattr(attack, 'submit')}
+        attacked_images = [pending[key].result() if key in pending else attack(tf.convert_to_tensor(embedded_images))
+                           for key, attack in self.attacks.items()]
+        return tf.concat([tf.cast(images, tf.float32) for images in attacked_images], axis=0)
+
+    def embed_batch(self, images, watermarks):
+        """(embedded images, psnr, ssim) as numpy arrays, embedding only the images missing from the cache"""
+        if self.cache is None:
+            return tuple(output.numpy() for output in self.embed_function(images, watermarks))
+        keys = [cache_key(image, watermark) for image, watermark in zip(np.asarray(images), np.asarray(watermarks))]
+        entries = [self.cache.get(key) for key in keys]
+        missing = [index for index, entry in enumerate(entries) if entry is None]
+        if missing:
+            embedded_images, psnr, ssim = self.embed_function(tf.gather(images, missing), tf.gather(watermarks, missing))
+            for row, index in enumerate(missing):
+                entries[index] = (embedded_images[row].numpy(), psnr[row].numpy(), ssim[row].numpy())
+                self.cache.put(keys[index], entries[index])
+        return tuple(np.stack([entry[output] for entry in entries]) for output in range(3))
+
+    def evaluate_batch(self, images, watermarks):
+        """
+        Evaluate one chunk of images against every attack
+
+        Returns:
+            Dictionary of numpy arrays: 'embedded' (batch, ...), 'psnr'/'ssim' (batch,), 'attacked' and
+            'extracted' (attacks, batch, ...), 'ber' and 'attacked_psnr' (attacks, batch)
+        """
+        images = tf.convert_to_tensor(images, tf.float32)
+        watermarks = tf.convert_to_tensor(watermarks, tf.float32)
+        embedded_images, psnr, ssim = self.embed_batch(images, watermarks)
+        attacked_images = self.attack_grid(embedded_images)
+        watermark_grid = tf.tile(watermarks, [len(self.attacks), 1])
+        embedded_grid = tf.tile(embedded_images, [len(self.attacks), 1, 1, 1])
+        extracted_watermarks, ber, attacked_psnr = self.extract_function(attacked_images, watermark_grid, embedded_grid)
+
+        grid_shape = (len(self.attacks), len(images))
+        return {
+            'embedded': embedded_images,
+            'psnr': psnr,
+            'ssim': ssim,
+            'attacked': attacked_images.numpy().reshape(grid_shape + tuple(attacked_images.shape[1:])),
+            'extracted': extracted_watermarks.numpy().reshape(grid_shape + tuple(extracted_watermarks.shape[1:])),
+            'ber': ber.numpy().reshape(grid_shape),
+            'attacked_psnr': attacked_psnr.numpy().reshape(grid_shape),
+        }
+
+    def evaluate(self, images, watermarks, image_names: Sequence[str] = None, on_result: Callable = None,
+                 verbose=True):
+        """
+        Evaluate every image against every attack
+
+        Args:
+            images: Array of shape (num_images,) + image_size in [0, 1]
+            watermarks: Array of shape (num_images,) + watermark_size
+            image_names: Names reported in the per-pair results (default: image index)
+            on_result: Called with one dict per (image, attack) pair: image_index, image_name, attack_id, psnr,
+                ssim, ber, attacked_psnr, quality and the arrays original_image, watermarked_image, attacked_image, watermark,
+                extracted_watermark. The arrays are views of the current chunk; copy what you keep.
+            verbose: Print progress after every chunk
+
+        Returns:
+            Per-attack summary, see summary()
+        """
+        num_images = len(images)
+        image_names = image_names if image_names is not None else [str(index) for index in range(num_images)]
+        start_time = time.perf_counter()
+        for start in range(0, num_images, self.batch_size):
+            stop = min(start + self.batch_size, num_images)
+            batch = self.evaluate_batch(images[start:stop], watermarks[start:stop])
+            for attack_index, key in enumerate(self.attacks):
+                self.accumulators[key].update({'psnr': batch['psnr'], 'ssim': batch['ssim'],
+                                               'ber': batch['ber'][attack_index],
+                                               'attacked_psnr': batch['attacked_psnr'][attack_index]})
+            if on_result is not None:
+                for attack_index, key in enumerate(self.attacks):
+                    for row in range(stop - start):
+                        psnr, ssim = float(batch['psnr'][row]), float(batch['ssim'][row])
+                        ber = float(batch['ber'][attack_index, row])
+                        on_result({
+                            'image_index': start + row,
+                            'image_name': image_names[start + row],
+                            'attack_id': key,
+                            'psnr': psnr,
+                            'ssim': ssim,
+                            'ber': ber,
+                            'attacked_psnr': float(batch['attacked_psnr'][attack_index, row]),
+                            'quality': evaluate_quality(psnr, ssim, ber),
+                            'original_image': images[start + row],
+                            'watermarked_image': batch['embedded'][row],
+                            'attacked_image': batch['attacked'][attack_index, row],
+                            'watermark': watermarks[start + row],
+                            'extracted_watermark': batch['extracted'][attack_index, row],
+                        })
+            if verbose:
+                elapsed = time.perf_counter() - start_time
+                print(f"  [{stop}/{num_images}] images x {len(self.attacks)} attacks "
+                      f"({stop * len(self.attacks) / elapsed:.1f} pairs/s)")
+        return self.summary()
+
+    def summary(self, percentiles=(5, 50, 95)):
+        """Attack key -> {'psnr': {...}, 'ssim': {...}, 'ber': {...}} streaming statistics"""
+        return {key: accumulator.summary(percentiles) for key, accumulator in self.accumulators.items()}
+
+    def attack_statistics(self, attack_names: Dict[Hashable, str] = None):
+        """
+        Averages per attack in the evaluation report format: name -> avg_psnr, avg_ssim, avg_ber, std_ber,
+        p95_ber, avg_attacked_psnr, count
+
+        Non-finite values are None: avg_attacked_psnr is infinite for an attack that leaves every image unchanged
+        (the no-attack row).
+        """
+        statistics = {}
+        for key, accumulator in self.accumulators.items():
+            if accumulator.count == 0:
+                continue
+            means = accumulator.means()
+            ber = accumulator.statistics['ber']
+            statistics[attack_names.get(key, key) if attack_names else key] = {
+                'avg_psnr': finite_or_none(means['psnr']),
+                'avg_ssim': finite_or_none(means['ssim']),
+                'avg_ber': finite_or_none(means['ber']),
+                'avg_attacked_psnr': finite_or_none(means['attacked_psnr']),
+                'std_ber': finite_or_none(ber.std),
+                'p95_ber': finite_or_none(ber.percentile(95)),
+                'count': accumulator.count,
+            }
+        return statistics
+
+    def reset(self):
+        self.accumulators = {key: MetricsAccumulator(metric_ranges=ENGINE_METRIC_RANGES) for key in self.attacks}
@@ -0,0 +1,111 @@
+"""
+Robustness curves: BER and attacked-image PSNR of every attack over a grid of strengths
+"""
+import csv
+import json
+import os
+from functools import partial
+
+from attacks.cropping_attack import CroppingAttack
+from attacks.drop_out_attack import DropOutAttack
+from attacks.gaussian_noise_attack import GaussianNoiseAttack
+from attacks.jpeg_attack import JPEGAttack
+from attacks.salt_pepper_attack import SaltPepperAttack
+from attacks.scaling_attack import ScalingAttack
+from evaluation.attack_bench import PoolAttack, crop_resize, jpeg_round_trip, resize_round_trip, webp_round_trip
+
+CURVE_FIELDS = ('strength', 'avg_ber', 'std_ber', 'p95_ber', 'avg_attacked_psnr', 'count')
+
+
+class Sweep:
+    """One attack evaluated at every strength of a grid"""
+
+    def __init__(self, name, parameter, strengths, make_attack, stronger_when_higher=True, on_pool=False):
+        """
+        Args:
+            name: Curve name, also the file name of its table
+            parameter: Name of the swept attack parameter
+            strengths: Grid of parameter values
+            make_attack: Parameter value -> attack layer, or a picklable numpy function if ``on_pool``
+            stronger_when_higher: Whether higher parameter values are stronger attacks (False for quality, scale)
+            on_pool: Run the attack on the AttackBench process pool instead of in TensorFlow
+        """
+        self.name = name
+        self.parameter = parameter
+        self.strengths = list(strengths)
+        self.make_attack = make_attack
+        self.stronger_when_higher = stronger_when_higher
+        self.on_pool = on_pool
+
+    def attacks(self, bench=None):
+        """Strength -> attack, evaluated as one grid so all strengths share every embedding and extraction call"""
+        assert not self.on_pool or bench is not None, f'{self.name} runs on the process pool, pass an AttackBench'
+        return {strength: PoolAttack(self.make_attack(strength), bench) if self.on_pool else self.make_attack(strength)
+                for strength in self.strengths}
+
+
+JPEG_QUALITIES = list(range(10, 100, 5))
+SCALES = [0.25, 0.35, 0.5, 0.6, 0.75, 0.9]
+CROP_FRACTIONS = [0.02, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3]
+
+# Attack layers at the strength they are trained with: stddev 0.1, quality 50, rate 0.3, probability 0.1,
+# crop 5-15% and scale 0.5-0.75; the codec sweeps run the cv2 round trips of evaluation/attack_bench.py
+SWEEPS = [
+    Sweep('gaussian_noise', 'stddev', [0.01, 0.02, 0.05, 0.1, 0.15, 0.2, 0.3],
+          lambda stddev: GaussianNoiseAttack(stddev=stddev)),
+    Sweep('jpeg', 'quality', JPEG_QUALITIES, lambda quality: JPEGAttack(quality=quality), stronger_when_higher=False),
+    Sweep('dropout', 'rate', [0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7], lambda rate: DropOutAttack(rate=rate)),
+    Sweep('salt_pepper', 'probability', [0.01, 0.02, 0.05, 0.1, 0.15, 0.2, 0.3],
+          lambda probability: SaltPepperAttack(probability=probability)),
+    Sweep('cropping', 'fraction', CROP_FRACTIONS, lambda fraction: CroppingAttack(crop_range=(fraction, fraction))),
+    Sweep('scaling', 'scale', SCALES, lambda scale: ScalingAttack(scale_range=(scale, scale)),
+          stronger_when_higher=False),
+    Sweep('jpeg_codec', 'quality', JPEG_QUALITIES, lambda quality: partial(jpeg_round_trip, quality=quality),
+          stronger_when_higher=False, on_pool=True),
+    Sweep('webp_codec', 'quality', JPEG_QUALITIES, lambda quality: partial(webp_round_trip, quality=quality),
+          stronger_when_higher=False, on_pool=True),
+    Sweep('resize_codec', 'scale', SCALES, lambda scale: partial(resize_round_trip, scale=scale),
+          stronger_when_higher=False, on_pool=True),
+    Sweep('crop_resize', 'fraction', CROP_FRACTIONS, lambda fraction: partial(crop_resize, fraction=fraction),
+          on_pool=True),
+]
+
+
+def run_sweep(engine, sweep, images, watermarks, bench=None):
+    """
+    Curve of one sweep: rows of CURVE_FIELDS ordered by strength
+
+    The engine's cache keeps the embedded images, so only the first sweep over a set of images embeds them.
+    """
+    engine.use_attacks(sweep.attacks(bench))
+    engine.evaluate(images, watermarks, verbose=False)
+    statistics = engine.attack_statistics()
+    return [dict({'strength': strength}, **{field: statistics[strength][field] for field in CURVE_FIELDS[1:]})
+            for strength in sweep.strengths]
+
+
+def operating_point(sweep, curve, target_ber):
+    """Strongest strength whose average BER stays within ``target_ber`` (%), None if no strength does"""
+    passing = [row['strength'] for row in curve if row['avg_ber'] <= target_ber]
+    if not passing:
+        return None
+    return max(passing) if sweep.stronger_when_higher else min(passing)
+
+
+def save_curve(sweep, curve, output_dir):
+    """Write the curve as <output_dir>/<sweep name>.csv, the strength column named after the parameter"""
+    path = os.path.join(output_dir, f'{sweep.name}.csv')
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow((sweep.parameter,) + CURVE_FIELDS[1:])
+        for row in curve:
+            writer.writerow([row[field] for field in CURVE_FIELDS])
+    return path
+
+
+def save_curves(curves, output_dir, metadata=None):
+    """Write every curve to <output_dir>/robustness_curves.json: {'metadata': ..., 'curves': {name: {...}}}"""
+    path = os.path.join(output_dir, 'robustness_curves.json')
+    with open(path, 'w') as json_file:
+        json.dump({'metadata': metadata or {}, 'curves': curves}, json_file, indent=2, allow_nan=False)
+    return path
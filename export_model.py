@@ -0,0 +1,89 @@
+"""
+Export the trained embedder and extractor for serving
+Writes SavedModels (any batch size) and TFLite files (fixed --tflite-batch-size, optionally float16/int8 quantized)
+that inference/exported_model.py loads without the model-building code. Compare the formats with
+benchmark_export.py.
+
+Usage: python export_model.py [--weights PATH] [--output-dir DIR] [--quantize none float16 int8]
+                              [--tflite-batch-size N] [--calibration-images DIR]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import argparse
+import time
+import cv2
+import numpy as np
+from configs import *
+from inference.batch_embedder import list_image_files
+from inference.export import QUANTIZATIONS, export_models
+from inference.model_loader import load_wavetf_model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export the embedder and extractor as SavedModel and TFLite')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--output-dir', default=os.path.join(MODEL_OUTPUT_PATH, 'export'), help='Export directory')
+    parser.add_argument('--quantize', nargs='+', default=['none'], choices=QUANTIZATIONS,
+                        help='TFLite variants to write')
+    parser.add_argument('--tflite-batch-size', type=int, default=1, help='Batch size baked into the TFLite files')
+    parser.add_argument('--calibration-images', default=TEST_IMAGES_PATH,
+                        help='Images to calibrate int8 quantization (random images if none are found)')
+    parser.add_argument('--num-calibration-images', type=int, default=64, help='Calibration images to use')
+    return parser.parse_args()
+
+
+def load_calibration_images(source, num_images):
+    """Grayscale images resized to IMAGE_SIZE in [0, 1], or None when ``source`` has no images"""
+    if not source or not os.path.exists(source):
+        return None
+    images = []
+    for image_path in list_image_files(source)[:num_images]:
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            image = cv2.resize(image, (IMAGE_SIZE[1], IMAGE_SIZE[0]))
+            images.append(np.expand_dims(image.astype(np.float32) / 255.0, axis=-1))
+    return np.stack(images) if images else None
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("MODEL EXPORT")
+    print("="*80)
+
+    if not os.path.exists(args.weights):
+        print(f"\nError: Model weights not found at {args.weights}")
+        return 1
+
+    wavetf_model = load_wavetf_model(args.weights, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+    calibration_images = None
+    if 'int8' in args.quantize:
+        calibration_images = load_calibration_images(args.calibration_images, args.num_calibration_images)
+        print(f"\nint8 calibration: {len(calibration_images) if calibration_images is not None else 'random'} images")
+
+    start_time = time.perf_counter()
+    metadata = export_models(wavetf_model.get_embedder(), wavetf_model.get_extractor(), args.output_dir,
+                             IMAGE_SIZE, WATERMARK_SIZE, quantizations=args.quantize,
+                             tflite_batch_size=args.tflite_batch_size, calibration_images=calibration_images)
+
+    print(f"\nExported to {args.output_dir} in {time.perf_counter() - start_time:.1f}s")
+    for name, saved_model in metadata['saved_models'].items():
+        print(f"  {name:<10} SavedModel  {saved_model}/")
+    for name, files in metadata['tflite'].items():
+        for quantization, file_name in files.items():
+            size = os.path.getsize(os.path.join(args.output_dir, file_name)) / 1024
+            print(f"  {name:<10} TFLite {quantization:<8} {file_name} ({size:.0f} KB, batch {args.tflite_batch_size})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
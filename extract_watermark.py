@@ -0,0 +1,90 @@
+"""
+Extract watermarks from watermarked images
+With --tiled the watermark is read from every tile of a full resolution image and the tiles vote
+
+Usage: python extract_watermark.py IMAGE [IMAGE ...] [--weights PATH] [--tiled [--tile-overlap N]] [--manifest PATH]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import argparse
+import json
+import cv2
+import numpy as np
+from configs import *
+from inference.batch_embedder import bits_to_string
+from inference.model_loader import load_extractor
+from inference.tiling import TiledWatermarker
+from utils.metrics import calculate_ber
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Watermark extraction')
+    parser.add_argument('images', nargs='+', help='Watermarked images')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--tiled', action='store_true', help='Extract from every tile and vote (full resolution)')
+    parser.add_argument('--tile-overlap', type=int, default=0, help='Tile overlap used when embedding')
+    parser.add_argument('--batch-size', type=int, default=64, help='Tiles per extractor call')
+    parser.add_argument('--manifest', default=None, help='batch_embed.py manifest to compare against (BER)')
+    return parser.parse_args()
+
+
+def load_manifest_watermarks(manifest_path):
+    """Embedded watermark bits by output image path"""
+    watermarks = {}
+    with open(manifest_path) as manifest_file:
+        for line in manifest_file:
+            entry = json.loads(line)
+            if 'watermark' in entry:
+                watermarks[os.path.normpath(entry['output'])] = np.array([int(bit) for bit in entry['watermark']],
+                                                                         dtype=np.float32)
+    return watermarks
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("WATERMARK EXTRACTION")
+    print("="*80)
+
+    if not os.path.exists(args.weights):
+        print(f"\nError: Model weights not found at {args.weights}")
+        return 1
+
+    extractor = load_extractor(args.weights, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+    tiler = TiledWatermarker(extractor=extractor, tile_size=IMAGE_SIZE[0], overlap=args.tile_overlap,
+                             batch_size=args.batch_size)
+    embedded_watermarks = load_manifest_watermarks(args.manifest) if args.manifest else {}
+
+    for image_path in args.images:
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"\n{image_path}: could not load image")
+            continue
+        if not args.tiled:
+            image = cv2.resize(image, (IMAGE_SIZE[1], IMAGE_SIZE[0]))
+        image = np.expand_dims(image.astype(np.float32) / 255.0, axis=-1)
+
+        probabilities, tile_probabilities = tiler.extract(image)
+        print(f"\n{image_path}:")
+        print(f"  Watermark: {bits_to_string(probabilities)}")
+        if args.tiled:
+            tile_bits = tile_probabilities > 0.5
+            agreement = np.mean(tile_bits == (probabilities > 0.5)[None])
+            print(f"  Tiles: {len(tile_probabilities)} | Tile agreement with vote: {agreement * 100:.2f}%")
+        embedded_watermark = embedded_watermarks.get(os.path.normpath(image_path))
+        if embedded_watermark is not None:
+            print(f"  BER:  {calculate_ber(embedded_watermark, probabilities):.2f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.color import rgb_to_ycbcr, ycbcr_to_rgb
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+MANIFEST_FILE_NAME = 'manifest.jsonl'
+
+
+def list_image_files(source: str):
+    """
+    Images to embed, from a directory (sorted, non-recursive) or a text file with one path per line
+    """
+    if os.path.isdir(source):
+        return sorted(str(path) for path in Path(source).iterdir() if path.suffix.lower() in IMAGE_EXTENSIONS)
+    with open(source) as list_file:
+        return [line.strip() for line in list_file if line.strip()]
+
+
+def bits_to_string(bits):
+    return ''.join('1' if bit > 0.5 else '0' for bit in np.asarray(bits).flatten())
+
+
+class EmbeddingManifest:
+    """
+    Append-only JSON lines record of processed images (one line per image, written after its output file).
+
+    On restart every input already in the manifest is skipped, so an interrupted job resumes where it stopped.
+    Inputs recorded with an error (unreadable image, failed write) are not done and are tried again.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                for line in manifest_file:
+                    try:
+                        entry = json.loads(line)
+                        if 'error' not in entry:
+                            self.done.add(entry['input'])
+                    except (ValueError, KeyError):
+                        # A line cut short by the interruption, that image is simply done again
+                        continue
+
+    def is_done(self, input_path: str):
+        return input_path in self.done
+
+    def record(self, entries: List[dict]):
+        with self.lock:
+            with open(self.manifest_path, 'a') as manifest_file:
+                for entry in entries:
+                    manifest_file.write(json.dumps(entry) + '\n')
+            self.done.update(entry['input'] for entry in entries if 'error' not in entry)
+
+
+class BatchEmbedder:
+    """
+    Streams images through the embedder: decode on a thread pool, embed in batches, write asynchronously.
+
+    Decoded batches wait in a bounded queue and at most ``max_pending_writes`` batches are being written at
+    any time, so memory stays bounded whatever the number of images.
+    """
+
+    def __init__(self, embedder, image_size: Tuple[int], watermark_size: Tuple[int], batch_size=32,
+                 num_workers=4, queue_size=4, max_pending_writes=4, output_format='png', seed=None, tiler=None,
+                 color=False):
+        """
+        Args:
+            embedder: Model (image, watermark) -> watermarked image, see WaveTFModel.get_embedder
+            batch_size: Images per embedder call (per queue item in tiled mode)
+            num_workers: Threads decoding images (and, separately, threads writing them)
+            queue_size: Decoded batches buffered ahead of the embedder
+            max_pending_writes: Embedded batches allowed to wait for the writers
+            output_format: Extension of the written images; use a lossless format to keep the watermark intact
+            seed: Seed of the random per-image watermarks (when no fixed watermark is given)
+            tiler: TiledWatermarker to embed images at full resolution tile by tile instead of resizing them
+                to the model input
+            color: Keep the colors: embed into the Y channel of YCbCr and recombine with the untouched chroma.
+                The conversions run in the decode and write threads, off the embedder's path.
+        """
+        self.embedder = embedder
+        self.image_size = image_size
+        self.watermark_size = watermark_size
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.max_pending_writes = max_pending_writes
+        self.output_format = output_format
+        self.random_state = np.random.RandomState(seed)
+        self.tiler = tiler
+        self.color = color
+
+    def load_image(self, image_path: str):
+        """
+        Grayscale (or YCbCr when ``color``) image in [0, 1] resized to the model input (full resolution when
+        tiled), None if unreadable
+        """
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR if self.color else cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return None
+        if self.tiler is None:
+            image = cv2.resize(image, (self.image_size[1], self.image_size[0]))
+        if self.color:
+            return rgb_to_ycbcr(image[:, :, ::-1].astype(np.float32) / 255.0)
+        return np.expand_dims(image.astype(np.float32) / 255.0, axis=-1)
+
+    def output_paths(self, image_paths: List[str], output_dir: str):
+        """
+        Input path -> output path, mirroring the input paths relative to their common directory
+
+        Inputs that would still share an output (same stem, different extensions) keep their extension in the
+        name, e.g. a.jpg and a.png become a_jpg.png and a_png.png.
+        """
+        if not image_paths:
+            return {}
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in image_paths])
+        stems = {path: os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in image_paths}
+        counts = Counter(stems.values())
+        output_paths = {}
+        for path, stem in stems.items():
+            if counts[stem] > 1:
+                stem = f'{stem}_{os.path.splitext(path)[1][1:].lower()}'
+            output_paths[path] = os.path.join(output_dir, f'{stem}.{self.output_format}')
+        return output_paths
+
+    def embed_batch(self, images: List[np.ndarray], watermarks: np.ndarray):
+        luminance_images = [image[:, :, :1] for image in images] if self.color else images
+        if self.tiler is not None:
+            watermarked_images = [self.tiler.embed(image, watermark)
+                                  for image, watermark in zip(luminance_images, watermarks)]
+        else:
+            watermarked_images = self.embedder.predict_on_batch([np.stack(luminance_images), watermarks])
+            watermarked_images = np.clip(np.asarray(watermarked_images), 0.0, 1.0)
+        if self.color:
+            return [np.concatenate([luminance, image[:, :, 1:]], axis=-1)
+                    for luminance, image in zip(watermarked_images, images)]
+        return watermarked_images
+
+    def write_batch(self, image_paths: List[str], watermarked_images: List[np.ndarray], watermarks: np.ndarray,
+                    output_paths: dict):
+        """Manifest entries of the batch, with an 'error' for every image that could not be written"""
+        entries = []
+        for image_path, watermarked_image, watermark in zip(image_paths, watermarked_images, watermarks):
+            output_path = output_paths[image_path]
+            if self.color:
+                watermarked_image = ycbcr_to_rgb(watermarked_image)[:, :, ::-1]
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            try:
+                written = cv2.imwrite(output_path, np.round(watermarked_image * 255).astype(np.uint8))
+            except cv2.error:
+                written = False
+            entry = {'input': image_path, 'output': output_path}
+            if written:
+                entry['watermark'] = bits_to_string(watermark)
+            else:
+                entry['error'] = 'write failed'
+            entries.append(entry)
+        return entries
+
+    def read_batches(self, image_paths: List[str], batch_queue: queue.Queue, stop_event: threading.Event):
+        """Producer thread: decode batches on the thread pool and put (paths, images, failed paths) on the queue"""
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            for start in range(0, len(image_paths), self.batch_size):
+                if stop_event.is_set():
+                    break
+                batch_paths = image_paths[start:start + self.batch_size]
+                images = list(executor.map(self.load_image, batch_paths))
+                loaded = [(path, image) for path, image in zip(batch_paths, images) if image is not None]
+                failed = [path for path, image in zip(batch_paths, images) if image is None]
+                batch_queue.put(([path for path, _ in loaded], [image for _, image in loaded], failed))
+        batch_queue.put(None)
+
+    def run(self, image_paths: Iterable[str], output_dir: str, watermark: Optional[np.ndarray] = None,
+            manifest_path: Optional[str] = None, report_every=10):
+        """
+        Embed every image not yet in the manifest and write it to ``output_dir``
+
+        Args:
+            image_paths: Input image paths
+            output_dir: Folder of the watermarked images (same relative path and stem, ``output_format`` extension)
+            watermark: Bits embedded in every image; None draws a random watermark per image
+            manifest_path: Resume manifest, defaults to ``output_dir``/manifest.jsonl
+            report_every: Print progress every this many batches
+
+        Returns:
+            Dict with the number of embedded, skipped and failed images, elapsed seconds and images/sec
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = EmbeddingManifest(manifest_path or os.path.join(output_dir, MANIFEST_FILE_NAME))
+        image_paths = list(image_paths)
+        output_paths = self.output_paths(image_paths, output_dir)
+        pending_paths = [path for path in image_paths if not manifest.is_done(path)]
+        skipped = len(image_paths) - len(pending_paths)
+
+        batch_queue = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        reader = threading.Thread(target=self.read_batches, args=(pending_paths, batch_queue, stop_event),
+                                  daemon=True)
+        pending_writes = deque()
+        write_errors = []
+
+        def record_written(done):
+            entries = done.result()
+            manifest.record(entries)
+            write_errors.extend(entry for entry in entries if 'error' in entry)
+
+        embedded = failed = num_batches = 0
+        start_time = time.perf_counter()
+        reader.start()
+        try:
+            with ThreadPoolExecutor(self.num_workers) as writer:
+                while True:
+                    batch = batch_queue.get()
+                    if batch is None:
+                        break
+                    batch_paths, images, failed_paths = batch
+                    if failed_paths:
+                        failed += len(failed_paths)
+                        manifest.record([{'input': path, 'error': 'unreadable image'} for path in failed_paths])
+                    if not batch_paths:
+                        continue
+
+                    if watermark is None:
+                        watermarks = self.random_state.randint(0, 2, size=(len(batch_paths),) + tuple(
+                            self.watermark_size)).astype(np.float32)
+                    else:
+                        watermarks = np.repeat(np.asarray(watermark, np.float32)[None], len(batch_paths), axis=0)
+                    watermarked_images = self.embed_batch(images, watermarks)
+
+                    future = writer.submit(self.write_batch, batch_paths, watermarked_images, watermarks,
+                                           output_paths)
+                    future.add_done_callback(record_written)
+                    pending_writes.append(future)
+                    while len(pending_writes) > self.max_pending_writes:
+                        pending_writes.popleft().result()
+
+                    embedded += len(batch_paths)
+                    num_batches += 1
+                    if report_every and num_batches % report_every == 0:
+                        elapsed = time.perf_counter() - start_time
+                        print(f"  {embedded + skipped}/{len(image_paths)} images | {embedded / elapsed:.1f} images/sec")
+                for future in pending_writes:
+                    future.result()
+        finally:
+            stop_event.set()
+            # Unblock the reader if it is waiting on a full queue
+            while reader.is_alive():
+                try:
+                    batch_queue.get_nowait()
+                except queue.Empty:
+                    reader.join(timeout=0.1)
+
+        elapsed = time.perf_counter() - start_time
+        return {
+            'embedded': embedded - len(write_errors),
+            'skipped': skipped,
+            'failed': failed + len(write_errors),
+            'elapsed': elapsed,
+            'images_per_second': embedded / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,147 @@
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """Thread-safe bucketed histogram with approximate percentiles (upper bound of the bucket)"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, value: float):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def percentile(self, fraction: float):
+        with self.lock:
+            if self.count == 0:
+                return None
+            target = fraction * self.count
+            cumulative = 0
+            for bucket, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= target:
+                    return self.bounds[bucket] if bucket < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def snapshot(self):
+        with self.lock:
+            labels = [f'<={bound:g}' for bound in self.bounds] + [f'>{self.bounds[-1]:g}']
+            buckets = dict(zip(labels, self.counts))
+            count, total = self.count, self.total
+        return {
+            'count': count,
+            'mean': total / count if count else None,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'buckets': buckets,
+        }
+
+
+class BatchRequest:
+    def __init__(self, inputs: List[np.ndarray]):
+        self.inputs = inputs
+        self.future = Future()
+        self.enqueue_time = time.perf_counter()
+
+
+class DynamicBatcher:
+    """
+    Coalesces concurrent single-sample requests into batches for one model function.
+
+    A worker thread takes the oldest request and waits for more until the batch is full or the oldest request
+    has waited ``max_latency_ms``, then runs ``predict_function`` once on the stacked inputs and hands every
+    caller its own row of the outputs.
+    """
+
+    def __init__(self, predict_function: Callable, max_batch_size=32, max_latency_ms=10.0):
+        """
+        Args:
+            predict_function: Takes one batched array per input, returns a batched array or a list of them
+            max_batch_size: Largest batch passed to ``predict_function``
+            max_latency_ms: Longest time a request waits for others before its batch is run
+        """
+        self.predict_function = predict_function
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.requests = queue.Queue()
+        self.latency_histogram = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_size_histogram = Histogram([2 ** power for power in range(int(np.log2(max_batch_size)) + 1)])
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self, *inputs: np.ndarray):
+        """Queue one sample (one array per model input, without batch dimension); returns a Future"""
+        request = BatchRequest([np.asarray(model_input) for model_input in inputs])
+        self.requests.put(request)
+        return request.future
+
+    def __call__(self, *inputs: np.ndarray, timeout=None):
+        return self.submit(*inputs).result(timeout)
+
+    def next_batch(self):
+        first_request = self.requests.get()
+        if first_request is None:
+            return None
+        batch = [first_request]
+        deadline = first_request.enqueue_time + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Stop after this batch
+                self.requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            try:
+                inputs = [np.stack([request.inputs[index] for request in batch])
+                          for index in range(len(batch[0].inputs))]
+                outputs = self.predict_function(*inputs)
+                multiple_outputs = isinstance(outputs, (list, tuple))
+                outputs = [np.asarray(output) for output in outputs] if multiple_outputs else np.asarray(outputs)
+                for row, request in enumerate(batch):
+                    request.future.set_result([output[row] for output in outputs] if multiple_outputs
+                                              else outputs[row])
+            except Exception as error:
+                for request in batch:
+                    request.future.set_exception(error)
+            finished = time.perf_counter()
+            self.batch_size_histogram.record(len(batch))
+            for request in batch:
+                self.latency_histogram.record((finished - request.enqueue_time) * 1000.0)
+
+    def statistics(self):
+        return {
+            'latency_ms': self.latency_histogram.snapshot(),
+            'batch_size': self.batch_size_histogram.snapshot(),
+        }
+
+    def stop(self):
+        self.requests.put(None)
+        self.worker.join()
@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+from typing import Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from inference.exported_model import EMBEDDER_NAME, EXTRACTOR_NAME, METADATA_FILE_NAME, SIGNATURE_NAME
+
+QUANTIZATIONS = ('none', 'float16', 'int8')
+
+
+def export_archive(model, input_specs: Sequence[tf.TensorSpec], output_name):
+    """
+    Keras model wrapped in one concrete serving endpoint
+
+    The endpoint has named inputs (``images``, ``watermarks``) and a named output, so loaders can call it with
+    keywords without the model code. The Keras ExportArchive (rather than a plain tf.Module) is what lets the TFLite
+    converter freeze the Keras 3 weights into constants.
+    """
+    archive = tf.keras.export.ExportArchive()
+    archive.track(model)
+
+    def serve(*inputs):
+        outputs = model(list(inputs) if len(inputs) > 1 else inputs[0], training=False)
+        return {output_name: tf.cast(outputs, tf.float32)}
+
+    archive.add_endpoint(SIGNATURE_NAME, serve, input_signature=list(input_specs))
+    return archive
+
+
+def serving_specs(image_size: Tuple[int], watermark_size: Tuple[int], batch_size=None):
+    """Input specs of the embedder and extractor endpoints; ``batch_size`` None keeps the batch dimension dynamic"""
+    image_spec = tf.TensorSpec((batch_size,) + tuple(image_size), tf.float32, name='images')
+    watermark_spec = tf.TensorSpec((batch_size,) + tuple(watermark_size), tf.float32, name='watermarks')
+    return {EMBEDDER_NAME: [image_spec, watermark_spec], EXTRACTOR_NAME: [image_spec]}
+
+
+def export_archives(embedder, extractor, specs):
+    """Embedder and extractor export archives for the input specs of serving_specs"""
+    return {
+        EMBEDDER_NAME: export_archive(embedder, specs[EMBEDDER_NAME], 'watermarked_images'),
+        EXTRACTOR_NAME: export_archive(extractor, specs[EXTRACTOR_NAME], 'probabilities'),
+    }
+
+
+def representative_dataset(input_specs: Sequence[tf.TensorSpec], images=None, num_samples=32, seed=0):
+    """
+    Calibration batches for int8 quantization, shaped like ``input_specs`` (unknown batch sizes become 1)
+
+    Uses ``images`` (array of shape (n,) + image_size in [0, 1]) when given, else random images. Watermarks are
+    random bits either way.
+    """
+    random_state = np.random.RandomState(seed)
+
+    def generator():
+        for index in range(num_samples):
+            # Keyed by input name: the converted model does not keep the signature's input order
+            sample = {}
+            for spec in input_specs:
+                shape = [spec.shape[0] or 1] + spec.shape.as_list()[1:]
+                if spec.name == 'images' and images is not None:
+                    indices = np.arange(index * shape[0], (index + 1) * shape[0]) % len(images)
+                    sample[spec.name] = images[indices].astype(np.float32)
+                elif spec.name == 'images':
+                    sample[spec.name] = random_state.rand(*shape).astype(np.float32)
+                else:
+                    sample[spec.name] = random_state.randint(0, 2, size=shape).astype(np.float32)
+            yield sample
+
+    return generator
+
+
+def convert_tflite(saved_model_path, input_specs: Sequence[tf.TensorSpec], quantization='none',
+                   calibration_images=None):
+    """
+    TFLite flatbuffer of a fixed-batch SavedModel written by export_archive
+
+    Args:
+        input_specs: The endpoint's input specs, to shape the int8 calibration batches
+        quantization: 'none' (float32), 'float16' (float16 weights) or 'int8' (int8 weights and activations,
+            calibrated on ``calibration_images``; inputs and outputs stay float32)
+    """
+    assert quantization in QUANTIZATIONS, f'quantization must be one of {QUANTIZATIONS}'
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_path, signature_keys=[SIGNATURE_NAME])
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(input_specs, calibration_images)
+    return converter.convert()
+
+
+def tflite_file_name(model_name, quantization):
+    return f'{model_name}.tflite' if quantization == 'none' else f'{model_name}_{quantization}.tflite'
+
+
+def export_models(embedder, extractor, output_dir, image_size: Tuple[int], watermark_size: Tuple[int],
+                  quantizations=('none',), tflite_batch_size=1, calibration_images=None):
+    """
+    Write the embedder and extractor as SavedModels (dynamic batch) and TFLite files (batch ``tflite_batch_size``)
+
+    Layout of ``output_dir``:
+        embedder/, extractor/                    SavedModels, signature 'serving_default'
+        embedder[_QUANT].tflite, extractor[_QUANT].tflite
+        export.json                              image/watermark sizes and the written files
+
+    Returns:
+        The metadata written to export.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    metadata = {
+        'image_size': list(image_size),
+        'watermark_size': list(watermark_size),
+        'tflite_batch_size': tflite_batch_size,
+        'saved_models': {},
+        'tflite': {},
+    }
+
+    specs = serving_specs(image_size, watermark_size)
+    for name, archive in export_archives(embedder, extractor, specs).items():
+        archive.write_out(os.path.join(output_dir, name), verbose=False)
+        metadata['saved_models'][name] = name
+
+    # TFLite wants static shapes, so it is converted from a fixed-batch SavedModel
+    tflite_specs = serving_specs(image_size, watermark_size, batch_size=tflite_batch_size)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        for name, archive in export_archives(embedder, extractor, tflite_specs).items():
+            saved_model_path = os.path.join(temporary_dir, name)
+            archive.write_out(saved_model_path, verbose=False)
+            metadata['tflite'][name] = {}
+            for quantization in quantizations:
+                file_name = tflite_file_name(name, quantization)
+                tflite_model = convert_tflite(saved_model_path, tflite_specs[name], quantization,
+                                              calibration_images)
+                with open(os.path.join(output_dir, file_name), 'wb') as tflite_file:
+                    tflite_file.write(tflite_model)
+                metadata['tflite'][name][quantization] = file_name
+
+    with open(os.path.join(output_dir, METADATA_FILE_NAME), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+    return metadata
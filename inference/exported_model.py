@@ -0,0 +1,92 @@
+"""
+Run exported embedders and extractors (see inference/export.py)
+Only needs TensorFlow: the model-building code in models/ and wavetf.py is never imported
+"""
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+
+EMBEDDER_NAME = 'embedder'
+EXTRACTOR_NAME = 'extractor'
+SIGNATURE_NAME = 'serving_default'
+METADATA_FILE_NAME = 'export.json'
+
+
+class SavedModelRunner:
+    """Calls the serving signature of an exported SavedModel with numpy batches of any size"""
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = tf.saved_model.load(path).signatures[SIGNATURE_NAME]
+        self.output_name = next(iter(self.signature.structured_outputs))
+
+    def __call__(self, images, watermarks=None):
+        inputs = {'images': tf.convert_to_tensor(images, tf.float32)}
+        if watermarks is not None:
+            inputs['watermarks'] = tf.convert_to_tensor(watermarks, tf.float32)
+        return self.signature(**inputs)[self.output_name].numpy()
+
+
+class TFLiteRunner:
+    """
+    Calls an exported TFLite model with numpy batches of any size
+
+    The file is converted with a fixed batch size baked into its reshapes, so inputs are run in chunks of that size
+    and the last chunk is zero padded.
+    """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.runner = self.interpreter.get_signature_runner(SIGNATURE_NAME)
+        self.output_name = next(iter(self.runner.get_output_details()))
+        self.batch_size = int(self.runner.get_input_details()['images']['shape'][0])
+
+    def __call__(self, images, watermarks=None):
+        inputs = {'images': np.asarray(images, dtype=np.float32)}
+        if watermarks is not None:
+            inputs['watermarks'] = np.asarray(watermarks, dtype=np.float32)
+        num_images = len(inputs['images'])
+        outputs = []
+        for start in range(0, num_images, self.batch_size):
+            chunk = {name: values[start:start + self.batch_size] for name, values in inputs.items()}
+            padding = self.batch_size - len(chunk['images'])
+            if padding:
+                chunk = {name: np.concatenate([values, np.zeros((padding,) + values.shape[1:], np.float32)])
+                         for name, values in chunk.items()}
+            outputs.append(self.runner(**chunk)[self.output_name])
+        return np.concatenate(outputs)[:num_images]
+
+
+def load_exported_model(path, num_threads=None):
+    """SavedModelRunner for a SavedModel directory, TFLiteRunner for a .tflite file"""
+    if path.endswith('.tflite'):
+        return TFLiteRunner(path, num_threads)
+    assert os.path.isdir(path), f'{path} is neither a SavedModel directory nor a .tflite file'
+    return SavedModelRunner(path)
+
+
+def load_exported_pair(export_dir, model_format='saved_model', quantization='none', num_threads=None):
+    """
+    Embedder and extractor from an export directory
+
+    Args:
+        model_format: 'saved_model' or 'tflite'
+        quantization: TFLite variant, 'none', 'float16' or 'int8'
+
+    Returns:
+        (embedder, extractor, metadata)
+    """
+    with open(os.path.join(export_dir, METADATA_FILE_NAME)) as metadata_file:
+        metadata = json.load(metadata_file)
+    models = []
+    for name in (EMBEDDER_NAME, EXTRACTOR_NAME):
+        if model_format == 'saved_model':
+            file_name = metadata['saved_models'][name]
+        else:
+            assert quantization in metadata['tflite'][name], f'{name} was not exported with {quantization} TFLite'
+            file_name = metadata['tflite'][name][quantization]
+        models.append(load_exported_model(os.path.join(export_dir, file_name), num_threads))
+    return models[0], models[1], metadata
@@ -0,0 +1,19 @@
+from typing import Tuple
+
+
+def load_wavetf_model(weights_path: str, image_size: Tuple[int], watermark_size: Tuple[int], mixed_precision=False):
+    """Build WaveTFModel and load trained weights into its full model; returns the WaveTFModel"""
+    from models.wavetf_model import WaveTFModel
+    wavetf_model = WaveTFModel(image_size=image_size, watermark_size=watermark_size, mixed_precision=mixed_precision)
+    wavetf_model.get_model().load_weights(weights_path)
+    return wavetf_model
+
+
+def load_embedder(weights_path: str, image_size: Tuple[int], watermark_size: Tuple[int], mixed_precision=False):
+    """Embedding-only model (image, watermark) -> watermarked image with trained weights"""
+    return load_wavetf_model(weights_path, image_size, watermark_size, mixed_precision).get_embedder()
+
+
+def load_extractor(weights_path: str, image_size: Tuple[int], watermark_size: Tuple[int], mixed_precision=False):
+    """Extraction-only model image -> watermark probabilities with trained weights"""
+    return load_wavetf_model(weights_path, image_size, watermark_size, mixed_precision).get_extractor()
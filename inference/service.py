@@ -0,0 +1,170 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+from inference.batch_embedder import bits_to_string
+from inference.dynamic_batcher import DynamicBatcher
+
+
+class WatermarkService:
+    """
+    Embedder and extractor loaded once, traced once, and fed through dynamic batchers.
+
+    Images are decoded as grayscale and resized to the model input, like embed_and_extract.load_image.
+    """
+
+    def __init__(self, embedder, extractor, image_size: Tuple[int], watermark_size: Tuple[int], max_batch_size=32,
+                 max_latency_ms=10.0):
+        self.image_size = tuple(image_size)
+        self.watermark_size = tuple(watermark_size)
+        self.max_batch_size = max_batch_size
+        # One trace for every batch size: the batch dimension is left unknown
+        self.embed_function = tf.function(
+            lambda images, watermarks: embedder([images, watermarks], training=False),
+            input_signature=[tf.TensorSpec((None,) + self.image_size, tf.float32),
+                             tf.TensorSpec((None,) + self.watermark_size, tf.float32)])
+        self.extract_function = tf.function(
+            lambda images: extractor(images, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.image_size, tf.float32)])
+        self.embed_batcher = DynamicBatcher(lambda images, watermarks: self.embed_function(images, watermarks).numpy(),
+                                            max_batch_size=max_batch_size, max_latency_ms=max_latency_ms)
+        self.extract_batcher = DynamicBatcher(lambda images: self.extract_function(images).numpy(),
+                                              max_batch_size=max_batch_size, max_latency_ms=max_latency_ms)
+
+    def warm_up(self):
+        """Trace and run both functions at batch sizes 1 and max_batch_size; returns the seconds it took"""
+        start_time = time.perf_counter()
+        for batch_size in (1, self.max_batch_size):
+            images = tf.zeros((batch_size,) + self.image_size)
+            self.embed_function(images, tf.zeros((batch_size,) + self.watermark_size))
+            self.extract_function(images)
+        return time.perf_counter() - start_time
+
+    def decode_image(self, image_bytes: bytes):
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE) if image_bytes else None
+        if image is None:
+            raise ValueError('could not decode image')
+        image = cv2.resize(image, (self.image_size[1], self.image_size[0]))
+        return np.expand_dims(image.astype(np.float32) / 255.0, axis=-1)
+
+    def parse_watermark(self, bits: str):
+        if len(bits) != self.watermark_size[0] or set(bits) - {'0', '1'}:
+            raise ValueError(f'watermark must be {self.watermark_size[0]} characters of 0/1')
+        return np.array([int(bit) for bit in bits], dtype=np.float32)
+
+    def embed(self, image_bytes: bytes, watermark_bits: str = None):
+        """
+        Returns:
+            (PNG bytes of the watermarked image, embedded watermark bits as a 0/1 string)
+        """
+        image = self.decode_image(image_bytes)
+        if watermark_bits is None:
+            watermark = np.random.randint(0, 2, size=self.watermark_size).astype(np.float32)
+        else:
+            watermark = self.parse_watermark(watermark_bits)
+        watermarked_image = np.clip(self.embed_batcher(image, watermark), 0.0, 1.0)
+        _, encoded_image = cv2.imencode('.png', np.round(watermarked_image * 255).astype(np.uint8))
+        return encoded_image.tobytes(), bits_to_string(watermark)
+
+    def extract(self, image_bytes: bytes):
+        probabilities = self.extract_batcher(self.decode_image(image_bytes))
+        return {'watermark': bits_to_string(probabilities), 'probabilities': probabilities.round(4).tolist()}
+
+    def statistics(self):
+        return {'embed': self.embed_batcher.statistics(), 'extract': self.extract_batcher.statistics()}
+
+    def stop(self):
+        self.embed_batcher.stop()
+        self.extract_batcher.stop()
+
+
+def make_request_handler(service: WatermarkService, verbose=False):
+    """
+    HTTP handler class for ``service``
+
+    POST /embed[?watermark=BITS]  body: image bytes  ->  PNG bytes, embedded bits in the X-Watermark header
+    POST /extract                 body: image bytes  ->  JSON {"watermark", "probabilities"}
+    GET  /stats                   latency and batch-size histograms
+    GET  /health
+    """
+
+    class WatermarkRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def address_string(self):
+            # Unix socket clients have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+        def log_message(self, format, *args):
+            if verbose:
+                super(WatermarkRequestHandler, self).log_message(format, *args)
+
+        def send_body(self, status, body: bytes, content_type, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, status, payload):
+            self.send_body(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/stats':
+                self.send_json(200, service.statistics())
+            elif path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': f'unknown path {path}'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            try:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if url.path == '/embed':
+                    watermark_bits = parse_qs(url.query).get('watermark', [None])[0]
+                    image_bytes, watermark_bits = service.embed(body, watermark_bits)
+                    self.send_body(200, image_bytes, 'image/png', {'X-Watermark': watermark_bits})
+                elif url.path == '/extract':
+                    self.send_json(200, service.extract(body))
+                else:
+                    self.send_json(404, {'error': f'unknown path {url.path}'})
+            except ValueError as error:
+                # Malformed request: undecodable image, bad watermark or Content-Length
+                self.send_json(400, {'error': str(error)})
+            except Exception as error:
+                self.send_json(500, {'error': str(error)})
+
+    return WatermarkRequestHandler
+
+
+# Listen backlog, the socketserver default of 5 refuses bursts of concurrent clients
+REQUEST_QUEUE_SIZE = 128
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+class ThreadingLocalHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+def create_server(service: WatermarkService, host='127.0.0.1', port=8500, unix_socket=None, verbose=False):
+    """HTTP server on ``host``:``port``, or on the Unix socket path ``unix_socket`` when given"""
+    handler = make_request_handler(service, verbose)
+    if unix_socket:
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingLocalHTTPServer((host, port), handler)
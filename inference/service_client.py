@@ -0,0 +1,58 @@
+import http.client
+import json
+import socket
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        super(UnixHTTPConnection, self).__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class WatermarkClient:
+    """Client of the local watermark service (see inference/service.py); one connection per request"""
+
+    def __init__(self, host='127.0.0.1', port=8500, unix_socket=None, timeout=60):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+
+    def connection(self):
+        if self.unix_socket:
+            return UnixHTTPConnection(self.unix_socket, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None):
+        connection = self.connection()
+        try:
+            headers = {'Content-Type': 'application/octet-stream'} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            if response.status != 200:
+                raise RuntimeError(f'{method} {path} failed ({response.status}): {payload.decode("utf-8", "replace")}')
+            return response, payload
+        finally:
+            connection.close()
+
+    def embed(self, image_bytes: bytes, watermark_bits: str = None):
+        """Returns (PNG bytes of the watermarked image, embedded bits)"""
+        path = '/embed' if watermark_bits is None else f'/embed?watermark={watermark_bits}'
+        response, payload = self.request('POST', path, image_bytes)
+        return payload, response.getheader('X-Watermark')
+
+    def extract(self, image_bytes: bytes):
+        """Returns {"watermark": bits, "probabilities": [...]}"""
+        return json.loads(self.request('POST', '/extract', image_bytes)[1])
+
+    def statistics(self):
+        return json.loads(self.request('GET', '/stats')[1])
+
+    def health(self):
+        return json.loads(self.request('GET', '/health')[1])
@@ -0,0 +1,115 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def tile_starts(length: int, tile_size: int, overlap: int):
+    """
+    Start offsets of tiles covering [0, length), ``overlap`` pixels apart at most; the last tile ends at ``length``
+
+    ``length`` must be at least ``tile_size`` (see pad_to_tile)
+    """
+    assert 0 <= overlap < tile_size, 'overlap must be in [0, tile_size)'
+    stride = tile_size - overlap
+    starts = list(range(0, length - tile_size + 1, stride))
+    if starts[-1] + tile_size < length:
+        starts.append(length - tile_size)
+    return starts
+
+
+def blend_window(tile_size: int, overlap: int):
+    """
+    Per-pixel tile weight: linear ramps over the ``overlap`` border so neighbouring tiles cross-fade
+
+    Weights stay > 0 everywhere so pixels covered by a single tile (image borders) keep their value.
+    """
+    ramp = np.ones(tile_size, dtype=np.float32)
+    if overlap > 0:
+        edge = np.arange(1, overlap + 1, dtype=np.float32) / (overlap + 1)
+        ramp[:overlap] = edge
+        ramp[-overlap:] = edge[::-1]
+    return ramp[:, None] * ramp[None, :]
+
+
+def pad_to_tile(image: np.ndarray, tile_size: int):
+    """Reflect-pad height and width up to ``tile_size`` when the image is smaller than one tile"""
+    pad_height = max(tile_size - image.shape[0], 0)
+    pad_width = max(tile_size - image.shape[1], 0)
+    if pad_height == 0 and pad_width == 0:
+        return image
+    return np.pad(image, [(0, pad_height), (0, pad_width), (0, 0)], mode='reflect')
+
+
+class TiledWatermarker:
+    """
+    Embeds the same watermark in every tile of an arbitrary-resolution image and extracts it back by voting.
+
+    Tiles are cut, embedded and accumulated ``batch_size`` at a time, so memory is bounded by the image itself
+    plus one batch of tiles whatever the resolution.
+    """
+
+    def __init__(self, embedder=None, extractor=None, tile_size=256, overlap=0, batch_size=64):
+        """
+        Args:
+            embedder: Model (image, watermark) -> watermarked image, see WaveTFModel.get_embedder
+            extractor: Model image -> watermark probabilities, see WaveTFModel.get_extractor
+            tile_size: Model input size (square tiles)
+            overlap: Pixels shared by neighbouring tiles, blended linearly across the seam (0 = no overlap)
+            batch_size: Tiles per model call
+        """
+        self.embedder = embedder
+        self.extractor = extractor
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.window = blend_window(tile_size, overlap)[:, :, None]
+
+    def tile_positions(self, image_shape: Tuple[int, int]):
+        rows = tile_starts(max(image_shape[0], self.tile_size), self.tile_size, self.overlap)
+        cols = tile_starts(max(image_shape[1], self.tile_size), self.tile_size, self.overlap)
+        return [(row, col) for row in rows for col in cols]
+
+    def tile_batches(self, image: np.ndarray):
+        """Yield (positions, tiles) with at most ``batch_size`` tiles"""
+        positions = self.tile_positions(image.shape[:2])
+        for start in range(0, len(positions), self.batch_size):
+            batch_positions = positions[start:start + self.batch_size]
+            tiles = np.stack([image[row:row + self.tile_size, col:col + self.tile_size]
+                              for row, col in batch_positions])
+            yield batch_positions, tiles
+
+    def embed(self, image: np.ndarray, watermark: np.ndarray):
+        """
+        Args:
+            image: Float image in [0, 1] of shape (height, width, channels), any resolution
+            watermark: Watermark bits embedded in every tile
+
+        Returns:
+            Watermarked image with the shape of ``image``
+        """
+        height, width = image.shape[:2]
+        padded = pad_to_tile(image.astype(np.float32), self.tile_size)
+        # Blend the embedding residuals: the original image is reproduced exactly wherever tiles agree
+        residual = np.zeros(padded.shape, dtype=np.float32)
+        weight = np.zeros(padded.shape[:2] + (1,), dtype=np.float32)
+        for positions, tiles in self.tile_batches(padded):
+            watermarks = np.repeat(np.asarray(watermark, np.float32)[None], len(tiles), axis=0)
+            embedded_tiles = np.asarray(self.embedder.predict_on_batch([tiles, watermarks]))
+            for (row, col), tile, embedded_tile in zip(positions, tiles, embedded_tiles):
+                residual[row:row + self.tile_size, col:col + self.tile_size] += (embedded_tile - tile) * self.window
+                weight[row:row + self.tile_size, col:col + self.tile_size] += self.window
+        watermarked = padded + residual / weight
+        return np.clip(watermarked[:height, :width], 0.0, 1.0)
+
+    def extract(self, image: np.ndarray):
+        """
+        Extract the watermark from every tile and vote
+
+        Returns:
+            (mean bit probabilities over tiles, per-tile probabilities of shape (num_tiles, bits))
+        """
+        padded = pad_to_tile(image.astype(np.float32), self.tile_size)
+        tile_probabilities = [np.asarray(self.extractor.predict_on_batch(tiles))
+                              for _, tiles in self.tile_batches(padded)]
+        tile_probabilities = np.concatenate(tile_probabilities, axis=0)
+        return tile_probabilities.mean(axis=0), tile_probabilities
@@ -1,36 +1,58 @@
 from typing import Tuple
 
 import numpy as np
-import tensorflow as tf
 from tensorflow.keras.layers import Input, Conv2D, Reshape, Conv2DTranspose, BatchNormalization, Activation, \
     AveragePooling2D, Concatenate, Lambda
 from tensorflow.keras.models import Model
 from wavetf import WaveTFFactory
 
-from attacks.gaussian_noise_attack import gaussian_noise_function
-from attacks.rotation_attack import rotation_function
-from attacks.salt_pepper_attack import salt_pepper_function
-from attacks.stupid_attack import stupid_function
-from attacks.drop_out_attack import drop_out_function
-from attacks.jpeg_attack import jpeg_function
-from attacks.cropping_attack import cropping_function
-from attacks.scaling_attack import scaling_function
-from attacks.combined_attack import combined_attack_function
+from attacks.attack_selector import AttackSelector
+from attacks.gaussian_noise_attack import GaussianNoiseAttack
+from attacks.stupid_attack import StupidAttack
+from attacks.jpeg_attack import JPEGAttack
+from attacks.cropping_attack import CroppingAttack
+from attacks.scaling_attack import ScalingAttack
+from attacks.combined_attack import CombinedAttack
 from models.base_model import BaseModel
 
 
 class WaveTFModel(BaseModel):
 
-    def __init__(self, image_size: Tuple[int], watermark_size: Tuple[int], wavelet_type='haar'):
+    def __init__(self, image_size: Tuple[int], watermark_size: Tuple[int], wavelet_type='haar',
+                 band_selective=True, mixed_precision=False):
+        """
+        Args:
+            band_selective: Only compute the HH band that is embedded into / extracted from, and embed with an
+                additive HH update instead of a full DWT + IDWT round trip (haar only, same outputs and weights)
+            mixed_precision: Run the watermark preprocessing, embedding and extraction networks in bfloat16
+                (variables stay float32). Wavelet transforms, final tanh/sigmoid, attacks and losses stay float32.
+        """
         # super(BaseModel, self).__init__(image_size=image_size, watermark_size=watermark_size)
         self.image_size = image_size
         self.watermark_size = watermark_size
         self.wavelet_type = wavelet_type
+        self.band_selective = band_selective and wavelet_type == 'haar'
+        self.mixed_precision = mixed_precision
+        # None = global Keras policy (float32)
+        self.network_dtype = 'mixed_bfloat16' if mixed_precision else None
         self.preprocess_watermark_channels = [512, 128, 1]
         self.extraction_channels = [128, 256]
         self.preprocess_watermark_activation = 'relu'
         self.watermark_x_size = int(np.sqrt(self.watermark_size[0]))
         assert self.watermark_x_size == np.sqrt(self.watermark_size[0]), 'watermark cannot reshape square'
+        # Set by get_model / extraction_network, shared by get_embedder and get_extractor
+        self.model = None
+        self.extraction_layers = []
+        # Index = attack id, see attack_simulator
+        self.combined_attack = CombinedAttack()
+        self.attack_selector = AttackSelector([
+            StupidAttack(),
+            self.combined_attack,
+            GaussianNoiseAttack(),
+            JPEGAttack(),
+            CroppingAttack(),
+            ScalingAttack(),
+        ])
 
     def input_layers(self):
         image_input_layer = Input(self.image_size, name='image_input')
@@ -39,96 +61,136 @@ class WaveTFModel(BaseModel):
         return image_input_layer, watermark_input_layer, attack_id_layer
 
     def wavelet_transform(self, image_input_layer):
+        """
+        Returns:
+            (HH band / 2, whole transform). In band-selective mode the "whole transform" is the image itself,
+            which wavelet_inverse_transform updates in place.
+        """
+        if self.band_selective:
+            hh_band = WaveTFFactory().build_band(self.wavelet_type, 'hh')(image_input_layer)
+            return hh_band / 2, image_input_layer
         wavelet_factory = WaveTFFactory().build(self.wavelet_type, dim=2)(image_input_layer)
         first_wavelet_image = wavelet_factory[:, :, :, 3:] / 2
         return first_wavelet_image, wavelet_factory
 
-    @staticmethod
-    def preprocess_image_network(image_input):
-        image_output = Conv2D(filters=64, kernel_size=(3, 3), padding='same')(image_input)
+    def preprocess_image_network(self, image_input):
+        image_output = Conv2D(filters=64, kernel_size=(3, 3), padding='same', dtype=self.network_dtype)(image_input)
         return image_output
 
     def preprocess_watermark_network(self, watermark_input):
         square_watermark = Reshape(target_shape=(self.watermark_x_size, self.watermark_x_size, 1),
                                    input_shape=self.watermark_size, name='reshape_watermark')(watermark_input)
         for channels in self.preprocess_watermark_channels:
-            square_watermark = Conv2DTranspose(filters=channels, kernel_size=(3, 3), strides=(2, 2), padding='same')(
+            square_watermark = Conv2DTranspose(filters=channels, kernel_size=(3, 3), strides=(2, 2), padding='same',
+                                               dtype=self.network_dtype)(square_watermark)
+            square_watermark = BatchNormalization(dtype=self.network_dtype)(square_watermark)
+            square_watermark = Activation(self.preprocess_watermark_activation, dtype=self.network_dtype)(
                 square_watermark)
-            square_watermark = BatchNormalization()(square_watermark)
-            square_watermark = Activation(self.preprocess_watermark_activation)(square_watermark)
-            square_watermark = AveragePooling2D(pool_size=(2, 2), strides=(1, 1), padding='same')(square_watermark)
+            square_watermark = AveragePooling2D(pool_size=(2, 2), strides=(1, 1), padding='same',
+                                                dtype=self.network_dtype)(square_watermark)
         return square_watermark
 
-    @staticmethod
-    def embedding_network(input_network):
+    def embedding_network(self, input_network):
         for i in range(3):
-            input_network = Conv2D(filters=64, kernel_size=(3, 3), padding='same')(input_network)
-            input_network = BatchNormalization()(input_network)
-            input_network = Activation('relu')(input_network)
-        output_layer = Conv2D(filters=1, kernel_size=(3, 3), padding='same')(input_network)
-        output_layer = Activation('tanh')(output_layer)
+            input_network = Conv2D(filters=64, kernel_size=(3, 3), padding='same', dtype=self.network_dtype)(
+                input_network)
+            input_network = BatchNormalization(dtype=self.network_dtype)(input_network)
+            input_network = Activation('relu', dtype=self.network_dtype)(input_network)
+        output_layer = Conv2D(filters=1, kernel_size=(3, 3), padding='same', dtype=self.network_dtype)(input_network)
+        # float32 output so the wavelet inverse and the image loss never see bfloat16
+        output_layer = Activation('tanh', dtype='float32')(output_layer)
         return output_layer
 
     def wavelet_inverse_transform(self, origin_image, watermarked_image):
+        if self.band_selective:
+            hh_update_layer = WaveTFFactory().build_band(self.wavelet_type, 'hh', update=True)
+            return hh_update_layer([origin_image, watermarked_image * 2])
         concatenate = Concatenate(axis=-1)([origin_image[:, :, :, :3], watermarked_image * 2])
         wavelet_inverse_layer = WaveTFFactory().build(self.wavelet_type, dim=2, inverse=True)(concatenate)
         return wavelet_inverse_layer
 
-    @staticmethod
-    def attack_simulator(image_layer, attack_id_layer):
+    def attack_simulator(self, image_layer, attack_id_layer):
         """
-        Attack simulator that applies 2-3 random attacks based on attack_id
+        Attack simulator that applies the attack chosen by each sample's own attack_id,
+        so one batch mixes all attack types (unknown ids fall back to no attack)
         
         attack_id:
-        0: No attack (stupid_function)
+        0: No attack (StupidAttack)
         1: Combined attack (2-3 random attacks)
         2: Single Gaussian noise
         3: Single JPEG compression
         4: Single Cropping
         5: Single Scaling
         """
-        condition = Lambda(lambda x: tf.switch_case(
-            x[0][0],
-            branch_fns={
-                0: lambda: stupid_function(x[1]),           # No attack
-                1: lambda: combined_attack_function(x[1]),  # 2-3 random attacks
-                2: lambda: gaussian_noise_function(x[1]),   # Single attack
-                3: lambda: jpeg_function(x[1]),             # Single attack
-                4: lambda: cropping_function(x[1]),         # Single attack
-                5: lambda: scaling_function(x[1])           # Single attack
-            },
-            default=lambda: stupid_function(x[1])
-        ))((attack_id_layer[0], image_layer))
+        condition = Lambda(lambda x: self.attack_selector((x[1], x[0])))((attack_id_layer, image_layer))
         return condition
 
+    def extraction_input(self, image_layer):
+        """HH band / 2 of a (possibly attacked) watermarked image"""
+        if self.band_selective:
+            return WaveTFFactory().build_band(self.wavelet_type, 'hh')(image_layer) / 2
+        wavelet_attack_image = WaveTFFactory().build(self.wavelet_type, dim=2)(image_layer)
+        return wavelet_attack_image[:, :, :, 3:4] / 2
+
     def extraction_network(self, watermarked_image):
+        # Layers are kept so get_extractor can apply the same (trained) layers to a new input
+        self.extraction_layers = []
         for channels in self.extraction_channels:
-            watermarked_image = Conv2D(filters=channels, kernel_size=(3, 3), strides=(2, 2), padding='same')(
-                watermarked_image)
-            watermarked_image = BatchNormalization()(watermarked_image)
-            watermarked_image = Activation('relu')(watermarked_image)
-        watermark = Conv2D(filters=1, kernel_size=(3, 3), strides=(2, 2), padding='same')(watermarked_image)
-        watermark = Activation('sigmoid')(watermark)
-        reshape_watermark = Reshape(target_shape=self.watermark_size,
-                                    input_shape=(self.watermark_x_size, self.watermark_x_size, 1),
-                                    name='output_watermark')(watermark)
-        return reshape_watermark
+            self.extraction_layers += [
+                Conv2D(filters=channels, kernel_size=(3, 3), strides=(2, 2), padding='same', dtype=self.network_dtype),
+                BatchNormalization(dtype=self.network_dtype),
+                Activation('relu', dtype=self.network_dtype),
+            ]
+        self.extraction_layers += [
+            Conv2D(filters=1, kernel_size=(3, 3), strides=(2, 2), padding='same', dtype=self.network_dtype),
+            Activation('sigmoid', dtype='float32'),
+            Reshape(target_shape=self.watermark_size, input_shape=(self.watermark_x_size, self.watermark_x_size, 1),
+                    name='output_watermark'),
+        ]
+        for layer in self.extraction_layers:
+            watermarked_image = layer(watermarked_image)
+        return watermarked_image
+
+    def get_embedder(self):
+        """
+        Embedding-only model (image, watermark) -> watermarked image, sharing weights with get_model()
+
+        Builds the full model first if needed; load trained weights into get_model() before or after calling this.
+        """
+        if self.model is None:
+            self.get_model()
+        image_input_layer, watermark_input_layer, _ = self.model.inputs
+        return Model(inputs=[image_input_layer, watermark_input_layer], outputs=self.model.outputs[0], name='embedder')
+
+    def get_extractor(self):
+        """
+        Extraction-only model image -> watermark bits (probabilities), sharing weights with get_model()
+
+        Builds the full model first if needed; load trained weights into get_model() before or after calling this.
+        """
+        if self.model is None:
+            self.get_model()
+        image_input_layer = Input(self.image_size, name='watermarked_image_input')
+        extracted_watermark = self.extraction_input(image_input_layer)
+        for layer in self.extraction_layers:
+            extracted_watermark = layer(extracted_watermark)
+        return Model(inputs=image_input_layer, outputs=extracted_watermark, name='extractor')
 
     def get_model(self):
         image_input_layer, watermark_input_layer, attack_id_layer = self.input_layers()
         wavelet_image, whole_wavelet_image = self.wavelet_transform(image_input_layer)
         preprocessed_image = self.preprocess_image_network(wavelet_image)
         preprocessed_watermark = self.preprocess_watermark_network(watermark_input_layer)
-        concatenate = Concatenate(axis=-1)([preprocessed_image, preprocessed_watermark])
+        concatenate = Concatenate(axis=-1, dtype=self.network_dtype)([preprocessed_image, preprocessed_watermark])
         watermarked_image = self.embedding_network(concatenate)
         wavelet_inverse_watermarked_image = self.wavelet_inverse_transform(whole_wavelet_image, watermarked_image)
         wavelet_watermarked_image = Lambda(lambda x: x, name='embedded_image')(wavelet_inverse_watermarked_image)
         attack_layer = self.attack_simulator(wavelet_inverse_watermarked_image, attack_id_layer)
-        wavelet_attack_image = WaveTFFactory().build(self.wavelet_type, dim=2)(attack_layer)
-        first_channel_attack_image = wavelet_attack_image[:, :, :, 3:4] / 2
+        first_channel_attack_image = self.extraction_input(attack_layer)
         extracted_watermark = self.extraction_network(first_channel_attack_image)
-        return Model(
+        self.model = Model(
             inputs=[image_input_layer, watermark_input_layer, attack_id_layer],
             outputs=[wavelet_watermarked_image, extracted_watermark],
             name='embedding_network'
         )
+        return self.model
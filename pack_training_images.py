@@ -0,0 +1,49 @@
+"""
+Pack the training images into one memory-mapped uint8 array
+Decodes and resizes every image once so training can read batches straight from the page cache
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import time
+from configs import *
+from data_loaders.image_data_loaders.image_data_loader import ImageDataLoader
+from data_loaders.image_data_loaders.memmap_image_data_loader import pack_images
+
+
+def main(output_path):
+    print("="*80)
+    print("PACKING TRAINING IMAGES")
+    print("="*80)
+
+    image_loader = ImageDataLoader(base_path=TRAIN_IMAGES_PATH, channels=[0], image_size=IMAGE_SIZE[:2],
+                                   max_images=TRAIN_IMAGES_COUNT, fast_decode=FAST_JPEG_DECODE)
+    file_paths = image_loader.list_file_paths()
+    if not file_paths:
+        print(f"\nError: No training images found in {TRAIN_IMAGES_PATH}")
+        return
+
+    print(f"\nSource: {TRAIN_IMAGES_PATH} ({len(file_paths)} images)")
+    print(f"Output: {output_path}")
+
+    start_time = time.time()
+    decoded_loader = image_loader.get_file_paths(file_paths).map(
+        lambda file_path, label: image_loader.decode_image(file_path), num_parallel_calls=4)
+    num_images = pack_images(decoded_loader, len(file_paths), image_loader.image_shape, output_path)
+    elapsed = time.time() - start_time
+
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"\n✓ Packed {num_images} images ({size_mb:.1f} MB) in {elapsed:.1f}s")
+    print(f"Set TRAIN_IMAGES_MEMMAP_PATH = '{output_path}' in configs.py to train from it")
+
+
+if __name__ == "__main__":
+    output_path = sys.argv[1] if len(sys.argv) > 1 else (TRAIN_IMAGES_MEMMAP_PATH or 'train_images.npy')
+    main(output_path)
@@ -0,0 +1,138 @@
+"""
+Robustness curves: BER and attacked-image PSNR of every attack over a strength grid
+Each attack is evaluated at all of its strengths as one batched grid, the embedded images are cached across attacks
+and the cv2 codec attacks run on a process pool. Writes one CSV table per attack and robustness_curves.json.
+
+Usage: python robustness_sweep.py [--weights PATH] [--attacks NAME ...] [--num-images N] [--batch-size N]
+                                  [--workers N] [--target-ber PERCENT] [--output-dir DIR]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+# TensorFlow is only imported inside main(): the codec attack workers re-import this script
+import argparse
+import time
+import cv2
+import numpy as np
+from configs import *
+from evaluation.attack_bench import AttackBench
+from evaluation.embedding_cache import EmbeddingCache
+from inference.batch_embedder import list_image_files
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Robustness curves over attack strengths')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--attacks', nargs='+', default=None,
+                        help='Attacks to sweep (default: all; gaussian_noise, jpeg, dropout, salt_pepper, cropping, '
+                             'scaling, jpeg_codec, webp_codec, resize_codec, crop_resize)')
+    parser.add_argument('--images', default=TEST_IMAGES_PATH, help='Image directory')
+    parser.add_argument('--num-images', type=int, default=64, help='Images evaluated at every strength')
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help='Images per batch; extraction runs on batch size x strengths images')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for the codec attacks (default: all cores)')
+    parser.add_argument('--target-ber', type=float, default=5.0, help='BER (%%) defining the operating point')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random watermarks')
+    parser.add_argument('--output-dir', default=os.path.join(MODEL_OUTPUT_PATH, 'robustness'),
+                        help='Directory for the curve tables')
+    return parser.parse_args()
+
+
+def load_images(source, num_images):
+    """(images, names): grayscale images resized to IMAGE_SIZE in [0, 1], unreadable files skipped"""
+    images, names = [], []
+    for image_path in list_image_files(source)[:num_images]:
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"  Skipping unreadable image: {image_path}")
+            continue
+        image = cv2.resize(image, (IMAGE_SIZE[1], IMAGE_SIZE[0]))
+        images.append(np.expand_dims(image.astype(np.float32) / 255.0, axis=-1))
+        names.append(os.path.basename(image_path))
+    return np.stack(images) if images else None, names
+
+
+def print_curve(sweep, curve, point, target_ber):
+    print(f"\n{sweep.name} ({sweep.parameter})")
+    print(f"  {sweep.parameter:>12} | {'BER %':>7} {'std':>6} {'p95':>6} | {'attacked PSNR':>13}")
+    for row in curve:
+        # No attacked PSNR (None) when the attack left every image unchanged
+        attacked_psnr = 'unchanged' if row['avg_attacked_psnr'] is None else f"{row['avg_attacked_psnr']:.2f} dB"
+        print(f"  {row['strength']:>12g} | {row['avg_ber']:7.2f} {row['std_ber']:6.2f} {row['p95_ber']:6.2f} | "
+              f"{attacked_psnr:>13}")
+    stronger = 'higher' if sweep.stronger_when_higher else 'lower'
+    print(f"  Operating point (BER <= {target_ber:g}%, {stronger} is stronger): "
+          f"{'none' if point is None else f'{sweep.parameter} {point:g}'}")
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("ROBUSTNESS SWEEP")
+    print("="*80)
+
+    from evaluation.engine import EvaluationEngine
+    from evaluation.robustness import SWEEPS, operating_point, run_sweep, save_curve, save_curves
+    from inference.model_loader import load_wavetf_model
+    sweep_names = [sweep.name for sweep in SWEEPS]
+    unknown_attacks = sorted(set(args.attacks or []) - set(sweep_names))
+    if unknown_attacks:
+        print(f"\nError: unknown attacks {', '.join(unknown_attacks)} (choose from {', '.join(sweep_names)})")
+        return 1
+
+    if not os.path.exists(args.weights):
+        print(f"\nError: Model weights not found at {args.weights}")
+        return 1
+    images, image_names = load_images(args.images, args.num_images)
+    if images is None:
+        print(f"\nError: No images found in {args.images}")
+        return 1
+
+    sweeps = [sweep for sweep in SWEEPS if args.attacks is None or sweep.name in args.attacks]
+    random_state = np.random.RandomState(args.seed)
+    watermarks = random_state.randint(0, 2, size=(len(images),) + WATERMARK_SIZE).astype(np.float32)
+    wavetf_model = load_wavetf_model(args.weights, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+    cache = EmbeddingCache(max_bytes=EVALUATION_CACHE_MB * 1024 ** 2)
+    engine = EvaluationEngine(wavetf_model.get_embedder(), wavetf_model.get_extractor(), {}, IMAGE_SIZE,
+                              WATERMARK_SIZE, batch_size=args.batch_size, cache=cache)
+    bench = AttackBench(args.workers) if any(sweep.on_pool for sweep in sweeps) else None
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    num_points = sum(len(sweep.strengths) for sweep in sweeps)
+    print(f"\n{len(images)} images x {num_points} attack strengths ({len(sweeps)} attacks) "
+          f"| Batch size: {args.batch_size}" + (f" | Codec workers: {bench.num_workers}" if bench else ""))
+    curves = {}
+    start_time = time.perf_counter()
+    try:
+        for sweep in sweeps:
+            sweep_start = time.perf_counter()
+            curve = run_sweep(engine, sweep, images, watermarks, bench)
+            point = operating_point(sweep, curve, args.target_ber)
+            print_curve(sweep, curve, point, args.target_ber)
+            print(f"  {len(images) * len(curve)} pairs in {time.perf_counter() - sweep_start:.1f}s "
+                  f"-> {save_curve(sweep, curve, args.output_dir)}")
+            curves[sweep.name] = {'parameter': sweep.parameter, 'stronger_when_higher': sweep.stronger_when_higher,
+                                  'operating_point': point, 'curve': curve}
+    finally:
+        cache.close()
+        if bench is not None:
+            bench.close()
+
+    elapsed = time.perf_counter() - start_time
+    metadata = {'weights': args.weights, 'images': image_names, 'seed': args.seed, 'target_ber': args.target_ber}
+    curves_path = save_curves(curves, args.output_dir, metadata)
+    print(f"\n{len(images) * num_points} pairs in {elapsed:.1f}s ({len(images) * num_points / elapsed:.1f} pairs/s)")
+    print(f"Curves saved to {curves_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,7 +24,8 @@ from configs import *
 from models.wavetf_model import WaveTFModel
 from data_loaders.merged_data_loader import MergedDataLoader
 
-from utils.metrics import calculate_psnr, calculate_ssim, calculate_ber, evaluate_quality
+from utils.callbacks import AttackStatisticsCallback
+from evaluation.engine import EvaluationEngine, model_attacks
 
 # Attack names mapping - kept for evaluation mapping
 ATTACK_NAMES = {
@@ -40,6 +41,7 @@ ATTACK_NAMES = {
 
 class IntegratedTrainer:
     def __init__(self):
+        self.wavetf_model = None
         self.model = None
         self.data_loader = None
         self.output_dir = MODEL_OUTPUT_PATH
@@ -55,7 +57,9 @@ class IntegratedTrainer:
 
         # Build model
         print("\nBuilding model...")
-        wavetf_model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE)
+        wavetf_model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE,
+                                   mixed_precision=MIXED_PRECISION)
+        self.wavetf_model = wavetf_model
         self.model = wavetf_model.get_model()
 
         # Compile model
@@ -75,7 +79,8 @@ class IntegratedTrainer:
             metrics={
                 'embedded_image': ['mse', 'mae'],
                 'output_watermark': ['accuracy']
-            }
+            },
+            jit_compile=JIT_COMPILE
         )
 
         # Prepare dataset
@@ -87,7 +92,15 @@ class IntegratedTrainer:
             watermark_size=WATERMARK_SIZE,
             attack_min_id=0,
             attack_max_id=ATTACK_MAX_ID,
-            batch_size=BATCH_SIZE
+            batch_size=BATCH_SIZE,
+            image_cache_dir=TRAIN_IMAGES_CACHE_PATH,
+            image_memmap_path=TRAIN_IMAGES_MEMMAP_PATH,
+            profile=DATA_PIPELINE_PROFILE,
+            image_max_count=TRAIN_IMAGES_COUNT,
+            shuffle_buffer_size=SHUFFLE_BUFFER_SIZE,
+            num_shards=NUM_TRAIN_SHARDS,
+            shard_index=TRAIN_SHARD_INDEX,
+            image_fast_decode=FAST_JPEG_DECODE
         ).get_data_loader()
 
         print(f"\nTraining configuration:")
@@ -104,6 +117,7 @@ class IntegratedTrainer:
         history = self.model.fit(
             train_dataset,
             epochs=EPOCHS,
+            callbacks=[AttackStatisticsCallback(wavetf_model.combined_attack)],
             verbose=1
         )
 
@@ -120,7 +134,7 @@ class IntegratedTrainer:
 
         # Save model weights
         print("\nSaving model weights...")
-        model_path = os.path.join(self.output_dir, 'final_model_weights.keras')
+        model_path = os.path.join(self.output_dir, 'final_model_weights.weights.h5')
         # use save_weights to keep file small
         self.model.save_weights(model_path)
         print(f"✓ Model weights saved to: {model_path}")
@@ -142,34 +156,38 @@ class IntegratedTrainer:
         test_images = self._load_test_images(num_images=3)
         print(f"✓ Loaded {len(test_images)} test images")
 
-        # Run evaluation
+        # Run evaluation: every image is embedded once, attacks and extraction run in batches
+        engine = EvaluationEngine(self.wavetf_model.get_embedder(), self.wavetf_model.get_extractor(),
+                                  model_attacks(self.wavetf_model), IMAGE_SIZE, WATERMARK_SIZE)
+        images = np.stack([image for image, _ in test_images])
+        image_names = [image_name for _, image_name in test_images]
+        watermarks = np.stack([self._generate_watermark() for _ in test_images])
         results = []
-        total_tests = len(test_images) * len(ATTACK_NAMES)
-        current_test = 0
+        best = {}
 
         print("\nRunning evaluation tests...")
         print("-" * 80)
 
-        for image, image_name in test_images:
-            print(f"\nEvaluating: {image_name}")
-            watermark = self._generate_watermark()
-
-            for attack_id in range(len(ATTACK_NAMES)):
-                current_test += 1
-                attack_name = ATTACK_NAMES[attack_id]
-
-                print(f"  [{current_test}/{total_tests}] {attack_name}...", end=" ")
-
-                result = self._evaluate_single(image, watermark, attack_id, image_name)
-                results.append(result)
-
-                print(f"PSNR: {result['psnr']:.2f} dB | SSIM: {result['ssim']:.4f} | BER: {result['ber']:.2f}%")
+        def record_result(result):
+            result['attack_name'] = ATTACK_NAMES[result['attack_id']]
+            print(f"  {result['image_name']} | {result['attack_name']}: PSNR: {result['psnr']:.2f} dB | "
+                  f"SSIM: {result['ssim']:.4f} | BER: {result['ber']:.2f}%")
+            # Only the best result keeps its images (for the visualization)
+            score = result['psnr'] + result['ssim'] * 100 - result['ber']
+            if not best or score > best['score']:
+                best.update(result, score=score)
+                for key in ('original_image', 'watermarked_image', 'attacked_image', 'watermark',
+                            'extracted_watermark'):
+                    best[key] = np.copy(result[key])
+            results.append({key: value for key, value in result.items() if not isinstance(value, np.ndarray)})
+
+        engine.evaluate(images, watermarks, image_names, on_result=record_result, verbose=False)
 
         print("\n" + "-" * 80)
         print("✓ Evaluation complete!")
 
-        # Find and save only the best result
-        best_result = max(results, key=lambda r: (r['psnr'] + r['ssim'] * 100 - r['ber']))
+        # Save only the best result
+        best_result = best
         print(f"\n✓ Best result: {best_result['image_name']} with {best_result['attack_name']}")
         print(f"  PSNR: {best_result['psnr']:.2f} dB | SSIM: {best_result['ssim']:.4f} | BER: {best_result['ber']:.2f}%")
         self._save_visualization(best_result)
@@ -199,38 +217,6 @@ class IntegratedTrainer:
         """Generate random watermark"""
         return np.random.randint(0, 2, size=WATERMARK_SIZE).astype(np.float32)
 
-    def _evaluate_single(self, image, watermark, attack_id, image_name):
-        """Evaluate single image with specific attack"""
-        # Prepare inputs
-        image_batch = np.expand_dims(image, axis=0)
-        watermark_batch = np.expand_dims(watermark, axis=0)
-
-        # Get predictions
-        watermarked_image, extracted_watermark = self.model.predict(
-            [image_batch, watermark_batch],
-            verbose=0
-        )
-
-        # Calculate metrics
-        psnr = calculate_psnr(image_batch, watermarked_image)
-        ssim = calculate_ssim(image_batch, watermarked_image)
-        ber = calculate_ber(watermark_batch, extracted_watermark)
-        quality = evaluate_quality(psnr, ssim, ber)
-
-        return {
-            'image_name': image_name,
-            'attack_id': attack_id,
-            'attack_name': ATTACK_NAMES[attack_id],
-            'psnr': float(psnr),
-            'ssim': float(ssim),
-            'ber': float(ber),
-            'quality': quality,
-            'original_image': image,
-            'watermarked_image': watermarked_image[0],
-            'watermark': watermark,
-            'extracted_watermark': extracted_watermark[0]
-        }
-
     def _save_visualization(self, result):
         """Save visualization for a result"""
         fig, axes = plt.subplots(2, 3, figsize=(15, 10))
@@ -243,7 +229,7 @@ class IntegratedTrainer:
         axes[0, 0].axis('off')
 
         # Watermarked Image
-        axes[0, 1].imshow(result['watermarked_image'].squeeze(), cmap='gray')
+        axes[0, 1].imshow(result['attacked_image'].squeeze(), cmap='gray')
         axes[0, 1].set_title('Watermarked Image (After Attack)', fontsize=12, fontweight='bold')
         axes[0, 1].axis('off')
 
@@ -13,6 +13,7 @@ from configs import *
 from models.wavetf_model import WaveTFModel
 from data_loaders.merged_data_loader import MergedDataLoader
 from keras.callbacks import ModelCheckpoint
+from utils.callbacks import AttackStatisticsCallback
 
 optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
 losses = {
@@ -26,23 +27,28 @@ loss_weights = {
 
 train_dataset = MergedDataLoader(image_base_path=TRAIN_IMAGES_PATH, image_channels=[0], image_convert_type=tf.float32,
                                  watermark_size=WATERMARK_SIZE, attack_min_id=0, attack_max_id=ATTACK_MAX_ID,
-                                 batch_size=BATCH_SIZE).get_data_loader()
+                                 batch_size=BATCH_SIZE, image_cache_dir=TRAIN_IMAGES_CACHE_PATH,
+                                 image_memmap_path=TRAIN_IMAGES_MEMMAP_PATH, profile=DATA_PIPELINE_PROFILE,
+                                 image_max_count=TRAIN_IMAGES_COUNT, shuffle_buffer_size=SHUFFLE_BUFFER_SIZE,
+                                 num_shards=NUM_TRAIN_SHARDS, shard_index=TRAIN_SHARD_INDEX,
+                                 image_fast_decode=FAST_JPEG_DECODE).get_data_loader()
 
-model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE).get_model()
-model.compile(optimizer=optimizer, loss=losses, loss_weights=loss_weights, metrics=['accuracy'])
+wavetf_model = WaveTFModel(image_size=IMAGE_SIZE, watermark_size=WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+model = wavetf_model.get_model()
+model.compile(optimizer=optimizer, loss=losses, loss_weights=loss_weights, metrics=['accuracy'],
+              jit_compile=JIT_COMPILE)
 
 # Windows-compatible filename (no colons)
 file_path = MODEL_OUTPUT_PATH + 'epochs{epoch:03d}-embedded_image_loss_{embedded_image_loss:.9f}-' \
-                                'output_watermark_loss_{output_watermark_loss:.9f}.hdf5'
+                                'output_watermark_loss_{output_watermark_loss:.9f}.weights.h5'
 
-checkpoint = ModelCheckpoint(file_path, monitor='loss', verbose=1)
-callbacks_list = [checkpoint]
+# Weights only: the attack simulator is a Lambda over Python attack objects, which Keras cannot serialize
+checkpoint = ModelCheckpoint(file_path, monitor='loss', verbose=1, save_weights_only=True)
+callbacks_list = [checkpoint, AttackStatisticsCallback(wavetf_model.combined_attack)]
 
-# Disable checkpointing for now due to DWT/IDWT serialization issues
-# model.fit(train_dataset, epochs=EPOCHS, callbacks=[callbacks_list], batch_size=BATCH_SIZE)
-model.fit(train_dataset, epochs=EPOCHS, batch_size=BATCH_SIZE)
+model.fit(train_dataset, epochs=EPOCHS, callbacks=callbacks_list, batch_size=BATCH_SIZE)
 
 # Save final model
 print("\nSaving final model...")
-model.save_weights(MODEL_OUTPUT_PATH + 'final_model_weights.h5')
-print(f"Model weights saved to {MODEL_OUTPUT_PATH}final_model_weights.h5")
+model.save_weights(MODEL_OUTPUT_PATH + 'final_model_weights.weights.h5')
+print(f"Model weights saved to {MODEL_OUTPUT_PATH}final_model_weights.weights.h5")
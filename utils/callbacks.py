@@ -0,0 +1,35 @@
+"""
+Training callbacks for watermarking system
+"""
+import tensorflow as tf
+
+
+class AttackStatisticsCallback(tf.keras.callbacks.Callback):
+    """
+    Logs which attacks the CombinedAttack chains applied during each epoch
+
+    Adds the share of every attack (``attack_share_<name>``) and of every chain length
+    (``chain_length_share_<n>``) to the epoch logs, so they also reach History and CSV/TensorBoard loggers.
+    """
+
+    def __init__(self, combined_attack, verbose=1):
+        super(AttackStatisticsCallback, self).__init__()
+        self.combined_attack = combined_attack
+        self.verbose = verbose
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.combined_attack.reset_statistics()
+
+    def on_epoch_end(self, epoch, logs=None):
+        statistics = self.combined_attack.statistics()
+        total_attacks = max(sum(statistics['attacks'].values()), 1)
+        total_chains = max(sum(statistics['chain_lengths'].values()), 1)
+        if logs is not None:
+            for name, count in statistics['attacks'].items():
+                logs[f'attack_share_{name}'] = count / total_attacks
+            for length, count in statistics['chain_lengths'].items():
+                logs[f'chain_length_share_{length}'] = count / total_chains
+        if self.verbose:
+            attack_shares = ', '.join(f"{name}: {count / total_attacks:.1%}"
+                                      for name, count in statistics['attacks'].items())
+            print(f"\nCombined attack chains: {sum(statistics['chain_lengths'].values())} | {attack_shares}")
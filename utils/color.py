@@ -0,0 +1,30 @@
+"""
+Color space conversions for color-preserving embedding
+Full-range BT.601 YCbCr (as in JPEG), vectorized over any leading batch dimensions
+"""
+import numpy as np
+
+# Rows give Y, Cb, Cr from R, G, B. Y matches cv2.IMREAD_GRAYSCALE, so grayscale extraction reads the embedded Y.
+RGB_TO_YCBCR = np.array([
+    [0.299, 0.587, 0.114],
+    [-0.168736, -0.331264, 0.5],
+    [0.5, -0.418688, -0.081312],
+], dtype=np.float32)
+YCBCR_TO_RGB = np.linalg.inv(RGB_TO_YCBCR).astype(np.float32)
+CHROMA_OFFSET = np.array([0.0, 0.5, 0.5], dtype=np.float32)
+
+
+def rgb_to_ycbcr(images):
+    """
+    Convert RGB images in [0, 1] to YCbCr in [0, 1]
+
+    Args:
+        images: Array of shape (..., 3), e.g. one image (height, width, 3) or a batch (batch, height, width, 3)
+    """
+    return np.asarray(images, dtype=np.float32) @ RGB_TO_YCBCR.T + CHROMA_OFFSET
+
+
+def ycbcr_to_rgb(images):
+    """Convert YCbCr images in [0, 1] back to RGB, clipped to [0, 1]"""
+    rgb = (np.asarray(images, dtype=np.float32) - CHROMA_OFFSET) @ YCBCR_TO_RGB.T
+    return np.clip(rgb, 0.0, 1.0)
@@ -7,6 +7,22 @@ import numpy as np
 from tensorflow.image import ssim as tf_ssim
 
 
+# Ranges of the streaming percentile histograms, values outside are counted in the end bins
+METRIC_RANGES = {
+    'psnr': (0.0, 100.0),
+    'ssim': (-1.0, 1.0),
+    'ber': (0.0, 100.0),
+}
+
+
+def psnr_from_mse(mse, max_pixel=1.0):
+    """PSNR in dB for MSE values of any shape, inf where the MSE is 0"""
+    mse = tf.convert_to_tensor(mse, tf.float32)
+    safe_mse = tf.where(mse > 0, mse, tf.ones_like(mse))
+    psnr = 10.0 * tf.math.log(max_pixel ** 2 / safe_mse) / tf.math.log(10.0)
+    return tf.where(mse > 0, psnr, tf.fill(tf.shape(mse), float('inf')))
+
+
 def calculate_psnr(original, watermarked):
     """
     Calculate Peak Signal-to-Noise Ratio (PSNR)
@@ -25,13 +41,8 @@ def calculate_psnr(original, watermarked):
     # Calculate MSE
     mse = tf.reduce_mean(tf.square(original - watermarked))
     
-    # Avoid division by zero
-    if mse == 0:
-        return float('inf')
-    
-    # Calculate PSNR
-    max_pixel = 1.0  # Assuming normalized images
-    psnr = 20 * tf.math.log(max_pixel / tf.sqrt(mse)) / tf.math.log(10.0)
+    # Calculate PSNR, identical images give inf (tf.where instead of a Python `if` on the tensor)
+    psnr = psnr_from_mse(mse)
     
     return psnr.numpy()
 
@@ -108,6 +119,179 @@ def calculate_all_metrics(original_image, watermarked_image, original_watermark,
     return metrics
 
 
+def image_quality(original_images, watermarked_images):
+    """Per-image PSNR (dB) and SSIM vectors of two batches in [0, 1], for use inside traced functions"""
+    original_images = tf.cast(original_images, tf.float32)
+    watermarked_images = tf.cast(watermarked_images, tf.float32)
+    mse = tf.reduce_mean(tf.square(original_images - watermarked_images), axis=[1, 2, 3])
+    return psnr_from_mse(mse), tf_ssim(original_images, watermarked_images, max_val=1.0)
+
+
+def bit_error_rates(original_watermarks, extracted_watermarks, threshold=0.5):
+    """Per-watermark BER (%) vector, watermarks are flattened per batch entry; for use inside traced functions"""
+    batch_size = tf.shape(original_watermarks)[0]
+    original_watermarks = tf.reshape(tf.cast(original_watermarks, tf.float32), [batch_size, -1])
+    extracted_watermarks = tf.reshape(tf.cast(extracted_watermarks, tf.float32), [batch_size, -1])
+    extracted_bits = tf.cast(extracted_watermarks > threshold, tf.float32)
+    return tf.reduce_mean(tf.abs(original_watermarks - extracted_bits), axis=1) * 100.0
+
+
+@tf.function(reduce_retracing=True)
+def batch_metrics(original_images, watermarked_images, original_watermarks, extracted_watermarks, threshold=0.5):
+    """
+    Per-image PSNR, SSIM and BER of a batch in one traced graph, without host round trips in between
+
+    Args:
+        original_images, watermarked_images: Batches of shape (batch, height, width, channels) in [0, 1]
+        original_watermarks: Watermark bits of shape (batch, bits) (or (batch, ...), flattened per image)
+        extracted_watermarks: Extracted probabilities or bits, same shape as original_watermarks
+        threshold: Threshold for converting probabilities to bits
+
+    Returns:
+        Dictionary of float32 vectors of length batch: 'psnr' (dB, inf for identical images), 'ssim', 'ber' (%)
+    """
+    psnr, ssim = image_quality(original_images, watermarked_images)
+    return {
+        'psnr': psnr,
+        'ssim': ssim,
+        'ber': bit_error_rates(original_watermarks, extracted_watermarks, threshold),
+    }
+
+
+def calculate_batch_metrics(original_images, watermarked_images, original_watermarks, extracted_watermarks,
+                            chunk_size=256, accumulator=None):
+    """
+    Per-image PSNR, SSIM and BER for batches of any size, computed chunk by chunk with batch_metrics
+
+    Args:
+        chunk_size: Images per traced call, bounds the memory of the SSIM filters
+        accumulator: Optional MetricsAccumulator updated with every chunk; when given, the per-image vectors are
+            not kept and None is returned
+
+    Returns:
+        Dictionary of numpy vectors 'psnr', 'ssim', 'ber' (or None with an accumulator)
+    """
+    results = {name: [] for name in METRIC_RANGES}
+    for start in range(0, len(original_images), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        metrics = batch_metrics(original_images[chunk], watermarked_images[chunk],
+                                original_watermarks[chunk], extracted_watermarks[chunk])
+        metrics = {name: values.numpy() for name, values in metrics.items()}
+        if accumulator is not None:
+            accumulator.update(metrics)
+        else:
+            for name, values in metrics.items():
+                results[name].append(values)
+    if accumulator is not None:
+        return None
+    return {name: np.concatenate(values) if values else np.zeros(0, np.float32) for name, values in results.items()}
+
+
+class StreamingStatistic:
+    """
+    Running count, mean, variance, min, max and approximate percentiles of a stream of values
+
+    Mean and variance are merged batch by batch (Chan et al.), percentiles come from a fixed histogram over
+    ``value_range`` so memory does not grow with the number of values. Infinite values (PSNR of identical images)
+    are counted separately and left out of the moments.
+    """
+
+    def __init__(self, value_range, num_bins=2000):
+        self.value_range = value_range
+        self.bin_edges = np.linspace(value_range[0], value_range[1], num_bins + 1)
+        self.histogram = np.zeros(num_bins, dtype=np.int64)
+        self.count = 0
+        self.infinite_count = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+        self.minimum = float('inf')
+        self.maximum = float('-inf')
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        finite = np.isfinite(values)
+        self.infinite_count += int(np.sum(~finite))
+        values = values[finite]
+        if len(values) == 0:
+            return
+
+        batch_count = len(values)
+        batch_mean = values.mean()
+        batch_squared_deviations = np.sum((values - batch_mean) ** 2)
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.sum_squared_deviations += batch_squared_deviations + delta ** 2 * self.count * batch_count / total
+        self.count = total
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+
+        clipped = np.clip(values, self.value_range[0], self.value_range[1])
+        self.histogram += np.histogram(clipped, bins=self.bin_edges)[0]
+
+    @property
+    def variance(self):
+        return self.sum_squared_deviations / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def percentile(self, percent):
+        """Approximate percentile (0-100) of the finite values, interpolated within histogram bins"""
+        if self.count == 0:
+            return float('nan')
+        target = percent / 100.0 * self.count
+        cumulative = np.cumsum(self.histogram)
+        bin_index = min(int(np.searchsorted(cumulative, target)), len(self.histogram) - 1)
+        previous = cumulative[bin_index - 1] if bin_index > 0 else 0
+        in_bin = self.histogram[bin_index]
+        fraction = (target - previous) / in_bin if in_bin else 0.0
+        low, high = self.bin_edges[bin_index], self.bin_edges[bin_index + 1]
+        return float(np.clip(low + fraction * (high - low), self.minimum, self.maximum))
+
+    def summary(self, percentiles=(5, 50, 95)):
+        summary = {
+            'count': self.count + self.infinite_count,
+            'mean': float(self.mean) if self.count else float('inf' if self.infinite_count else 'nan'),
+            'std': self.std,
+            'min': float(self.minimum) if self.count else float('nan'),
+            'max': float(self.maximum) if self.count else float('nan'),
+            'infinite': self.infinite_count,
+        }
+        for percent in percentiles:
+            summary[f'p{percent:g}'] = self.percentile(percent)
+        return summary
+
+
+class MetricsAccumulator:
+    """StreamingStatistic for each of PSNR, SSIM and BER, fed with the dictionaries of batch_metrics"""
+
+    def __init__(self, num_bins=2000, metric_ranges=None):
+        """
+        Args:
+            metric_ranges: Metric name -> histogram value range (default: METRIC_RANGES)
+        """
+        metric_ranges = METRIC_RANGES if metric_ranges is None else metric_ranges
+        self.statistics = {name: StreamingStatistic(value_range, num_bins)
+                           for name, value_range in metric_ranges.items()}
+
+    def update(self, metrics):
+        for name, values in metrics.items():
+            self.statistics[name].update(values.numpy() if isinstance(values, tf.Tensor) else values)
+
+    @property
+    def count(self):
+        return self.statistics['ber'].count
+
+    def means(self):
+        """Dictionary of mean PSNR, SSIM and BER, in the format of calculate_all_metrics"""
+        return {name: statistic.summary(percentiles=())['mean'] for name, statistic in self.statistics.items()}
+
+    def summary(self, percentiles=(5, 50, 95)):
+        return {name: statistic.summary(percentiles) for name, statistic in self.statistics.items()}
+
+
 def evaluate_quality(psnr, ssim, ber):
     """
     Evaluate overall quality based on metrics
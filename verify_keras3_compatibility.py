@@ -159,10 +159,58 @@ def test_attack_simulator():
         return False
 
 
+def test_wavelet_layers():
+    """Compare the native Haar layers with the tensorflow_wavelets implementation"""
+    print("\n" + "="*80)
+    print("TESTING WAVELET LAYERS (native Haar vs tensorflow_wavelets)")
+    print("="*80)
+    
+    try:
+        import tensorflow as tf
+        import numpy as np
+        from wavetf import HaarDWT, HaarIDWT, HaarBand, HaarBandUpdate
+        from tensorflow_wavelets.Layers.DWT import DWT, IDWT
+        
+        test_image = np.random.rand(2, 256, 256, 1).astype(np.float32)
+        test_bands = np.random.randn(2, 128, 128, 4).astype(np.float32)
+        
+        dwt_error = np.abs(HaarDWT()(test_image).numpy() - DWT(wavelet_name='haar', concat=0)(test_image).numpy()).max()
+        print(f"  DWT max abs difference:  {dwt_error:.2e}")
+        idwt_error = np.abs(HaarIDWT()(test_bands).numpy() - IDWT(wavelet_name='haar', concat=0)(test_bands).numpy()).max()
+        print(f"  IDWT max abs difference: {idwt_error:.2e}")
+        round_trip_error = np.abs(HaarIDWT()(HaarDWT()(test_image)).numpy() - test_image).max()
+        print(f"  Round trip max error:    {round_trip_error:.2e}")
+        hh_band = HaarBand('hh')(test_image).numpy()
+        band_error = np.abs(hh_band - HaarDWT()(test_image).numpy()[..., 3:]).max()
+        print(f"  HH band max difference:  {band_error:.2e}")
+        new_hh_band = test_bands[..., 3:]
+        updated_image = HaarBandUpdate('hh')([test_image, new_hh_band]).numpy()
+        full_update = HaarIDWT()(tf.concat([HaarDWT()(test_image)[..., :3], new_hh_band], axis=-1)).numpy()
+        update_error = np.abs(updated_image - full_update).max()
+        print(f"  HH update max difference: {update_error:.2e}")
+        if max(dwt_error, idwt_error, round_trip_error, band_error, update_error) > 1e-5:
+            print("✗ Native Haar layers do not match tensorflow_wavelets")
+            return False
+        
+        print("Checking layer serialization...")
+        for layer in (HaarDWT(), HaarIDWT(), HaarBand('hh'), HaarBandUpdate('hh')):
+            restored = tf.keras.layers.deserialize(tf.keras.layers.serialize(layer))
+            assert type(restored) is type(layer), f"{type(layer).__name__} did not deserialize"
+        
+        print("\n✓ Native Haar layers match tensorflow_wavelets and serialize")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Wavelet layer test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def test_model_saving():
     """Test model saving in Keras 3 format"""
     print("\n" + "="*80)
-    print("TESTING MODEL SAVING (.keras format)")
+    print("TESTING MODEL SAVING (.weights.h5 format)")
     print("="*80)
     
     try:
@@ -179,7 +227,7 @@ def test_model_saving():
         keras_model = model.get_model()
         
         # Create temporary file
-        with tempfile.NamedTemporaryFile(suffix='.keras', delete=False) as tmp:
+        with tempfile.NamedTemporaryFile(suffix='.weights.h5', delete=False) as tmp:
             temp_path = tmp.name
         
         print(f"Saving model to: {temp_path}")
@@ -192,7 +240,7 @@ def test_model_saving():
         
         # Cleanup
         os.remove(temp_path)
-        print("✓ Keras 3 format (.keras) working correctly")
+        print("✓ Keras 3 weights format (.weights.h5) working correctly")
         
         return True
         
@@ -221,7 +269,10 @@ def main():
     # Test 3: Attack simulator
     results.append(("Attack Simulator", test_attack_simulator()))
     
-    # Test 4: Model saving
+    # Test 4: Wavelet layers
+    results.append(("Wavelet Layers", test_wavelet_layers()))
+    
+    # Test 5: Model saving
     results.append(("Model Saving", test_model_saving()))
     
     # Summary
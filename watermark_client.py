@@ -0,0 +1,102 @@
+"""
+Client for the local watermarking service (watermark_service.py)
+
+Usage:
+    python watermark_client.py embed IMAGE OUTPUT [--watermark BITS]
+    python watermark_client.py extract IMAGE
+    python watermark_client.py stats
+    python watermark_client.py load IMAGE [--requests N] [--concurrency N]
+Add --port N or --unix-socket PATH to match the service.
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from inference.service_client import WatermarkClient
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Watermark service client')
+    parser.add_argument('--host', default='127.0.0.1', help='Service address')
+    parser.add_argument('--port', type=int, default=8500, help='Service port')
+    parser.add_argument('--unix-socket', default=None, help='Service Unix socket path')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    embed_parser = commands.add_parser('embed', help='Embed a watermark into an image')
+    embed_parser.add_argument('image')
+    embed_parser.add_argument('output', help='Where to write the watermarked PNG')
+    embed_parser.add_argument('--watermark', default=None, help='Watermark bits as a 0/1 string (default: random)')
+
+    extract_parser = commands.add_parser('extract', help='Extract the watermark from an image')
+    extract_parser.add_argument('image')
+
+    commands.add_parser('stats', help='Print latency and batch size histograms')
+
+    load_parser = commands.add_parser('load', help='Send concurrent embed and extract requests')
+    load_parser.add_argument('image')
+    load_parser.add_argument('--requests', type=int, default=256, help='Requests per endpoint')
+    load_parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight')
+    return parser.parse_args()
+
+
+def print_statistics(statistics):
+    for name, batcher_statistics in statistics.items():
+        latency = batcher_statistics['latency_ms']
+        batch_size = batcher_statistics['batch_size']
+        if not latency['count']:
+            print(f"  {name:<8} no requests")
+            continue
+        print(f"  {name:<8} requests: {latency['count']:<6} latency mean {latency['mean']:.1f} ms, "
+              f"p50 <={latency['p50']:g} ms, p90 <={latency['p90']:g} ms, p99 <={latency['p99']:g} ms")
+        print(f"  {'':<8} batches:  {batch_size['count']:<6} batch size mean {batch_size['mean']:.1f}, "
+              f"buckets {json.dumps(batch_size['buckets'])}")
+
+
+def run_load(client, image_bytes, num_requests, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, request in (('embed', client.embed), ('extract', client.extract)):
+            start_time = time.perf_counter()
+            list(pool.map(lambda _: request(image_bytes), range(num_requests)))
+            elapsed = time.perf_counter() - start_time
+            print(f"  {name:<8} {num_requests} requests in {elapsed:.2f}s ({num_requests / elapsed:.1f} req/s)")
+
+
+def main():
+    args = parse_args()
+    client = WatermarkClient(args.host, args.port, args.unix_socket)
+
+    if args.command == 'stats':
+        print_statistics(client.statistics())
+        return 0
+
+    with open(args.image, 'rb') as image_file:
+        image_bytes = image_file.read()
+
+    if args.command == 'embed':
+        watermarked_image, watermark_bits = client.embed(image_bytes, args.watermark)
+        with open(args.output, 'wb') as output_file:
+            output_file.write(watermarked_image)
+        print(f"Saved watermarked image to {args.output}")
+        print(f"Watermark: {watermark_bits}")
+    elif args.command == 'extract':
+        print(f"Watermark: {client.extract(image_bytes)['watermark']}")
+    elif args.command == 'load':
+        print(f"Load test: {args.requests} requests per endpoint, {args.concurrency} in flight")
+        run_load(client, image_bytes, args.requests, args.concurrency)
+        print("\nService statistics:")
+        print_statistics(client.statistics())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
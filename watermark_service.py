@@ -0,0 +1,76 @@
+"""
+Local watermarking service
+Loads the embedder and extractor once, warms them up, and serves embed/extract requests over HTTP on localhost
+or a Unix socket. Concurrent requests are coalesced into batches of up to --max-batch-size, waiting at most
+--max-latency-ms for a batch to fill. Latency and batch size histograms are served on /stats.
+
+Usage: python watermark_service.py [--weights PATH] [--port N | --unix-socket PATH]
+                                   [--max-batch-size N] [--max-latency-ms MS]
+"""
+import sys
+import os
+
+# Add current directory to Python path to fix imports
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+if os.getcwd() not in sys.path:
+    sys.path.insert(0, os.getcwd())
+
+import argparse
+from configs import *
+from inference.model_loader import load_wavetf_model
+from inference.service import WatermarkService, create_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local watermarking service')
+    parser.add_argument('--weights', default=os.path.join(MODEL_OUTPUT_PATH, 'final_model_weights.weights.h5'),
+                        help='Trained model weights')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8500, help='Port to listen on')
+    parser.add_argument('--unix-socket', default=None, help='Listen on this Unix socket path instead of a port')
+    parser.add_argument('--max-batch-size', type=int, default=32, help='Largest batch run by the model')
+    parser.add_argument('--max-latency-ms', type=float, default=10.0,
+                        help='Longest time a request waits for a batch to fill')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("="*80)
+    print("WATERMARK SERVICE")
+    print("="*80)
+
+    if not os.path.exists(args.weights):
+        print(f"\nError: Model weights not found at {args.weights}")
+        return 1
+
+    wavetf_model = load_wavetf_model(args.weights, IMAGE_SIZE, WATERMARK_SIZE, mixed_precision=MIXED_PRECISION)
+    service = WatermarkService(wavetf_model.get_embedder(), wavetf_model.get_extractor(), IMAGE_SIZE,
+                               WATERMARK_SIZE, max_batch_size=args.max_batch_size,
+                               max_latency_ms=args.max_latency_ms)
+    print(f"\nWarm-up: {service.warm_up():.1f}s")
+
+    if args.unix_socket and os.path.exists(args.unix_socket):
+        os.remove(args.unix_socket)
+    server = create_server(service, args.host, args.port, args.unix_socket, verbose=args.verbose)
+    address = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Serving on {address} (max batch {args.max_batch_size}, max latency {args.max_latency_ms} ms)")
+    print("Endpoints: POST /embed[?watermark=BITS], POST /extract, GET /stats, GET /health")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        service.stop()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,191 @@
 """
-Wrapper module for tensorflow_wavelets to provide WaveTFFactory interface
+Wavelet transform layers with a WaveTFFactory interface
+
+Haar is implemented natively (2x2 block sums and differences, no padding or convolution) and is serializable.
+Other wavelets fall back to the tensorflow_wavelets layers.
 """
-from tensorflow_wavelets.Layers.DWT import DWT, IDWT
+import numpy as np
+import tensorflow as tf
+
+HAAR_BANDS = ('ll', 'lh', 'hl', 'hh')
+# Sign of each pixel of a 2x2 block in each Haar band, see haar_dwt
+HAAR_BAND_SIGNS = {
+    'll': np.array([[1, 1], [1, 1]], dtype=np.float32),
+    'lh': np.array([[1, 1], [-1, -1]], dtype=np.float32),
+    'hl': np.array([[1, -1], [1, -1]], dtype=np.float32),
+    'hh': np.array([[1, -1], [-1, 1]], dtype=np.float32),
+}
+
+
+def block_pixels(inputs):
+    """
+    Pixels [a, b, c, d] of every 2x2 block [[a, b], [c, d]], each of shape (batch, height / 2, width / 2, channels)
+
+    Uses space_to_depth, so every tensor stays 4D (TFLite slices at most 5D) and the ops convert natively.
+    """
+    return tf.split(tf.nn.space_to_depth(inputs, 2), 4, axis=-1)
+
+
+def from_block_pixels(a, b, c, d):
+    """Inverse of block_pixels"""
+    return tf.nn.depth_to_space(tf.concat([a, b, c, d], axis=-1), 2)
+
+
+def haar_dwt(inputs):
+    """
+    Single level 2D Haar transform of images with even height and width
+
+    Matches tensorflow_wavelets DWT(concat=0): for every 2x2 block [[a, b], [c, d]]
+    ll = (a + b + c + d) / 2, lh = (a + b - c - d) / 2, hl = (a - b + c - d) / 2, hh = (a - b - c + d) / 2
+
+    Returns:
+        Tensor of shape (batch, height / 2, width / 2, 4 * channels) with bands [ll, lh, hl, hh]
+    """
+    a, b, c, d = block_pixels(inputs)
+    low_left, low_right = a + c, b + d
+    high_left, high_right = a - c, b - d
+    ll = (low_left + low_right) / 2
+    lh = (high_left + high_right) / 2
+    hl = (low_left - low_right) / 2
+    hh = (high_left - high_right) / 2
+    return tf.concat([ll, lh, hl, hh], axis=-1)
+
+
+def haar_idwt(inputs):
+    """Inverse of haar_dwt, bands [ll, lh, hl, hh] along the last axis"""
+    ll, lh, hl, hh = tf.split(inputs, 4, axis=-1)
+    low_left, low_right = ll + hl, ll - hl
+    high_left, high_right = lh + hh, lh - hh
+    return from_block_pixels((low_left + high_left) / 2, (low_right + high_right) / 2,
+                             (low_left - high_left) / 2, (low_right - high_right) / 2)
+
+
+def haar_band(inputs, band='hh'):
+    """Single Haar band of haar_dwt, without computing the other three"""
+    signs = HAAR_BAND_SIGNS[band].flatten()
+    return tf.add_n([sign * pixels for sign, pixels in zip(signs, block_pixels(inputs))]) / 2
+
+
+def haar_band_update(inputs, band_values, band='hh'):
+    """
+    Replace one Haar band of ``inputs`` with ``band_values``, leaving the other bands untouched
+
+    Equal to haar_idwt of haar_dwt(inputs) with the band swapped, but done as an additive update: only the band
+    difference is transformed back, so the other three bands are never computed.
+    """
+    delta = (band_values - haar_band(inputs, band)) / 2
+    return inputs + from_block_pixels(*[sign * delta for sign in HAAR_BAND_SIGNS[band].flatten()])
+
+
+@tf.keras.utils.register_keras_serializable(package='wavetf')
+class HaarDWT(tf.keras.layers.Layer):
+    """Haar DWT layer, bands [ll, lh, hl, hh] concatenated on the channel axis"""
+
+    def call(self, inputs):
+        return haar_dwt(inputs)
+
+    def compute_output_shape(self, input_shape):
+        batch, height, width, channels = input_shape
+        return (batch, None if height is None else height // 2, None if width is None else width // 2,
+                None if channels is None else channels * 4)
+
+
+@tf.keras.utils.register_keras_serializable(package='wavetf')
+class HaarIDWT(tf.keras.layers.Layer):
+    """Inverse Haar DWT layer, expects bands [ll, lh, hl, hh] concatenated on the channel axis"""
+
+    def call(self, inputs):
+        return haar_idwt(inputs)
+
+    def compute_output_shape(self, input_shape):
+        batch, height, width, channels = input_shape
+        return (batch, None if height is None else height * 2, None if width is None else width * 2,
+                None if channels is None else channels // 4)
+
+
+@tf.keras.utils.register_keras_serializable(package='wavetf')
+class HaarBand(tf.keras.layers.Layer):
+    """Single Haar band layer, e.g. only HH for the extraction side"""
+
+    def __init__(self, band='hh', **kwargs):
+        super(HaarBand, self).__init__(**kwargs)
+        assert band in HAAR_BANDS, f'band must be one of {HAAR_BANDS}'
+        self.band = band
+
+    def call(self, inputs):
+        return haar_band(inputs, self.band)
+
+    def compute_output_shape(self, input_shape):
+        batch, height, width, channels = input_shape
+        return (batch, None if height is None else height // 2, None if width is None else width // 2, channels)
+
+    def get_config(self):
+        config = super(HaarBand, self).get_config()
+        config.update({'band': self.band})
+        return config
+
+
+@tf.keras.utils.register_keras_serializable(package='wavetf')
+class HaarBandUpdate(tf.keras.layers.Layer):
+    """Replace one Haar band of an image, inputs are [image, band_values]"""
+
+    def __init__(self, band='hh', **kwargs):
+        super(HaarBandUpdate, self).__init__(**kwargs)
+        assert band in HAAR_BANDS, f'band must be one of {HAAR_BANDS}'
+        self.band = band
+
+    def call(self, inputs):
+        image, band_values = inputs
+        return haar_band_update(image, band_values, self.band)
+
+    def compute_output_shape(self, input_shape):
+        return input_shape[0]
+
+    def get_config(self):
+        config = super(HaarBandUpdate, self).get_config()
+        config.update({'band': self.band})
+        return config
 
 
 class WaveTFFactory:
     """Factory class for creating wavelet transform layers"""
-    
+
     def build(self, wavelet_type='haar', dim=2, inverse=False):
         """
         Build a wavelet transform layer
-        
+
         Args:
             wavelet_type: Type of wavelet (e.g., 'haar', 'db2')
             dim: Dimension of the transform (2 for 2D images)
             inverse: Whether to perform inverse transform
-            
+
         Returns:
-            A DWT or IDWT layer instance
+            A HaarDWT / HaarIDWT layer for 'haar', otherwise a tensorflow_wavelets DWT or IDWT layer
         """
+        assert dim == 2, 'only 2D wavelet transforms are supported'
+        if wavelet_type == 'haar':
+            return HaarIDWT() if inverse else HaarDWT()
+
+        from tensorflow_wavelets.Layers.DWT import DWT, IDWT
         if inverse:
             # concat=0 means input has 4 separate channels [ll, lh, hl, hh] concatenated
             return IDWT(wavelet_name=wavelet_type, concat=0)
         else:
             # concat=0 means output 4 channels [ll, lh, hl, hh] concatenated
             return DWT(wavelet_name=wavelet_type, concat=0)
+
+    def build_band(self, wavelet_type='haar', band='hh', update=False):
+        """
+        Build a band-selective wavelet layer (Haar only)
+
+        Args:
+            wavelet_type: Type of wavelet, must be 'haar'
+            band: One of 'll', 'lh', 'hl', 'hh'
+            update: Return a layer that replaces the band in an image (inputs [image, band_values]) instead of
+                one that computes it
+
+        Returns:
+            A HaarBandUpdate layer if ``update`` else a HaarBand layer
+        """
+        assert wavelet_type == 'haar', 'band-selective transforms are only available for haar'
+        return HaarBandUpdate(band) if update else HaarBand(band)